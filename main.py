@@ -6,6 +6,7 @@ This script provides LLM-based task interpretation and orchestration.
 
 import logging
 from src.llm.agent import get_user_tasks
+from src.llm.budget import get_budget
 from src.llm.orchestrator import plan_and_execute_tasks
 from dotenv import load_dotenv
 
@@ -48,15 +49,17 @@ def main():
     try:
         print_welcome_message()
         
-        # Get tasks from user through agent
-        tasks, folder_path = get_user_tasks()
+        # Get tasks and the work prefetched while confirming from user through agent
+        tasks, folder_path, prefetched = get_user_tasks()
         
-        # Pass tasks to orchestrator for planning and execution
-        plan_and_execute_tasks(tasks, folder_path)
+        # Pass tasks to orchestrator for execution, it only plans if no plan was made
+        plan_and_execute_tasks(tasks, folder_path, **prefetched)
         
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         raise
+    finally:
+        print(get_budget().format_summary())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,254 @@
+"""
+Compression throughput benchmark.
+
+Generates a reproducible corpus of PDFs and images, runs every compression
+backend against it (remote services are replaced by local stand-ins) and writes a
+JSON report with files/sec, MB/sec, per-file latency percentiles and bytes saved.
+
+Usage:
+    python -m src.benchmarks.compression_benchmark --output report.json
+    python -m src.benchmarks.compression_benchmark --baseline report.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.benchmarks.corpus import generate_images, generate_pdfs
+from src.benchmarks.stand_ins import ILovePdfStandIn, TinifyStandIn
+from src.compression import image_compressor
+from src.compression.ilovepdf_session import ILovePdfSession
+from src.compression.image_compressor import compress_image, compress_image_to_target
+from src.compression.pdf_compressor import compress_pdf, compress_pdfs
+from src.compression.tinify_session import TinifySession
+
+logger = logging.getLogger(__name__)
+
+BackendResult = Tuple[Dict[Path, Optional[Path]], List[float]]
+
+@contextmanager
+def _environ(**values: str):
+    """
+    Temporarily set environment variables.
+    """
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _timed(func: Callable[[Path], Optional[Path]], paths: List[Path]) -> BackendResult:
+    """
+    Call func for each path sequentially and record the per-file latency.
+    """
+    results, latencies = {}, []
+    for path in paths:
+        start = time.perf_counter()
+        results[path] = func(path)
+        latencies.append(time.perf_counter() - start)
+    return results, latencies
+
+def run_pdf_local(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    return _timed(lambda path: compress_pdf(path, backend='local'), paths)
+
+def run_pdf_local_pool(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    latencies: Dict[Path, float] = {}
+    with _environ(PDF_LOCAL_MAX_SIZE_KB=str(2 ** 31)):
+        results = compress_pdfs(paths, latencies=latencies)
+    return results, list(latencies.values())
+
+def run_pdf_ilovepdf(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    # One client and one task per file, like the original compress_pdf
+    base_url = stand_ins['ilovepdf'].base_url
+    return _timed(
+        lambda path: ILovePdfSession('bench', 'bench', batch_size=1, api_base=base_url).compress([path])[path],
+        paths,
+    )
+
+def run_pdf_ilovepdf_batch(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    latencies: Dict[Path, float] = {}
+    with ILovePdfSession('bench', 'bench', api_base=stand_ins['ilovepdf'].base_url) as session:
+        results = session.compress(paths, latencies)
+    return results, list(latencies.values())
+
+def run_image_tinypng(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    image_compressor._session = None
+    with _environ(IMAGE_COMPRESSION_API_KEY='bench', TINIFY_API_BASE=stand_ins['tinify'].base_url,
+                  IMAGE_TARGET_SIZE_KB=''):
+        try:
+            return _timed(compress_image, paths)
+        finally:
+            image_compressor._session = None
+
+def run_image_tinypng_concurrent(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    with TinifySession('bench', monthly_limit=2 ** 31, api_base=stand_ins['tinify'].base_url) as session:
+        results = session.compress_many(paths)
+        return results, list(session.latencies.values())
+
+def run_image_target_size(paths: List[Path], stand_ins: Dict[str, object]) -> BackendResult:
+    # Ask for half of the original size
+    return _timed(lambda path: compress_image_to_target(path, path.stat().st_size // 2), paths)
+
+BACKENDS: Dict[str, Tuple[str, Callable[[List[Path], Dict[str, object]], BackendResult]]] = {
+    'pdf_local': ('pdf', run_pdf_local),
+    'pdf_local_pool': ('pdf', run_pdf_local_pool),
+    'pdf_ilovepdf': ('pdf', run_pdf_ilovepdf),
+    'pdf_ilovepdf_batch': ('pdf', run_pdf_ilovepdf_batch),
+    'image_tinypng': ('image', run_image_tinypng),
+    'image_tinypng_concurrent': ('image', run_image_tinypng_concurrent),
+    'image_target_size': ('image', run_image_target_size),
+}
+
+# The stand-ins return the uploaded bytes unchanged, so these backends' savings are not measured
+ECHO_BACKENDS = {'pdf_ilovepdf', 'pdf_ilovepdf_batch', 'image_tinypng', 'image_tinypng_concurrent'}
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Returns:
+        Optional[float]: The percentile, None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def run_backend(name: str, paths: List[Path], stand_ins: Dict[str, object]) -> Dict[str, object]:
+    """
+    Run one backend over the corpus and summarise the result.
+
+    Throughput counts only files that were compressed. Bytes out and saved are None for
+    backends served by echoing stand-ins. Compressed outputs are deleted afterwards so
+    every backend starts from the same state.
+    """
+    _, runner = BACKENDS[name]
+    bytes_in = sum(path.stat().st_size for path in paths)
+
+    start = time.perf_counter()
+    results, latencies = runner(paths, stand_ins)
+    wall_time = time.perf_counter() - start
+
+    outputs = [output for output in results.values() if output and output.exists()]
+    succeeded_in = sum(path.stat().st_size for path, output in results.items() if output in outputs)
+    bytes_out = sum(output.stat().st_size for output in outputs)
+    for output in outputs:
+        output.unlink()
+
+    savings_measured = name not in ECHO_BACKENDS
+    return {
+        'files': len(paths),
+        'succeeded': len(outputs),
+        'wall_time_s': round(wall_time, 4),
+        'files_per_sec': round(len(outputs) / wall_time, 3) if wall_time else None,
+        'mb_per_sec': round(succeeded_in / 1024 / 1024 / wall_time, 3) if wall_time else None,
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p99_s': percentile(latencies, 99),
+        'bytes_in': bytes_in,
+        'savings_measured': savings_measured,
+        'bytes_out': bytes_out if savings_measured else None,
+        'bytes_saved': succeeded_in - bytes_out if savings_measured else None,
+    }
+
+def check_regressions(report: Dict[str, object], baseline: Dict[str, object], max_regression: float) -> List[str]:
+    """
+    Compare a report with a baseline report.
+
+    A backend regresses if its throughput drops, or its p99 latency grows, by more
+    than max_regression (a fraction) relative to the baseline.
+
+    Returns:
+        List[str]: Description of every regression found
+    """
+    regressions = []
+    for name, current in report['backends'].items():
+        previous = baseline.get('backends', {}).get(name)
+        if not previous:
+            continue
+        if previous.get('files_per_sec') and current['files_per_sec'] is not None:
+            if current['files_per_sec'] < previous['files_per_sec'] * (1 - max_regression):
+                regressions.append(f"{name}: files/sec {current['files_per_sec']} < baseline {previous['files_per_sec']}")
+        if previous.get('latency_p99_s') and current['latency_p99_s'] is not None:
+            if current['latency_p99_s'] > previous['latency_p99_s'] * (1 + max_regression):
+                regressions.append(f"{name}: p99 latency {current['latency_p99_s']:.4f}s > "
+                                   f"baseline {previous['latency_p99_s']:.4f}s")
+    return regressions
+
+def run_benchmark(count: int, sizes: List[str], backends: List[str], latency: float,
+                  error_rate: float, seed: int, work_dir: Optional[Path] = None) -> Dict[str, object]:
+    """
+    Generate the corpus, start the stand-ins and run the selected backends.
+
+    Returns:
+        Dict[str, object]: Report with the configuration and one summary per backend
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        root = work_dir or Path(tmp)
+        corpus = {
+            'pdf': generate_pdfs(root / 'pdfs', count, sizes, seed),
+            'image': generate_images(root / 'images', count, sizes, seed),
+        }
+        stand_in_args = {'latency': latency, 'error_rate': error_rate, 'seed': seed}
+        with TinifyStandIn(**stand_in_args) as tinify_stand_in, ILovePdfStandIn(**stand_in_args) as ilovepdf_stand_in:
+            stand_ins = {'tinify': tinify_stand_in, 'ilovepdf': ilovepdf_stand_in}
+            summaries = {}
+            for name in backends:
+                logger.info(f"Running {name}")
+                summaries[name] = run_backend(name, corpus[BACKENDS[name][0]], stand_ins)
+
+    return {
+        'config': {
+            'count': count,
+            'sizes': sizes,
+            'latency_s': latency,
+            'error_rate': error_rate,
+            'seed': seed,
+        },
+        'backends': summaries,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark compression backends")
+    parser.add_argument('--count', type=int, default=4, help="files per size class")
+    parser.add_argument('--sizes', default='small,medium', help="comma separated size classes")
+    parser.add_argument('--backends', default=','.join(BACKENDS), help="comma separated backends")
+    parser.add_argument('--latency', type=float, default=0.05, help="stand-in latency per request in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of stand-in requests that fail")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, help="write the JSON report here")
+    parser.add_argument('--baseline', type=Path, help="fail if results regress against this report")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="allowed regression as a fraction")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    report = run_benchmark(args.count, args.sizes.split(','), args.backends.split(','),
+                           args.latency, args.error_rate, args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+    if args.baseline:
+        regressions = check_regressions(report, json.loads(args.baseline.read_text()), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Reproducible synthetic corpora of images and PDFs for compression benchmarks.
+"""
+
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject
+
+# Image dimensions per size class
+IMAGE_SIZES: Dict[str, Tuple[int, int]] = {
+    'small': (640, 480),
+    'medium': (1600, 1200),
+    'large': (3200, 2400),
+}
+
+# First page of every PDF: a letter page scanned at 200 dpi, larger than the local
+# PDF backend's max_image_dim so its downsampling path is exercised
+SCAN_SIZE: Tuple[int, int] = (1700, 2200)
+
+# Uncompressed vector strokes added to every PDF page, like charts from tools that
+# do not deflate their content streams
+STROKES_PER_PAGE = 2000
+
+# Pages per PDF per size class
+PDF_PAGES: Dict[str, int] = {
+    'small': 1,
+    'medium': 4,
+    'large': 12,
+}
+
+def synthetic_image(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """
+    Build a photo-like image: smooth random colour fields with a little noise on top.
+
+    Pure noise would not compress at all and flat colour compresses too well, so the
+    mix gives encoders something realistic to work with.
+
+    Args:
+        rng (random.Random): Seeded random generator
+        size (Tuple[int, int]): Width and height in pixels
+
+    Returns:
+        Image.Image: RGB image
+    """
+    width, height = size
+    coarse = (max(1, width // 32), max(1, height // 32))
+    base = Image.frombytes('RGB', coarse, rng.randbytes(coarse[0] * coarse[1] * 3))
+    base = base.resize(size, Image.BICUBIC)
+    noise = Image.frombytes('RGB', size, rng.randbytes(width * height * 3))
+    return Image.blend(base, noise, 0.08)
+
+def generate_images(target_dir: Path, count: int, sizes: List[str], seed: int = 0) -> List[Path]:
+    """
+    Write count JPEGs and PNGs per size class into target_dir.
+
+    Args:
+        target_dir (Path): Output directory, created if missing
+        count (int): Images per size class
+        sizes (List[str]): Size classes from IMAGE_SIZES
+        seed (int): Seed so the same corpus is generated every time
+
+    Returns:
+        List[Path]: Generated image files
+    """
+    rng = random.Random(seed)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for size in sizes:
+        for i in range(count):
+            image = synthetic_image(rng, IMAGE_SIZES[size])
+            if i % 2 == 0:
+                path = target_dir / f"image_{size}_{i}.jpg"
+                image.save(path, format='JPEG', quality=95)
+            else:
+                path = target_dir / f"image_{size}_{i}.png"
+                image.save(path, format='PNG')
+            paths.append(path)
+    return paths
+
+def generate_pdfs(target_dir: Path, count: int, sizes: List[str], seed: int = 0) -> List[Path]:
+    """
+    Write count PDFs per size class into target_dir.
+
+    The first page holds a high quality scan of SCAN_SIZE, the others one image of the
+    size class. Every page also carries an uncompressed vector content stream, so both
+    image downsampling and content stream recompression have something to do.
+
+    Args:
+        target_dir (Path): Output directory, created if missing
+        count (int): PDFs per size class
+        sizes (List[str]): Size classes from PDF_PAGES
+        seed (int): Seed so the same corpus is generated every time
+
+    Returns:
+        List[Path]: Generated PDF files
+    """
+    rng = random.Random(seed + 1)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for size in sizes:
+        for i in range(count):
+            pages = [synthetic_image(rng, SCAN_SIZE if page == 0 else IMAGE_SIZES[size])
+                     for page in range(PDF_PAGES[size])]
+            path = target_dir / f"document_{size}_{i}.pdf"
+            pages[0].save(path, format='PDF', save_all=True, append_images=pages[1:], resolution=150, quality=95)
+            add_vector_content(path, rng)
+            paths.append(path)
+    return paths
+
+def add_vector_content(path: Path, rng: random.Random) -> None:
+    """
+    Append STROKES_PER_PAGE random line strokes to every page of a PDF, uncompressed.
+
+    Args:
+        path (Path): PDF file, rewritten in place
+        rng (random.Random): Seeded random generator
+    """
+    writer = PdfWriter(clone_from=PdfReader(str(path)))
+    for page in writer.pages:
+        width, height = float(page.mediabox.width), float(page.mediabox.height)
+        strokes = [
+            f"{rng.uniform(0, width):.2f} {rng.uniform(0, height):.2f} m "
+            f"{rng.uniform(0, width):.2f} {rng.uniform(0, height):.2f} l S"
+            for _ in range(STROKES_PER_PAGE)
+        ]
+        content = DecodedStreamObject()
+        content.set_data(page.get_contents().get_data() + ("\nq 0.5 w\n" + "\n".join(strokes) + "\nQ\n").encode())
+        page.replace_contents(content)
+    with open(path, 'wb') as output:
+        writer.write(output)
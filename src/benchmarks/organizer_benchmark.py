@@ -0,0 +1,364 @@
+"""
+Scaling benchmark for the file organizer.
+
+Generates synthetic Files/ trees with a realistic mix of extensions, file sizes
+and nesting, then runs the organizer pipeline the way the orchestrator does
+(is_organized, create_category_dirs, organize_files, is_organized again) with a
+fake LLM classifier of configurable latency. For every phase it reports wall
+time, peak RSS, stat/scandir calls, read/write syscalls and LLM calls/tokens.
+
+Usage:
+    python -m src.benchmarks.organizer_benchmark --sizes 1k,100k --output organizer.json
+    python -m src.benchmarks.organizer_benchmark --baseline organizer.json --max-regression 0.2
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.file_organizer.inventory import FileInventory
+from src.file_organizer.organizer import create_category_dirs, is_organized, organize_files
+from src.llm.budget import BudgetGovernor, set_budget
+
+logger = logging.getLogger(__name__)
+
+# Number of files per tree size
+TREE_SIZES: Dict[str, int] = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Extension mix of a typical downloads/documents folder, with relative weights
+EXTENSIONS: List[Tuple[str, str, int]] = [
+    ('.pdf', 'documents', 14),
+    ('.docx', 'documents', 8),
+    ('.txt', 'documents', 8),
+    ('.xlsx', 'documents', 5),
+    ('.csv', 'documents', 5),
+    ('.pptx', 'documents', 3),
+    ('.jpg', 'images', 18),
+    ('.png', 'images', 10),
+    ('.jpeg', 'images', 4),
+    ('.gif', 'images', 2),
+    ('.py', 'code', 6),
+    ('.js', 'code', 4),
+    ('.html', 'code', 3),
+    ('.json', 'code', 3),
+    ('.zip', 'others', 3),
+    ('.mp4', 'others', 2),
+    ('.mp3', 'others', 1),
+    ('', 'others', 1),
+]
+
+CATEGORY_BY_EXTENSION = {extension: category for extension, category, _ in EXTENSIONS}
+
+class FakeClassifier:
+    """
+    Stand-in for the Gemini model used by classify_files.
+
+    Answers with a category per file name, derived from the extension, after
+    sleeping for a fixed latency plus a latency per 1,000 prompt tokens. Tokens are
+    estimated at four characters each.
+
+    Args:
+        latency (float): Seconds per request
+        latency_per_1k_tokens (float): Extra seconds per 1,000 prompt tokens
+    """
+
+    _FILE_PATTERN = re.compile(r"Filename: (.*?) Extension: ")
+
+    def __init__(self, latency: float = 0.0, latency_per_1k_tokens: float = 0.0):
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, generation_config=None):
+        names = self._FILE_PATTERN.findall(prompt)
+        text = json.dumps({name: CATEGORY_BY_EXTENSION.get(Path(name).suffix.lower(), 'others') for name in names})
+        input_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+        time.sleep(self.latency + self.latency_per_1k_tokens * input_tokens / 1000)
+        return _FakeResponse(text)
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {'llm_calls': self.calls, 'llm_input_tokens': self.input_tokens,
+                    'llm_output_tokens': self.output_tokens}
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+def generate_tree(root: Path, file_count: int, seed: int, max_file_size: int = 1024 * 1024) -> Path:
+    """
+    Create a Files/ tree with file_count uniquely named files.
+
+    Files are spread over nested folders (up to three levels, around 100 files
+    each) and get log-normally distributed sizes (median about 8 KB). Files are
+    created sparse, so generating large trees costs inodes rather than disk writes.
+
+    Args:
+        root (Path): Folder that receives the Files/ tree
+        file_count (int): Number of files
+        seed (int): Seed for names, extensions, sizes and nesting
+        max_file_size (int): Upper bound for a single file in bytes
+
+    Returns:
+        Path: The root folder
+    """
+    rng = random.Random(seed)
+    files_dir = root / 'Files'
+    directories = [files_dir]
+    for index in range(max(1, file_count // 100)):
+        parent = rng.choice(directories)
+        if len(parent.relative_to(files_dir).parts) >= 3:
+            parent = files_dir
+        directories.append(parent / f"folder_{index:05d}")
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    extensions = [extension for extension, _, _ in EXTENSIONS]
+    weights = [weight for _, _, weight in EXTENSIONS]
+    for index, extension in enumerate(rng.choices(extensions, weights, k=file_count)):
+        path = rng.choice(directories) / f"file_{index:07d}{extension}"
+        size = min(max_file_size, int(rng.lognormvariate(9, 1.5)))
+        with open(path, 'wb') as file:
+            file.truncate(size)
+    return root
+
+class _Probe:
+    """
+    Count stat/scandir calls and read process I/O and peak RSS around a phase.
+
+    os.DirEntry.stat() does not go through os.stat, so stats made while scanning
+    with os.scandir are not counted.
+    """
+
+    def __init__(self):
+        self.stat_calls = 0
+        self.scandir_calls = 0
+
+    @contextmanager
+    def patched(self) -> Iterator[None]:
+        original_stat, original_lstat, original_scandir = os.stat, os.lstat, os.scandir
+
+        def counting(func, attribute):
+            def wrapper(*args, **kwargs):
+                setattr(self, attribute, getattr(self, attribute) + 1)
+                return func(*args, **kwargs)
+            return wrapper
+
+        os.stat = counting(original_stat, 'stat_calls')
+        os.lstat = counting(original_lstat, 'stat_calls')
+        os.scandir = counting(original_scandir, 'scandir_calls')
+        try:
+            yield
+        finally:
+            os.stat, os.lstat, os.scandir = original_stat, original_lstat, original_scandir
+
+def _read_proc_io() -> Dict[str, int]:
+    try:
+        with open('/proc/self/io') as file:
+            return {key: int(value) for key, value in (line.split(': ') for line in file)}
+    except OSError:
+        return {}
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets VmHWM on Linux, so the peak can be measured per phase
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def measure_phase(func: Callable[[], object], classifier: FakeClassifier) -> Tuple[object, Dict[str, object]]:
+    """
+    Run one pipeline phase and collect its resource usage.
+
+    Returns:
+        Tuple[object, Dict[str, object]]: The phase's return value and its metrics
+    """
+    probe = _Probe()
+    per_phase_rss = _reset_peak_rss()
+    io_before = _read_proc_io()
+    llm_before = classifier.counters()
+
+    start = time.perf_counter()
+    with probe.patched():
+        result = func()
+    wall_time = time.perf_counter() - start
+
+    io_after = _read_proc_io()
+    llm_after = classifier.counters()
+    metrics: Dict[str, object] = {
+        'wall_time_s': round(wall_time, 4),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'peak_rss_per_phase': per_phase_rss,
+        'stat_calls': probe.stat_calls,
+        'scandir_calls': probe.scandir_calls,
+    }
+    for key in ('syscr', 'syscw', 'rchar', 'wchar'):
+        if key in io_before and key in io_after:
+            metrics[key] = io_after[key] - io_before[key]
+    for key, value in llm_after.items():
+        metrics[key] = value - llm_before[key]
+    return result, metrics
+
+def run_tree(size: str, seed: int, llm_latency: float, llm_latency_per_1k_tokens: float,
+             max_file_size: int, work_dir: Optional[Path] = None) -> Dict[str, object]:
+    """
+    Generate one tree and run the organizer pipeline over it.
+
+    Returns:
+        Dict[str, object]: Tree statistics and metrics per phase
+    """
+    classifier = FakeClassifier(llm_latency, llm_latency_per_1k_tokens)
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        root = Path(tmp)
+        start = time.perf_counter()
+        generate_tree(root, TREE_SIZES[size], seed, max_file_size)
+        generate_time = time.perf_counter() - start
+        folder = str(root)
+
+        phases = {}
+        before, phases['is_organized_before'] = measure_phase(lambda: is_organized(folder, classifier), classifier)
+        _, phases['create_category_dirs'] = measure_phase(lambda: create_category_dirs(root), classifier)
+        _, phases['organize_files'] = measure_phase(lambda: organize_files(folder, classifier), classifier)
+        after, phases['is_organized_after'] = measure_phase(lambda: is_organized(folder, classifier), classifier)
+
+        copied = FileInventory(root)
+        for category in ('Documents', 'Images', 'Code', 'Others'):
+            copied.add_tree(root / category)
+        return {
+            'files': TREE_SIZES[size],
+            'generate_time_s': round(generate_time, 3),
+            'files_copied': len(copied),
+            'bytes_copied': copied.total_size(),
+            'organized_before': before,
+            'organized_after': after,
+            'phases': phases,
+        }
+
+def check_regressions(report: Dict[str, object], baseline: Dict[str, object], max_regression: float,
+                      min_wall_time: float = 0.05) -> List[str]:
+    """
+    Compare a report with a baseline report.
+
+    A phase regresses if its wall time, peak RSS, stat calls or LLM input tokens
+    grow by more than max_regression (a fraction) relative to the baseline. Wall
+    times below min_wall_time seconds are too noisy to compare and are skipped.
+
+    Returns:
+        List[str]: Description of every regression found
+    """
+    regressions = []
+    for size, current in report['trees'].items():
+        previous = baseline.get('trees', {}).get(size)
+        if not previous:
+            continue
+        for phase, metrics in current['phases'].items():
+            previous_metrics = previous['phases'].get(phase, {})
+            for key in ('wall_time_s', 'peak_rss_mb', 'stat_calls', 'llm_input_tokens'):
+                if key == 'peak_rss_mb' and not (metrics.get('peak_rss_per_phase') and
+                                                 previous_metrics.get('peak_rss_per_phase')):
+                    continue
+                old, new = previous_metrics.get(key), metrics.get(key)
+                if key == 'wall_time_s' and max(old or 0, new or 0) < min_wall_time:
+                    continue
+                if old and new is not None and new > old * (1 + max_regression):
+                    regressions.append(f"{size}/{phase}: {key} {new} > baseline {old}")
+    return regressions
+
+def run_benchmark(sizes: List[str], seed: int, llm_latency: float, llm_latency_per_1k_tokens: float,
+                  max_file_size: int, work_dir: Optional[Path] = None) -> Dict[str, object]:
+    """
+    Run the organizer pipeline for every requested tree size.
+
+    Returns:
+        Dict[str, object]: Report with the configuration and one result per tree size
+    """
+    # The fake LLM costs nothing, so only the prompt size limit of the budget applies
+    set_budget(BudgetGovernor.unlimited())
+    trees = {}
+    for size in sizes:
+        logger.info(f"Running organizer pipeline on {size} files")
+        trees[size] = run_tree(size, seed, llm_latency, llm_latency_per_1k_tokens, max_file_size, work_dir)
+    return {
+        'config': {
+            'sizes': sizes,
+            'seed': seed,
+            'llm_latency_s': llm_latency,
+            'llm_latency_per_1k_tokens_s': llm_latency_per_1k_tokens,
+            'max_file_size': max_file_size,
+        },
+        'trees': trees,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark organize_files and is_organized on large trees")
+    parser.add_argument('--sizes', default='1k', help=f"comma separated tree sizes from {', '.join(TREE_SIZES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="fake LLM latency per request in seconds")
+    parser.add_argument('--llm-latency-per-1k-tokens', type=float, default=0.01,
+                        help="extra fake LLM latency per 1,000 prompt tokens")
+    parser.add_argument('--max-file-size', type=int, default=1024 * 1024, help="largest generated file in bytes")
+    parser.add_argument('--work-dir', type=Path, help="create the trees under this folder")
+    parser.add_argument('--output', type=Path, help="write the JSON report here")
+    parser.add_argument('--baseline', type=Path, help="fail if results regress against this report")
+    parser.add_argument('--max-regression', type=float, default=0.2, help="allowed regression as a fraction")
+    parser.add_argument('--min-wall-time', type=float, default=0.05, help="ignore wall times below this in seconds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    unknown = [size for size in args.sizes.split(',') if size not in TREE_SIZES]
+    if unknown:
+        parser.error(f"unknown tree sizes: {', '.join(unknown)}")
+    report = run_benchmark(args.sizes.split(','), args.seed, args.llm_latency, args.llm_latency_per_1k_tokens,
+                           args.max_file_size, args.work_dir)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+    if args.baseline:
+        regressions = check_regressions(report, json.loads(args.baseline.read_text()), args.max_regression,
+                                        args.min_wall_time)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
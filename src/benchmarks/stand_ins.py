@@ -0,0 +1,349 @@
+"""
+Local stand-in servers for the external services.
+
+The HTTP stand-ins speak just enough of the TinyPNG and ILovePDF APIs for the
+clients in src.compression to run against them. They echo the uploaded file back
+unchanged, add a configurable latency to every request and fail a configurable
+fraction of requests with a 500 error. The SMTP stand-in accepts mail for the
+todo mailer and keeps the delivered messages in memory.
+"""
+
+import abc
+import io
+import json
+import logging
+import random
+import socketserver
+import threading
+import time
+import uuid
+import zipfile
+from email import message_from_bytes
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class StandInServer(abc.ABC):
+    """
+    Base class running a ThreadingHTTPServer on a free localhost port in a background thread.
+
+    Args:
+        latency (float): Seconds added to every request
+        error_rate (float): Fraction of requests answered with a 500 error
+        seed (Optional[int]): Seed for the error generator
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def netloc(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def simulate(self) -> bool:
+        """
+        Apply the configured latency and decide whether this request fails.
+
+        Returns:
+            bool: True if the request should be answered with an error
+        """
+        with self._lock:
+            self.request_count += 1
+            fail = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        return fail
+
+    @abc.abstractmethod
+    def _handler_class(self):
+        """Request handler class bound to this stand-in."""
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    stand_in: StandInServer
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format % args)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def send(self, status: int, body: bytes = b'', headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status: int, data, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send(status, json.dumps(data).encode(), {'Content-Type': 'application/json', **(headers or {})})
+
+class TinifyStandIn(StandInServer):
+    """
+    Stand-in for the TinyPNG API (POST /shrink, GET /output/<id>).
+
+    Args:
+        compression_count (int): Compression count reported before the first upload
+        latency (float): Seconds added to every request
+        error_rate (float): Fraction of requests answered with a 500 error
+        seed (Optional[int]): Seed for the error generator
+    """
+
+    def __init__(self, compression_count: int = 0, **kwargs):
+        self.compression_count = compression_count
+        self.outputs: Dict[str, bytes] = {}
+        super().__init__(**kwargs)
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(_Handler):
+            def do_POST(self) -> None:
+                body = self.read_body()
+                if self.path != '/shrink':
+                    self.send_json(404, {'error': 'NotFound', 'message': self.path})
+                    return
+                count_header = {'Compression-Count': str(stand_in.compression_count)}
+                if not body:
+                    self.send_json(400, {'error': 'InputMissing', 'message': 'Input is empty'}, count_header)
+                    return
+                if stand_in.simulate():
+                    self.send_json(500, {'error': 'ServerError', 'message': 'Simulated failure'}, count_header)
+                    return
+                with stand_in._lock:
+                    stand_in.compression_count += 1
+                    output_id = uuid.uuid4().hex
+                    stand_in.outputs[output_id] = body
+                    count_header = {'Compression-Count': str(stand_in.compression_count)}
+                # Absolute location on the same server, like api.tinify.com
+                self.send_json(201, {'output': {'size': len(body)}},
+                               {'Location': f"{stand_in.base_url}/output/{output_id}", **count_header})
+
+            def do_GET(self) -> None:
+                stand_in.simulate()
+                data = stand_in.outputs.pop(self.path.rsplit('/', 1)[-1], None)
+                if data is None:
+                    self.send_json(404, {'error': 'NotFound', 'message': self.path})
+                    return
+                self.send(200, data, {'Content-Type': 'application/octet-stream'})
+
+        return Handler
+
+class ILovePdfStandIn(StandInServer):
+    """
+    Stand-in for the ILovePDF API (start, upload, process and download).
+
+    Multi-file tasks are downloaded as a zip archive, single-file tasks as the bare file.
+    """
+
+    def __init__(self, **kwargs):
+        self.tasks: Dict[str, Dict[str, bytes]] = {}
+        self.processed: Dict[str, List[dict]] = {}
+        super().__init__(**kwargs)
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(_Handler):
+            def do_GET(self) -> None:
+                fail = stand_in.simulate()
+                if fail:
+                    self.send_json(500, {'error': {'message': 'Simulated failure'}})
+                elif self.path.startswith('/v1/start/'):
+                    task = uuid.uuid4().hex
+                    with stand_in._lock:
+                        stand_in.tasks[task] = {}
+                    self.send_json(200, {'server': stand_in.netloc, 'task': task})
+                elif self.path.startswith('/v1/download/'):
+                    self._download(self.path.rsplit('/', 1)[-1])
+                else:
+                    self.send_json(404, {'error': {'message': self.path}})
+
+            def do_POST(self) -> None:
+                body = self.read_body()
+                if stand_in.simulate():
+                    self.send_json(500, {'error': {'message': 'Simulated failure'}})
+                elif self.path == '/v1/upload':
+                    self._upload(body)
+                elif self.path == '/v1/process':
+                    data = json.loads(body)
+                    stand_in.processed[data['task']] = data['files']
+                    self.send_json(200, {'status': 'TaskSuccess', 'filesize': 0, 'output_filesize': 0})
+                else:
+                    self.send_json(404, {'error': {'message': self.path}})
+
+            def _upload(self, body: bytes) -> None:
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+                )
+                fields = {
+                    part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                    for part in message.iter_parts()
+                }
+                task = fields['task'].decode()
+                server_filename = uuid.uuid4().hex
+                with stand_in._lock:
+                    stand_in.tasks[task][server_filename] = fields['file']
+                self.send_json(200, {'server_filename': server_filename})
+
+            def _download(self, task: str) -> None:
+                files = stand_in.processed.pop(task, [])
+                uploads = stand_in.tasks.pop(task, {})
+                if len(files) == 1:
+                    self.send(200, uploads[files[0]['server_filename']], {'Content-Type': 'application/pdf'})
+                    return
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, 'w') as archive:
+                    for file in files:
+                        archive.writestr(file['filename'], uploads[file['server_filename']])
+                self.send(200, buffer.getvalue(), {'Content-Type': 'application/zip'})
+
+        return Handler
+
+class SmtpStandIn:
+    """
+    Plain-text SMTP stand-in that accepts any AUTH PLAIN login and stores messages.
+
+    Args:
+        latency (float): Seconds added to every DATA command
+        error_rate (float): Fraction of messages rejected with a 451 error
+        max_messages_per_connection (Optional[int]): Close the connection after this
+            many messages, to simulate servers dropping long-lived sessions
+        seed (Optional[int]): Seed for the error generator
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0,
+                 max_messages_per_connection: Optional[int] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_messages_per_connection = max_messages_per_connection
+        self.connections = 0
+        self.logins = 0
+        self.messages: List[dict] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'SmtpStandIn':
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'SmtpStandIn':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str) -> None:
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self) -> None:
+                with stand_in._lock:
+                    stand_in.connections += 1
+                sent = 0
+                sender, recipients = None, []
+                self.reply('220 stand-in ESMTP')
+                while True:
+                    raw = self.rfile.readline()
+                    if not raw:
+                        return
+                    command = raw.decode(errors='replace').strip()
+                    verb = command.split(' ', 1)[0].upper()
+                    if verb == 'EHLO':
+                        self.reply('250-stand-in')
+                        self.reply('250 AUTH PLAIN')
+                    elif verb == 'HELO':
+                        self.reply('250 stand-in')
+                    elif verb == 'AUTH':
+                        with stand_in._lock:
+                            stand_in.logins += 1
+                        self.reply('235 Authentication successful')
+                    elif verb == 'MAIL':
+                        sender, recipients = command.split(':', 1)[1].strip(' <>'), []
+                        self.reply('250 OK')
+                    elif verb == 'RCPT':
+                        recipients.append(command.split(':', 1)[1].strip(' <>'))
+                        self.reply('250 OK')
+                    elif verb == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        lines = []
+                        for line in iter(self.rfile.readline, b''):
+                            if line in (b'.\r\n', b'.\n'):
+                                break
+                            lines.append(line[1:] if line.startswith(b'..') else line)
+                        if stand_in.latency:
+                            time.sleep(stand_in.latency)
+                        with stand_in._lock:
+                            fail = stand_in._random.random() < stand_in.error_rate
+                        if fail:
+                            self.reply('451 Simulated failure')
+                            continue
+                        with stand_in._lock:
+                            stand_in.messages.append({
+                                'from': sender,
+                                'to': recipients,
+                                'message': message_from_bytes(b''.join(lines)),
+                            })
+                        self.reply('250 OK queued')
+                        sent += 1
+                        if stand_in.max_messages_per_connection and sent >= stand_in.max_messages_per_connection:
+                            return
+                    elif verb in ('RSET', 'NOOP'):
+                        self.reply('250 OK')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+        return Handler
+
@@ -0,0 +1,266 @@
+"""
+Batched ILovePDF compression that reuses one authenticated client for many files.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import httpx
+from iloveapi import ILoveApi
+from iloveapi.auth import TokenAuth
+
+logger = logging.getLogger(__name__)
+
+class _RedirectTransport(httpx.HTTPTransport):
+    """
+    HTTP transport that sends every request to a fixed base URL.
+
+    ILovePDF endpoints are hardcoded to https hosts, so this is how the client is
+    pointed at a local stand-in server.
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self._base_url = httpx.URL(base_url)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme=self._base_url.scheme,
+            host=self._base_url.host,
+            port=self._base_url.port,
+        )
+        request.headers['Host'] = self._base_url.netloc.decode('ascii')
+        return super().handle_request(request)
+
+class _SessionApi(ILoveApi):
+    """
+    ILoveApi client with configurable timeout and optional base URL override.
+
+    ILoveApi keeps its open client in a ContextVar, which other threads do not
+    see. This client is held on the instance instead, so every thread uses the
+    same connection pool while the client is open. httpx.Client is thread-safe.
+    """
+
+    def __init__(self, *, public_key: str, secret_key: str, timeout: float, api_base: Optional[str] = None):
+        super().__init__(public_key=public_key, secret_key=secret_key)
+        self._timeout = timeout
+        self._api_base = api_base
+        self._auth = TokenAuth(public_key, secret_key)
+        self._shared_client: Optional[httpx.Client] = None
+        self._users = 0
+        self._lock = threading.Lock()
+
+    def open(self) -> httpx.Client:
+        """
+        Open the shared client, or count one more user of the already open one.
+        """
+        with self._lock:
+            if self._shared_client is None:
+                self._shared_client = self._create_sync_client()
+            self._users += 1
+            return self._shared_client
+
+    def close(self) -> None:
+        """
+        Drop one user of the shared client and close it when the last one is gone.
+        """
+        with self._lock:
+            self._users -= 1
+            if self._users <= 0 and self._shared_client is not None:
+                self._shared_client.close()
+                self._shared_client = None
+                self._users = 0
+
+    @property
+    def shared_client(self) -> Optional[httpx.Client]:
+        with self._lock:
+            return self._shared_client
+
+    @contextmanager
+    def get_sync_client(self) -> Iterator[httpx.Client]:
+        # Count as a user while the request runs so a concurrent close() cannot close it
+        with self._lock:
+            client = self._shared_client
+            if client is not None:
+                self._users += 1
+        if client is None:
+            with super().get_sync_client() as client:
+                yield client
+            return
+        try:
+            yield client
+        finally:
+            self.close()
+
+    def _create_sync_client(self) -> httpx.Client:
+        transport = _RedirectTransport(self._api_base) if self._api_base else None
+        # One TokenAuth for the whole session so the signed token is reused
+        return httpx.Client(auth=self._auth, timeout=self._timeout, transport=transport)
+
+class ILovePdfSession:
+    """
+    Compress many PDFs through ILovePDF with one client and one task per batch.
+
+    Use it as a context manager so that the underlying HTTP connection and the
+    auth token are shared by every request in the session:
+
+        with ILovePdfSession() as session:
+            results = session.compress(pdf_paths)
+
+    Args:
+        public_key (Optional[str]): ILovePDF public key, defaults to PDF_COMPRESSION_API_KEY_PUBLIC
+        secret_key (Optional[str]): ILovePDF secret key, defaults to PDF_COMPRESSION_API_KEY_SECRET
+        batch_size (Optional[int]): Files per compress task, defaults to PDF_BATCH_SIZE or 10
+        timeout (Optional[float]): HTTP timeout in seconds, defaults to PDF_TIMEOUT_SECONDS or 120
+        api_base (Optional[str]): Base URL override, defaults to ILOVEPDF_API_BASE if set
+    """
+
+    def __init__(self, public_key: Optional[str] = None, secret_key: Optional[str] = None,
+                 batch_size: Optional[int] = None, timeout: Optional[float] = None,
+                 api_base: Optional[str] = None):
+        public_key = public_key or os.getenv('PDF_COMPRESSION_API_KEY_PUBLIC')
+        secret_key = secret_key or os.getenv('PDF_COMPRESSION_API_KEY_SECRET')
+        if not public_key or not secret_key:
+            raise ValueError("Missing API keys for PDF compression service")
+
+        self.batch_size = batch_size or int(os.getenv('PDF_BATCH_SIZE', '10'))
+        self.timeout = timeout or float(os.getenv('PDF_TIMEOUT_SECONDS', '120'))
+        self._client = _SessionApi(
+            public_key=public_key,
+            secret_key=secret_key,
+            timeout=self.timeout,
+            api_base=api_base or os.getenv('ILOVEPDF_API_BASE'),
+        )
+
+    def __enter__(self) -> 'ILovePdfSession':
+        self._client.open()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._client.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self._client.shared_client is not None
+
+    def reuses_client(self) -> bool:
+        """
+        Check that requests made from the calling thread go through the open shared client.
+        """
+        if not self.is_open:
+            return False
+        with self._client.get_sync_client() as client:
+            return client is self._client.shared_client
+
+    def compress(self, file_paths: List[Path],
+                 latencies: Optional[Dict[Path, float]] = None) -> Dict[Path, Optional[Path]]:
+        """
+        Compress PDFs in batches of batch_size files per ILovePDF task.
+
+        A failed batch marks only its own files as failed.
+
+        Args:
+            file_paths (List[Path]): PDF files to compress
+            latencies (Optional[Dict[Path, float]]): Filled with the seconds from the start of
+                each file's batch until it was compressed or failed, if given
+
+        Returns:
+            Dict[Path, Optional[Path]]: Mapping of each PDF to its compressed file, None on failure
+        """
+        # Reuses the client if the session is already open, e.g. warmed by the job server
+        with self:
+            return self._compress_batches(file_paths, {} if latencies is None else latencies)
+
+    def _compress_batches(self, file_paths: List[Path], latencies: Dict[Path, float]) -> Dict[Path, Optional[Path]]:
+        results: Dict[Path, Optional[Path]] = {}
+        for i in range(0, len(file_paths), self.batch_size):
+            batch = file_paths[i:i + self.batch_size]
+            start = time.perf_counter()
+            try:
+                results.update(self._compress_batch(batch))
+            except Exception as e:
+                logger.error(f"Error compressing PDF batch of {len(batch)} files: {str(e)}")
+                results.update({file_path: None for file_path in batch})
+            elapsed = time.perf_counter() - start
+            latencies.update({file_path: elapsed for file_path in batch})
+        return results
+
+    def _compress_batch(self, batch: List[Path]) -> Dict[Path, Optional[Path]]:
+        """
+        Upload a batch into one compress task, process it and download the result once.
+        """
+        rest = self._client.rest
+        start_response = rest.start('compress')
+        start_response.raise_for_status()
+        task_json = start_response.json()
+        server, task = task_json['server'], task_json['task']
+
+        # Output names double as zip member names, so keep them unique within the batch
+        targets: Dict[str, Path] = {}
+        process_files = []
+        for index, file_path in enumerate(batch):
+            compressed_path = file_path.parent / f"{file_path.stem}_compressed.pdf"
+            output_name = compressed_path.name
+            if output_name in targets:
+                output_name = f"{index}_{output_name}"
+            targets[output_name] = compressed_path
+
+            with open(file_path, 'rb') as file:
+                upload_response = rest.upload(server, task, file)
+            upload_response.raise_for_status()
+            process_files.append({
+                'server_filename': upload_response.json()['server_filename'],
+                'filename': output_name,
+            })
+
+        rest.process(server, task, 'compress', process_files).raise_for_status()
+        written = self._download(server, task, targets)
+
+        logger.info(f"Compressed batch of {len(batch)} PDFs in task {task}")
+        return {
+            file_path: (targets[name] if name in written else None)
+            for file_path, name in zip(batch, targets)
+        }
+
+    def _download(self, server: str, task: str, targets: Dict[str, Path]) -> List[str]:
+        """
+        Stream the task output to a temporary file and extract it to the target paths.
+
+        ILovePDF returns a zip archive for multi-file tasks and the bare PDF otherwise.
+
+        Returns:
+            List[str]: Output names that were written
+        """
+        written = []
+        with self._client.get_sync_client() as http, tempfile.TemporaryFile() as buffer:
+            with http.stream('GET', f"https://{server}/v1/download/{task}") as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    buffer.write(chunk)
+            buffer.seek(0)
+
+            if zipfile.is_zipfile(buffer):
+                buffer.seek(0)
+                with zipfile.ZipFile(buffer) as archive:
+                    for member in archive.infolist():
+                        target = targets.get(Path(member.filename).name)
+                        if target is None:
+                            logger.warning(f"Unexpected file in ILovePDF output: {member.filename}")
+                            continue
+                        with archive.open(member) as source, open(target, 'wb') as output:
+                            shutil.copyfileobj(source, output)
+                        written.append(Path(member.filename).name)
+            else:
+                buffer.seek(0)
+                name, target = next(iter(targets.items()))
+                with open(target, 'wb') as output:
+                    shutil.copyfileobj(buffer, output)
+                written.append(name)
+        return written
@@ -2,69 +2,88 @@
 Image compression module that interfaces with TinyPNG compression service.
 """
 
+import io
 import logging
 import os
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 import tinify
+from PIL import Image
+from src.compression.ledger import CompressionLedger
+from src.compression.results import CompressionResult, NoGain, outcome
+from src.compression.tinify_session import QuotaExceededError, TinifySession
+from src.file_organizer.inventory import FileInventory
+from src.monitoring.metrics import TINYPNG_REMAINING, record_compression
 
 logger = logging.getLogger(__name__)
 
-def initialize_tinify() -> bool:
+# Image formats TinyPNG accepts
+SUPPORTED_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_session: Optional[TinifySession] = None
+
+def get_tinify_session() -> Optional[TinifySession]:
     """
-    Initialize the TinyPNG API client.
+    Get the TinyPNG session shared by every compression in this process.
+
+    The session is created on first use so the API key is read and the
+    connection pool is set up only once.
 
     Returns:
-        bool: True if initialization successful, False otherwise
+        Optional[TinifySession]: Shared session if the API key is configured, None otherwise
     """
-    api_key = os.getenv('IMAGE_COMPRESSION_API_KEY')
-    if not api_key:
-        logger.warning("No API key provided for image compression service")
-        return False
-    
-    try:
-        tinify.key = api_key
-        return True
-    except Exception as e:
-        logger.error(f"Error initializing TinyPNG: {str(e)}")
-        return False
+    global _session
+    if _session is None:
+        try:
+            _session = TinifySession()
+        except ValueError as e:
+            logger.warning(str(e))
+            return None
+    return _session
 
-def compress_image(file_path: Path) -> Optional[Path]:
+def compress_image(file_path: Path, target_size_kb: Optional[int] = None) -> CompressionResult:
     """
     Compress an image file using TinyPNG service.
 
+    If a target size is given (or set through the IMAGE_TARGET_SIZE_KB environment
+    variable) the image is compressed locally to fit that byte budget instead.
+
     Args:
         file_path (Path): Path to the image file to compress
+        target_size_kb (Optional[int]): Size budget in KB for the compressed image
 
     Returns:
-        Optional[Path]: Path to the compressed file if successful, None otherwise
+        CompressionResult: Path to the compressed file, NoGain if the original was kept,
+        None on failure
     """
     if not is_supported_image(file_path):
         logger.warning(f"Unsupported image format: {file_path}")
         return None
-    
-    if not initialize_tinify():
+
+    # Skip if file name contains 'compressed'
+    if 'compressed' in file_path.stem.lower():
+        logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
         return None
 
-    try:
-        # Create compressed filename
-        name = file_path.stem
-        
-        # Skip if file name contains 'compressed'
-        if 'compressed' in name.lower():
-            logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
-            return None
-        
-        suffix = file_path.suffix
-        compressed_path = file_path.parent / f"{name}_compressed{suffix}"
+    if target_size_kb is None:
+        target_size_kb = get_target_size_kb()
+    if target_size_kb:
+        compressed_path = compress_image_to_target(file_path, target_size_kb * 1024)
+        record_compression('image', 'target_size', file_path, compressed_path)
+        return compressed_path
 
-        # Compress using TinyPNG
-        source = tinify.from_file(str(file_path))
-        source.to_file(str(compressed_path))
+    session = get_tinify_session()
+    if not session:
+        return None
 
-        logger.info(f"Compressed image saved to: {compressed_path}")
-        return compressed_path
+    compressed_path = None
+    try:
+        # Compress using the shared TinyPNG session
+        compressed_path = session.compress_file(file_path)
 
+    except QuotaExceededError as e:
+        logger.warning(f"Skipping {file_path.name}: {str(e)}")
     except tinify.AccountError as e:
         logger.error(f"TinyPNG account error: {str(e)}")
     except tinify.ClientError as e:
@@ -76,7 +95,88 @@ def compress_image(file_path: Path) -> Optional[Path]:
     except Exception as e:
         logger.error(f"Error compressing image {file_path}: {str(e)}")
     
-    return None
+    record_compression('image', 'tinypng', file_path, compressed_path)
+    TINYPNG_REMAINING.set(session.remaining())
+    return compressed_path
+
+def compress_images(file_paths: Iterable[Path], target_size_kb: Optional[int] = None,
+                    ledger: Optional[CompressionLedger] = None) -> Dict[Path, CompressionResult]:
+    """
+    Compress a batch of images, uploading to TinyPNG concurrently.
+
+    Args:
+        file_paths (Iterable[Path]): Image files to compress
+        target_size_kb (Optional[int]): Size budget in KB, compresses locally when set
+        ledger (Optional[CompressionLedger]): Ledger deciding what to skip and recording results
+
+    Returns:
+        Dict[Path, CompressionResult]: Mapping of each image to its compressed file, NoGain if
+        the original was kept, None on failure
+    """
+    results = _compress_image_chunk(file_paths, target_size_kb, ledger)
+    if ledger:
+        ledger.save()
+    return results
+
+def compress_inventory_images(inventory: FileInventory, target_size_kb: Optional[int] = None,
+                              ledger: Optional[CompressionLedger] = None) -> Dict[str, int]:
+    """
+    Compress every supported image of an inventory, one chunk of files at a time.
+
+    Args:
+        inventory (FileInventory): Files to compress, unsupported formats are ignored
+        target_size_kb (Optional[int]): Size budget in KB, compresses locally when set
+        ledger (Optional[CompressionLedger]): Ledger deciding what to skip and recording results
+
+    Returns:
+        Dict[str, int]: Number of images per outcome ('ok', 'no_gain', 'failed', 'skipped')
+    """
+    counts = dict.fromkeys(['ok', 'no_gain', 'failed', 'skipped'], 0)
+    for chunk in inventory.path_chunks(SUPPORTED_EXTENSIONS):
+        results = _compress_image_chunk(chunk, target_size_kb, ledger)
+        counts['skipped'] += len(chunk) - len(results)
+        for compressed_path in results.values():
+            counts[outcome(compressed_path)] += 1
+    if ledger:
+        ledger.save()
+    logger.info(f"Image compression finished: {counts}")
+    return counts
+
+def _compress_image_chunk(file_paths: Iterable[Path], target_size_kb: Optional[int],
+                          ledger: Optional[CompressionLedger]) -> Dict[Path, CompressionResult]:
+    """
+    Compress a batch of images and record the results, without saving the ledger.
+    """
+    image_paths = []
+    for file_path in file_paths:
+        if not is_supported_image(file_path):
+            logger.warning(f"Unsupported image format: {file_path}")
+        elif ledger:
+            if ledger.should_compress(file_path):
+                image_paths.append(file_path)
+        elif 'compressed' in file_path.stem.lower():
+            logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
+        else:
+            image_paths.append(file_path)
+
+    if target_size_kb is None:
+        target_size_kb = get_target_size_kb()
+    if target_size_kb:
+        backend = 'target_size'
+        results = {file_path: compress_image_to_target(file_path, target_size_kb * 1024) for file_path in image_paths}
+    else:
+        backend = 'tinypng'
+        session = get_tinify_session()
+        if not session:
+            return {file_path: None for file_path in image_paths}
+        results = session.compress_many(image_paths)
+        TINYPNG_REMAINING.set(session.remaining())
+
+    for file_path, compressed_path in results.items():
+        record_compression('image', backend, file_path, compressed_path)
+        if ledger:
+            ledger.record(file_path, compressed_path, backend)
+    return results
 
 def is_supported_image(file_path: Path) -> bool:
     """
@@ -88,5 +188,161 @@ def is_supported_image(file_path: Path) -> bool:
     Returns:
         bool: True if the file is a supported image format, False otherwise
     """
-    supported_extensions = {'.jpg', '.jpeg', '.png'}
-    return file_path.suffix.lower() in supported_extensions 
\ No newline at end of file
+    return file_path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+def get_target_size_kb() -> Optional[int]:
+    """
+    Read the image size budget from the IMAGE_TARGET_SIZE_KB environment variable.
+
+    Returns:
+        Optional[int]: Target size in KB if configured, None otherwise
+    """
+    value = os.getenv('IMAGE_TARGET_SIZE_KB')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid IMAGE_TARGET_SIZE_KB value: {value}")
+        return None
+
+def compress_image_to_target(file_path: Path, target_bytes: int, min_quality: int = 30,
+                             max_quality: int = 95, min_scale: float = 0.1,
+                             tolerance: float = 0.9) -> CompressionResult:
+    """
+    Compress an image locally so that it fits into a byte budget.
+
+    The image is decoded once. Encoder quality (palette size for PNGs) is binary searched
+    in memory and, if even the lowest quality is too large, the image is downscaled as well.
+    The search stops as soon as a candidate lands between tolerance * target_bytes and
+    target_bytes. Only the final result is written to disk.
+
+    Args:
+        file_path (Path): Path to the image file to compress
+        target_bytes (int): Maximum size of the compressed image in bytes
+        min_quality (int): Lowest encoder quality to try
+        max_quality (int): Highest encoder quality to try
+        min_scale (float): Smallest downscale factor to try
+        tolerance (float): Fraction of the budget that is good enough to stop searching
+
+    Returns:
+        CompressionResult: Path to the compressed file, NoGain if the result is not smaller
+        than the original, None if nothing fits the budget or on error
+    """
+    start = time.perf_counter()
+    try:
+        with Image.open(file_path) as image:
+            image.load()
+            image_format = 'JPEG' if file_path.suffix.lower() in {'.jpg', '.jpeg'} else 'PNG'
+            if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            elif image_format == 'PNG' and image.mode not in ('RGB', 'RGBA'):
+                # LA and PA carry an alpha channel just like RGBA, keep it
+                has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        data, quality, scale, iterations = _search_target_size(
+            image, image_format, target_bytes, min_quality, max_quality, min_scale, tolerance
+        )
+        elapsed = time.perf_counter() - start
+
+        if data is None:
+            logger.warning(f"Could not fit {file_path.name} into {target_bytes / 1024:.2f}KB "
+                           f"({iterations} iterations, {elapsed:.2f}s)")
+            return None
+
+        original_bytes = file_path.stat().st_size
+        if len(data) >= original_bytes:
+            logger.info(f"Keeping original {file_path.name}, the best encoding within "
+                        f"{target_bytes / 1024:.2f}KB is not smaller ({len(data) / 1024:.2f}KB)")
+            return NoGain(len(data))
+
+        compressed_path = file_path.parent / f"{file_path.stem}_compressed{file_path.suffix}"
+        compressed_path.write_bytes(data)
+
+        original_size = original_bytes / 1024  # KB
+        compressed_size = len(data) / 1024  # KB
+        logger.info(f"Compressed {file_path.name} to target: {original_size:.2f}KB -> {compressed_size:.2f}KB "
+                    f"(quality={quality}, scale={scale:.2f}, {iterations} iterations, {elapsed:.2f}s)")
+        return compressed_path
+
+    except Exception as e:
+        logger.error(f"Error compressing image {file_path} to target size: {str(e)}")
+        return None
+
+def _search_target_size(image: Image.Image, image_format: str, target_bytes: int, min_quality: int,
+                        max_quality: int, min_scale: float,
+                        tolerance: float) -> Tuple[Optional[bytes], int, float, int]:
+    """
+    Binary search quality and then downscale factor for the largest encoding within budget.
+
+    Returns:
+        Tuple[Optional[bytes], int, float, int]: Encoded bytes (None if nothing fits),
+        chosen quality, chosen scale and number of encode iterations
+    """
+    iterations = 0
+    resized = {1.0: image}
+
+    def encode(quality: int, scale: float) -> bytes:
+        nonlocal iterations
+        iterations += 1
+        if scale not in resized:
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            resized[scale] = image.resize(size, Image.LANCZOS)
+        return _encode_image(resized[scale], image_format, quality)
+
+    def good_enough(data: bytes) -> bool:
+        return tolerance * target_bytes <= len(data) <= target_bytes
+
+    # Best case: highest quality already fits, nothing to search
+    data = encode(max_quality, 1.0)
+    if len(data) <= target_bytes:
+        return data, max_quality, 1.0, iterations
+
+    best: Tuple[Optional[bytes], int, float] = (None, min_quality, 1.0)
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(quality, 1.0)
+        if len(data) <= target_bytes:
+            best = (data, quality, 1.0)
+            if good_enough(data):
+                break
+            low = quality + 1
+        else:
+            high = quality - 1
+    if best[0] is not None:
+        return best[0], best[1], best[2], iterations
+
+    # Even the lowest quality is too large, so shrink the image at that quality
+    low_scale, high_scale = min_scale, 1.0
+    for _ in range(8):
+        scale = round((low_scale + high_scale) / 2, 3)
+        data = encode(min_quality, scale)
+        if len(data) <= target_bytes:
+            best = (data, min_quality, scale)
+            if good_enough(data):
+                break
+            low_scale = scale
+        else:
+            high_scale = scale
+    if best[0] is None:
+        data = encode(min_quality, min_scale)
+        if len(data) <= target_bytes:
+            best = (data, min_quality, min_scale)
+    return best[0], best[1], best[2], iterations
+
+def _encode_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    """
+    Encode an image in memory at the given quality.
+
+    For PNGs the quality is mapped onto the palette size used for quantization.
+    """
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.save(buffer, format='JPEG', quality=quality, optimize=True)
+    else:
+        colors = max(2, min(256, round(256 * quality / 100)))
+        quantized = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+        quantized.save(buffer, format='PNG')
+    return buffer.getvalue()
@@ -0,0 +1,199 @@
+"""
+Persistent, content-addressed record of compressed files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+from src.compression.results import CompressionResult, NoGain
+from src.monitoring.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILE_NAME = '.compression_ledger.json'
+
+class CompressionLedger:
+    """
+    Track which inputs have been compressed, keyed by the SHA-256 of their content.
+
+    Each entry stores the compressed output, its hash, the savings and the backend
+    used. Inputs whose output was not smaller get an entry without output, so they
+    are not compressed again while their content is unchanged. Hashes of outputs are indexed as well, so a compressed file is recognised
+    even after it has been renamed. A small path index (size, mtime, hash) avoids
+    re-hashing unchanged files on every run.
+
+    Args:
+        ledger_path (Path): JSON file the ledger is stored in
+        min_savings_pct (Optional[float]): Inputs known to shrink by less than this are
+            skipped, defaults to COMPRESSION_MIN_SAVINGS_PCT or 5
+    """
+
+    def __init__(self, ledger_path: Path, min_savings_pct: Optional[float] = None):
+        self.ledger_path = Path(ledger_path)
+        if min_savings_pct is None:
+            min_savings_pct = float(os.getenv('COMPRESSION_MIN_SAVINGS_PCT', '5'))
+        self.min_savings_pct = min_savings_pct
+
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.outputs: Dict[str, str] = {}
+        self.paths: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    @classmethod
+    def for_folder(cls, folder_path: str, min_savings_pct: Optional[float] = None) -> 'CompressionLedger':
+        """
+        Open the ledger stored in the root of a working folder.
+
+        The file name starts with a dot so the organizer does not pick it up.
+
+        Args:
+            folder_path (str): Root folder, e.g. My_Folder
+            min_savings_pct (Optional[float]): See CompressionLedger
+
+        Returns:
+            CompressionLedger: Ledger for the folder
+        """
+        return cls(Path(folder_path) / LEDGER_FILE_NAME, min_savings_pct)
+
+    def _load(self) -> None:
+        if not self.ledger_path.exists():
+            return
+        try:
+            with open(self.ledger_path, 'r') as file:
+                data = json.load(file)
+            self.entries = data.get('entries', {})
+            self.outputs = data.get('outputs', {})
+            self.paths = data.get('paths', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable compression ledger {self.ledger_path}: {str(e)}")
+
+    def save(self) -> None:
+        """
+        Write the ledger to disk atomically.
+        """
+        data = {'entries': self.entries, 'outputs': self.outputs, 'paths': self.paths}
+        tmp_path = self.ledger_path.with_name(self.ledger_path.name + '.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file, indent=2)
+        os.replace(tmp_path, self.ledger_path)
+
+    def file_hash(self, file_path: Path) -> str:
+        """
+        Get the SHA-256 of a file, reusing the cached hash if size and mtime are unchanged.
+
+        Args:
+            file_path (Path): File to hash
+
+        Returns:
+            str: Hex digest of the file content
+        """
+        stat = file_path.stat()
+        key = str(file_path.resolve())
+        cached = self.paths.get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['hash']
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+
+        if cached and cached['hash'] in self.entries:
+            logger.info(f"{file_path.name} changed since it was last compressed, its output is stale")
+        self.paths[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_hash}
+        return file_hash
+
+    def should_compress(self, file_path: Path) -> bool:
+        """
+        Decide whether a file needs to be sent to a compression backend.
+
+        Files are skipped if they are a known compressed output, if their current
+        content was already compressed and the output is still intact, or if they are
+        known to compress by less than min_savings_pct or not at all. Files the ledger has never seen
+        are skipped if their name marks them as the output of a run before the ledger.
+
+        Args:
+            file_path (Path): Candidate file
+
+        Returns:
+            bool: True if the file should be compressed, False otherwise
+        """
+        compress = self._should_compress(file_path)
+        CACHE_LOOKUPS.inc(cache='compression_ledger', result='miss' if compress else 'hit')
+        return compress
+
+    def _should_compress(self, file_path: Path) -> bool:
+        file_hash = self.file_hash(file_path)
+
+        if file_hash in self.outputs:
+            logger.info(f"Skipping {file_path.name} as it is a compressed output")
+            return False
+
+        entry = self.entries.get(file_hash)
+        if entry is None:
+            # *_compressed files left by runs before the ledger existed
+            if 'compressed' in file_path.stem.lower():
+                logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
+                return False
+            return True
+
+        if entry['output'] is None:
+            logger.info(f"Skipping {file_path.name} as compressing it did not make it smaller")
+            return False
+
+        if entry['savings_pct'] < self.min_savings_pct:
+            logger.info(f"Skipping {file_path.name} as it only compresses by {entry['savings_pct']:.1f}%")
+            return False
+
+        output_path = Path(entry['output'])
+        if output_path.exists() and self.file_hash(output_path) == entry['output_hash']:
+            logger.info(f"Skipping {file_path.name} as it is already compressed to {output_path.name}")
+            return False
+
+        logger.info(f"Compressed output of {file_path.name} is missing or modified, compressing again")
+        return True
+
+    def record(self, file_path: Path, compressed_path: CompressionResult, backend: str) -> None:
+        """
+        Record the result of compressing a file.
+
+        Failures are not recorded, so the file is tried again on the next run.
+
+        Args:
+            file_path (Path): Original file
+            compressed_path (CompressionResult): Compressed file, NoGain if the output was
+                not smaller and discarded, None if compression failed
+            backend (str): Name of the backend that produced the output
+        """
+        if isinstance(compressed_path, NoGain):
+            output_hash, compressed_size = None, compressed_path.attempted_size
+        elif compressed_path is not None and compressed_path.exists():
+            output_hash, compressed_size = self.file_hash(compressed_path), compressed_path.stat().st_size
+        else:
+            return
+
+        file_hash = self.file_hash(file_path)
+        original_size = file_path.stat().st_size
+        savings = ((original_size - compressed_size) / original_size) * 100 if original_size else 0.0
+
+        previous = self.entries.get(file_hash)
+        if previous:
+            self.outputs.pop(previous['output_hash'], None)
+
+        self.entries[file_hash] = {
+            'source': str(file_path),
+            'output': str(compressed_path) if output_hash else None,
+            'output_hash': output_hash,
+            'original_size': original_size,
+            'compressed_size': compressed_size,
+            'savings_pct': round(savings, 2),
+            'backend': backend,
+            'compressed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if output_hash:
+            self.outputs[output_hash] = file_hash
@@ -0,0 +1,73 @@
+"""
+Offline PDF compression backend built on pypdf.
+"""
+
+import logging
+from pathlib import Path
+from pypdf import PdfReader, PdfWriter
+from src.compression.results import CompressionResult, NoGain
+
+logger = logging.getLogger(__name__)
+
+def compress_pdf_locally(file_path: Path, image_quality: int = 60, max_image_dim: int = 1600) -> CompressionResult:
+    """
+    Compress a PDF file locally without uploading it anywhere.
+
+    Content streams are recompressed with maximum zlib level, embedded images larger
+    than max_image_dim are downsampled and re-encoded as JPEG, and duplicate or orphaned
+    objects are removed before writing the result next to the original.
+
+    This function is run inside worker processes, so it only takes picklable arguments.
+
+    Args:
+        file_path (Path): Path to the PDF file to compress
+        image_quality (int): JPEG quality for downsampled images
+        max_image_dim (int): Longest side in pixels kept for embedded images
+
+    Returns:
+        CompressionResult: Path to the compressed file, NoGain if it was not smaller than
+        the original and was discarded, None on error
+    """
+    try:
+        compressed_path = file_path.parent / f"{file_path.stem}_compressed.pdf"
+        writer = PdfWriter(clone_from=PdfReader(str(file_path)))
+
+        for page in writer.pages:
+            _downsample_page_images(page, image_quality, max_image_dim)
+            page.compress_content_streams(level=9)
+
+        writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+        with open(compressed_path, 'wb') as output:
+            writer.write(output)
+
+        # Already optimized PDFs can grow when rewritten, keep the original then
+        compressed_size = compressed_path.stat().st_size
+        if compressed_size >= file_path.stat().st_size:
+            compressed_path.unlink()
+            return NoGain(compressed_size)
+
+        return compressed_path
+
+    except Exception as e:
+        logger.error(f"Error compressing PDF {file_path} locally: {str(e)}")
+        return None
+
+def _downsample_page_images(page, image_quality: int, max_image_dim: int) -> None:
+    """
+    Downsample the oversized images embedded in a page in place.
+
+    Images with transparency are left untouched because JPEG cannot keep their alpha channel.
+    """
+    for image_file in page.images:
+        try:
+            image = image_file.image
+            if image is None or max(image.size) <= max_image_dim:
+                continue
+            if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+                continue
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.thumbnail((max_image_dim, max_image_dim))
+            image_file.replace(image, quality=image_quality)
+        except Exception as e:
+            logger.debug(f"Skipping image {image_file.name}: {str(e)}")
@@ -1,15 +1,27 @@
 """
-PDF compression module that interfaces with ILovePDF compression service.
+PDF compression module that interfaces with ILovePDF compression service
+and falls back to a local pypdf backend for smaller files.
 """
 
 import logging
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from iloveapi import ILoveApi
+from src.compression.ilovepdf_session import ILovePdfSession
+from src.compression.ledger import CompressionLedger
+from src.compression.local_pdf_compressor import compress_pdf_locally
+from src.compression.results import CompressionResult, NoGain, outcome
+from src.file_organizer.inventory import FileInventory
+from src.monitoring.metrics import record_compression
 
 logger = logging.getLogger(__name__)
 
+_session: Optional[ILovePdfSession] = None
+
 def initialize_ilovepdf() -> Optional[ILoveApi]:
     """
     Initialize the ILovePDF API client.
@@ -34,25 +46,205 @@ def initialize_ilovepdf() -> Optional[ILoveApi]:
         logger.error(f"Error initializing ILovePDF client: {str(e)}")
         return None
 
-def compress_pdf(file_path: Path) -> Optional[Path]:
+def get_ilovepdf_session() -> Optional[ILovePdfSession]:
     """
-    Compress a PDF file using ILovePDF service.
+    Get the ILovePDF session shared by every PDF batch in this process.
+
+    Long-running callers can open it once (``get_ilovepdf_session().__enter__()``)
+    to keep its HTTP connection and auth token between batches, in every thread.
+
+    Returns:
+        Optional[ILovePdfSession]: Shared session if the API keys are configured, None otherwise
+    """
+    global _session
+    if _session is None:
+        try:
+            _session = ILovePdfSession()
+        except ValueError as e:
+            logger.warning(str(e))
+    return _session
+
+def get_local_threshold_kb() -> int:
+    """
+    Read the size threshold below which PDFs are compressed locally.
+
+    The threshold comes from the PDF_LOCAL_MAX_SIZE_KB environment variable and
+    defaults to 10 MB. Set it to 0 to always use the ILovePDF service.
+
+    Returns:
+        int: Threshold in KB
+    """
+    value = os.getenv('PDF_LOCAL_MAX_SIZE_KB', '10240')
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid PDF_LOCAL_MAX_SIZE_KB value: {value}")
+        return 10240
+
+def select_pdf_backend(file_path: Path) -> str:
+    """
+    Pick the compression backend for a PDF based on its size.
+
+    Args:
+        file_path (Path): Path to the PDF file
+
+    Returns:
+        str: 'local' for PDFs up to the local threshold, 'remote' otherwise
+    """
+    if file_path.stat().st_size <= get_local_threshold_kb() * 1024:
+        return 'local'
+    return 'remote'
+
+def compress_pdf(file_path: Path, backend: str = 'auto') -> CompressionResult:
+    """
+    Compress a PDF file using ILovePDF service or the local pypdf backend.
 
     Args:
         file_path (Path): Path to the PDF file to compress
+        backend (str): 'local', 'remote' or 'auto' to choose by file size
 
     Returns:
-        Optional[Path]: Path to the compressed file if successful, None otherwise
+        CompressionResult: Path to the compressed file, NoGain if the original was kept,
+        None on failure
     """
-    if not file_path.suffix.lower() == '.pdf':
-        logger.warning(f"Not a PDF file: {file_path}")
+    if not is_compressible_pdf(file_path):
         return None
 
-    # Skip if file name contains 'compressed'
-    if 'compressed' in file_path.stem.lower():
-        logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
-        return None
+    if backend == 'auto':
+        backend = select_pdf_backend(file_path)
+
+    if backend == 'local':
+        compressed_path = compress_pdf_locally(file_path)
+    else:
+        compressed_path = compress_pdf_remotely(file_path)
+    record_compression('pdf', 'local' if backend == 'local' else 'ilovepdf', file_path, compressed_path)
+
+    if compressed_path:
+        logger.info(f"Compressed PDF saved to: {compressed_path}")
+        log_compression_savings(file_path, compressed_path)
+    elif isinstance(compressed_path, NoGain):
+        log_no_gain(file_path, compressed_path)
+    return compressed_path
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for the local compression pool.
+
+    Callers such as the job server run this from one of many threads while other
+    threads hold locks (HTTP sessions, logging). A forked child inherits those locks
+    in their held state and can deadlock, so workers are started from a clean
+    forkserver process, or spawned where forkserver is not available.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+def _compress_pdf_locally_timed(file_path: Path) -> Tuple[CompressionResult, float]:
+    """
+    Compress a PDF in a pool worker and measure how long it took there.
+    """
+    start = time.perf_counter()
+    compressed_path = compress_pdf_locally(file_path)
+    return compressed_path, time.perf_counter() - start
+
+def compress_pdfs(file_paths: Iterable[Path], max_workers: Optional[int] = None,
+                  ledger: Optional[CompressionLedger] = None,
+                  latencies: Optional[Dict[Path, float]] = None) -> Dict[Path, CompressionResult]:
+    """
+    Compress a batch of PDF files, running the local backend in a process pool.
+
+    PDFs up to the local size threshold are compressed in parallel worker processes
+    while larger ones are sent to the ILovePDF service in batched tasks.
+
+    Args:
+        file_paths (Iterable[Path]): PDF files to compress
+        max_workers (Optional[int]): Number of worker processes, defaults to the CPU count
+        ledger (Optional[CompressionLedger]): Ledger deciding what to skip and recording results
+        latencies (Optional[Dict[Path, float]]): Filled with the seconds spent on each PDF, if given
+
+    Returns:
+        Dict[Path, CompressionResult]: Mapping of each PDF to its compressed file, NoGain if
+        the original was kept, None on failure
+    """
+    # Worker processes are only started once a local PDF is submitted
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as executor:
+        results = _compress_pdf_chunk(file_paths, executor, ledger, {} if latencies is None else latencies)
+    if ledger:
+        ledger.save()
+    return results
+
+def compress_inventory_pdfs(inventory: FileInventory, max_workers: Optional[int] = None,
+                            ledger: Optional[CompressionLedger] = None) -> Dict[str, int]:
+    """
+    Compress every PDF of an inventory, one chunk of files at a time.
+
+    Paths are built per chunk from the inventory indices, so only one chunk of Paths
+    and results is held at once; the worker pool is shared by all chunks.
+
+    Args:
+        inventory (FileInventory): Files to compress, non-PDFs are ignored
+        max_workers (Optional[int]): Number of worker processes, defaults to the CPU count
+        ledger (Optional[CompressionLedger]): Ledger deciding what to skip and recording results
 
+    Returns:
+        Dict[str, int]: Number of PDFs per outcome ('ok', 'no_gain', 'failed', 'skipped')
+    """
+    counts = dict.fromkeys(['ok', 'no_gain', 'failed', 'skipped'], 0)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_pool_context()) as executor:
+        for chunk in inventory.path_chunks(['.pdf']):
+            results = _compress_pdf_chunk(chunk, executor, ledger, {})
+            counts['skipped'] += len(chunk) - len(results)
+            for compressed_path in results.values():
+                counts[outcome(compressed_path)] += 1
+    if ledger:
+        ledger.save()
+    logger.info(f"PDF compression finished: {counts}")
+    return counts
+
+def _compress_pdf_chunk(file_paths: Iterable[Path], executor: ProcessPoolExecutor,
+                        ledger: Optional[CompressionLedger],
+                        latencies: Dict[Path, float]) -> Dict[Path, CompressionResult]:
+    """
+    Compress PDFs with the given worker pool and record the results, without saving the ledger.
+    """
+    pdf_paths = [file_path for file_path in file_paths if is_compressible_pdf(file_path, ledger)]
+    local_paths = [file_path for file_path in pdf_paths if select_pdf_backend(file_path) == 'local']
+    local_set = set(local_paths)
+    remote_paths = [file_path for file_path in pdf_paths if file_path not in local_set]
+
+    results: Dict[Path, CompressionResult] = {}
+    if local_paths:
+        for file_path, (compressed_path, elapsed) in zip(
+                local_paths, executor.map(_compress_pdf_locally_timed, local_paths)):
+            results[file_path] = compressed_path
+            latencies[file_path] = elapsed
+    if remote_paths:
+        results.update(compress_pdfs_remotely(remote_paths, latencies))
+
+    for file_path in pdf_paths:
+        compressed_path = results[file_path]
+        if compressed_path:
+            logger.info(f"Compressed PDF saved to: {compressed_path}")
+            log_compression_savings(file_path, compressed_path)
+        elif isinstance(compressed_path, NoGain):
+            log_no_gain(file_path, compressed_path)
+        else:
+            logger.warning(f"Failed to compress {file_path}")
+        backend = 'local' if file_path in local_set else 'ilovepdf'
+        record_compression('pdf', backend, file_path, compressed_path)
+        if ledger:
+            ledger.record(file_path, compressed_path, backend)
+    return results
+
+def compress_pdf_remotely(file_path: Path) -> Optional[Path]:
+    """
+    Compress a PDF file using ILovePDF service.
+
+    Args:
+        file_path (Path): Path to the PDF file to compress
+
+    Returns:
+        Optional[Path]: Path to the compressed file if successful, None otherwise
+    """
     client = initialize_ilovepdf()
     if not client:
         return None
@@ -67,20 +259,82 @@ def compress_pdf(file_path: Path) -> Optional[Path]:
         task.process_files(str(file_path))
         task.download(str(compressed_path))
 
-        logger.info(f"Compressed PDF saved to: {compressed_path}")
-        
-        # Log compression results
-        original_size = file_path.stat().st_size / 1024  # KB
-        compressed_size = compressed_path.stat().st_size / 1024  # KB
-        savings = ((original_size - compressed_size) / original_size) * 100
-        logger.info(f"Compressed {file_path.name}: {original_size:.2f}KB -> {compressed_size:.2f}KB ({savings:.1f}% saved)")
-        
         return compressed_path
 
     except Exception as e:
         logger.error(f"Error compressing PDF {file_path}: {str(e)}")
         return None
 
+def compress_pdfs_remotely(file_paths: List[Path],
+                           latencies: Optional[Dict[Path, float]] = None) -> Dict[Path, Optional[Path]]:
+    """
+    Compress several PDF files using one ILovePDF session.
+
+    Args:
+        file_paths (List[Path]): PDF files to compress
+        latencies (Optional[Dict[Path, float]]): Filled with the seconds spent on each PDF, if given
+
+    Returns:
+        Dict[Path, Optional[Path]]: Mapping of each PDF to its compressed file, None on failure
+    """
+    session = get_ilovepdf_session()
+    if session is None:
+        return {file_path: None for file_path in file_paths}
+    return session.compress(file_paths, latencies)
+
+def is_compressible_pdf(file_path: Path, ledger: Optional[CompressionLedger] = None) -> bool:
+    """
+    Check if the file is a PDF that still needs compression.
+
+    With a ledger the decision is based on the file content, and on the file name for
+    files the ledger does not know; otherwise only on the file name.
+
+    Args:
+        file_path (Path): Path to the file to check
+        ledger (Optional[CompressionLedger]): Ledger of previously compressed files
+
+    Returns:
+        bool: True if the file is a PDF not already compressed, False otherwise
+    """
+    if not file_path.suffix.lower() == '.pdf':
+        logger.warning(f"Not a PDF file: {file_path}")
+        return False
+
+    if ledger:
+        return ledger.should_compress(file_path)
+
+    # Skip if file name contains 'compressed'
+    if 'compressed' in file_path.stem.lower():
+        logger.info(f"Skipping {file_path.name} as filename suggests it's already compressed")
+        return False
+
+    return True
+
+def log_compression_savings(file_path: Path, compressed_path: Path) -> None:
+    """
+    Log the size of a PDF before and after compression.
+
+    Args:
+        file_path (Path): Original PDF file
+        compressed_path (Path): Compressed PDF file
+    """
+    original_size = file_path.stat().st_size / 1024  # KB
+    compressed_size = compressed_path.stat().st_size / 1024  # KB
+    savings = ((original_size - compressed_size) / original_size) * 100
+    logger.info(f"Compressed {file_path.name}: {original_size:.2f}KB -> {compressed_size:.2f}KB ({savings:.1f}% saved)")
+
+def log_no_gain(file_path: Path, result: NoGain) -> None:
+    """
+    Log that a PDF was kept because its compressed version was not smaller.
+
+    Args:
+        file_path (Path): Original PDF file
+        result (NoGain): Outcome with the size of the discarded output
+    """
+    original_size = file_path.stat().st_size / 1024  # KB
+    logger.info(f"Keeping {file_path.name}, compression did not make it smaller: "
+                f"{original_size:.2f}KB -> {result.attempted_size / 1024:.2f}KB")
+
 # def compress_pdfs_in_directory(directory: Path) -> None:
 #     """
 #     Compress all PDF files in a directory and its subdirectories.
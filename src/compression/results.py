@@ -0,0 +1,38 @@
+"""
+Outcomes of a compression attempt besides an output file or a failure.
+"""
+
+from pathlib import Path
+from typing import Union
+
+class NoGain:
+    """
+    Result of a compression whose output was not smaller than the input.
+
+    The output is discarded and the original kept. A NoGain is falsy, so callers that
+    only look for an output treat it like None, while callers that care (logging,
+    metrics, the ledger) can tell it apart from a failure.
+
+    Args:
+        attempted_size (int): Size in bytes of the discarded output
+    """
+
+    def __init__(self, attempted_size: int):
+        self.attempted_size = attempted_size
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f"NoGain(attempted_size={self.attempted_size})"
+
+# Compressed file, NoGain if the original was kept, None on failure
+CompressionResult = Union[Path, NoGain, None]
+
+def outcome(result: CompressionResult) -> str:
+    """
+    Status of a compression result: 'ok', 'no_gain' or 'failed'.
+    """
+    if isinstance(result, NoGain):
+        return 'no_gain'
+    return 'failed' if result is None else 'ok'
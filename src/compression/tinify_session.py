@@ -0,0 +1,220 @@
+"""
+Reusable TinyPNG session with a pooled connection and monthly quota tracking.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+import tinify
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+class QuotaExceededError(Exception):
+    """Raised when a compression would exceed the monthly TinyPNG quota."""
+
+class _SessionClient(tinify.Client):
+    """
+    tinify client that also accepts a plain http:// API endpoint, e.g. a local stand-in.
+
+    tinify only treats https:// URLs as absolute and prefixes everything else with the
+    endpoint, so output locations under an http:// endpoint are made relative first.
+    """
+
+    def request(self, method: str, url: str, body=None):
+        if not url.lower().startswith('https://') and url.startswith(self.API_ENDPOINT + '/'):
+            url = url[len(self.API_ENDPOINT):]
+        return super().request(method, url, body)
+
+class TinifySession:
+    """
+    Compress images through TinyPNG over one warm, pooled HTTP session.
+
+    The session keeps its own tinify client instead of resetting the global
+    tinify.key, tracks the compression count reported by the API and refuses to
+    schedule uploads that would exceed the monthly quota.
+
+    Args:
+        api_key (Optional[str]): TinyPNG API key, defaults to IMAGE_COMPRESSION_API_KEY
+        monthly_limit (Optional[int]): Compressions allowed per month, defaults to
+            IMAGE_COMPRESSION_MONTHLY_LIMIT or 500 (the free tier)
+        reserve (int): Compressions to keep unused at the end of the quota
+        max_workers (Optional[int]): Concurrent uploads, defaults to IMAGE_COMPRESSION_WORKERS or 4
+        api_base (Optional[str]): Base URL override, defaults to TINIFY_API_BASE if set
+    """
+
+    def __init__(self, api_key: Optional[str] = None, monthly_limit: Optional[int] = None,
+                 reserve: int = 0, max_workers: Optional[int] = None, api_base: Optional[str] = None):
+        api_key = api_key or os.getenv('IMAGE_COMPRESSION_API_KEY')
+        if not api_key:
+            raise ValueError("No API key provided for image compression service")
+
+        self.monthly_limit = monthly_limit or int(os.getenv('IMAGE_COMPRESSION_MONTHLY_LIMIT', '500'))
+        self.reserve = reserve
+        self.max_workers = max_workers or int(os.getenv('IMAGE_COMPRESSION_WORKERS', '4'))
+        self.compression_count: Optional[int] = None
+        self.latencies: Dict[Path, float] = {}
+
+        self._client = _SessionClient(api_key)
+        # Error responses are raised inside tinify, so the count is read in a response hook
+        self._client.session.hooks['response'].append(self._record_count)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self._client.session.mount('https://', adapter)
+        self._client.session.mount('http://', adapter)
+        api_base = api_base or os.getenv('TINIFY_API_BASE')
+        if api_base:
+            self._client.API_ENDPOINT = api_base.rstrip('/')
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def __enter__(self) -> 'TinifySession':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        self._client.close()
+
+    def warm(self) -> Optional[int]:
+        """
+        Open the connection and read the current compression count.
+
+        An empty shrink request is rejected by the API without costing a compression,
+        but its response still carries the compression count header.
+
+        Returns:
+            Optional[int]: Compressions used this month if reported, None otherwise
+        """
+        try:
+            self._request('POST', '/shrink')
+        except tinify.AccountError as e:
+            if e.status != 429:
+                raise
+        except tinify.ClientError:
+            pass
+        return self.compression_count
+
+    def remaining(self) -> int:
+        """
+        Number of compressions that can still be scheduled this month.
+
+        Returns:
+            int: Remaining compressions after in-flight uploads and the reserve
+        """
+        with self._lock:
+            used = (self.compression_count or 0) + self._in_flight
+        return max(0, self.monthly_limit - self.reserve - used)
+
+    def compress_file(self, file_path: Path, compressed_path: Optional[Path] = None) -> Path:
+        """
+        Compress one image and write the result next to it.
+
+        Args:
+            file_path (Path): Path to the image file to compress
+            compressed_path (Optional[Path]): Output path, defaults to <name>_compressed<suffix>
+
+        Returns:
+            Path: Path to the compressed file
+
+        Raises:
+            QuotaExceededError: If the monthly quota has no room left
+            tinify.Error: If the TinyPNG API rejects the request
+        """
+        if not self._reserve_slot():
+            raise QuotaExceededError(f"TinyPNG quota of {self.monthly_limit} compressions reached")
+        return self._compress_reserved(file_path, compressed_path)
+
+    def _reserve_slot(self) -> bool:
+        """
+        Count one more upload as in flight if the quota still has room for it.
+        """
+        with self._lock:
+            if (self.compression_count or 0) + self._in_flight >= self.monthly_limit - self.reserve:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _compress_reserved(self, file_path: Path, compressed_path: Optional[Path] = None) -> Path:
+        """
+        Upload and download one image whose quota slot is already reserved.
+        """
+        if compressed_path is None:
+            compressed_path = file_path.parent / f"{file_path.stem}_compressed{file_path.suffix}"
+
+        start = time.perf_counter()
+        try:
+            shrink_response = self._request('POST', '/shrink', file_path.read_bytes())
+            result_response = self._request('GET', shrink_response.headers['location'])
+            compressed_path.write_bytes(result_response.content)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self.latencies[file_path] = elapsed
+
+        logger.info(f"Compressed image saved to: {compressed_path} ({elapsed:.2f}s)")
+        return compressed_path
+
+    def compress_many(self, file_paths: List[Path]) -> Dict[Path, Optional[Path]]:
+        """
+        Compress images concurrently, stopping before the quota runs out.
+
+        Files that are not scheduled because of the quota map to None.
+
+        Args:
+            file_paths (List[Path]): Image files to compress
+
+        Returns:
+            Dict[Path, Optional[Path]]: Mapping of each image to its compressed file, None on failure
+        """
+        if self.compression_count is None:
+            try:
+                self.warm()
+            except tinify.Error as e:
+                logger.warning(f"Could not read TinyPNG compression count: {str(e)}")
+
+        results: Dict[Path, Optional[Path]] = {file_path: None for file_path in file_paths}
+        pending = list(reversed(file_paths))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            while pending or futures:
+                # Reserve the quota slot before submitting so queued uploads are counted too
+                while pending and len(futures) < self.max_workers and self._reserve_slot():
+                    file_path = pending.pop()
+                    futures[executor.submit(self._compress_reserved, file_path)] = file_path
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = futures.pop(future)
+                    try:
+                        results[file_path] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error compressing image {file_path}: {str(e)}")
+
+        if pending:
+            logger.warning(f"TinyPNG quota nearly exhausted ({self.compression_count}/{self.monthly_limit}), "
+                           f"skipped {len(pending)} images")
+        return results
+
+    def _request(self, method: str, url: str, body=None):
+        """
+        Send a request through the pooled client.
+        """
+        return self._client.request(method, url, body)
+
+    def _record_count(self, response, *args, **kwargs) -> None:
+        """
+        Record the compression count this session's key reported, on success and error responses alike.
+        """
+        count = response.headers.get('compression-count')
+        if count:
+            with self._lock:
+                self.compression_count = max(int(count), self.compression_count or 0)
@@ -4,38 +4,164 @@ File classification module using Gemini-2.0-flash-exp.
 
 import logging
 import json
-from typing import List, Dict
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
 from pathlib import Path
 from typing import Optional
+from .inventory import FileInventory
 from ..llm.base_llm import generate_response, initialize_llm
+from ..llm.budget import estimate_tokens, get_budget
 import google.generativeai as genai
 
 logger = logging.getLogger(__name__)
 
-def classify_files(file_paths: List[Path],agent: Optional[genai.GenerativeModel]) -> Dict[str, str]:
+T = TypeVar('T')
+
+# Deterministic categories used when the LLM cannot or may not be asked
+EXTENSION_CATEGORIES = {
+    **dict.fromkeys(['.pdf', '.doc', '.docx', '.txt', '.rtf', '.odt', '.md', '.xls', '.xlsx', '.csv',
+                     '.ppt', '.pptx', '.epub'], 'documents'),
+    **dict.fromkeys(['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.svg', '.heic'], 'images'),
+    **dict.fromkeys(['.py', '.js', '.ts', '.java', '.c', '.cpp', '.h', '.cs', '.go', '.rs', '.rb', '.php',
+                     '.html', '.css', '.json', '.xml', '.yaml', '.yml', '.sh', '.sql', '.ipynb'], 'code'),
+}
+
+# Characters each file adds to the prompt besides its name and extension
+_ENTRY_OVERHEAD = len("'Filename:  Extension: ', ")
+
+# Characters each file adds to the reply besides its name, for the longest category
+_REPLY_OVERHEAD = len('"": "documents", ')
+
+def classify_by_extension(file_names: Iterable[str]) -> Dict[str, str]:
+    """
+    Classify files by their extension alone, without calling the LLM.
+
+    Args:
+        file_names (Iterable[str]): File names to classify.
+
+    Returns:
+        Dict[str, str]: Dictionary mapping file names to classification categories.
+    """
+    return {name: EXTENSION_CATEGORIES.get(Path(name).suffix.lower(), 'others') for name in file_names}
+
+def classify_files(file_paths: Iterable[Path],agent: Optional[genai.GenerativeModel]) -> Dict[str, str]:
     """
     Batch classify a list of files using the Gemini LLM based on their metadata.
 
     The prompt will list each file (with name, extension, size) and instruct the LLM to return a
     JSON object mapping file names to one of these categories: documents, images, code, others.
+    Files are sent in chunks whose prompt fits the LLM prompt budget and whose reply fits
+    the model's output limit; chunks that cannot be sent or whose reply cannot be
+    used are classified by extension instead.
 
     Args:
-        file_paths (List[Path]): List of file paths to classify.
-        a
+        file_paths (Iterable[Path]): File paths to classify.
+        agent (Optional[genai.GenerativeModel]): Classifier agent.
 
     Returns:
         Dict[str, str]: Dictionary mapping file names to classification categories.
     """
+    classifications = {}
+    for chunk in _chunked(file_paths, lambda file_path: file_path.name):
+        classifications.update(_classify_chunk([file_path.name for file_path in chunk], agent))
+    return classifications
+
+def classify_inventory(inventory: FileInventory, agent: Optional[genai.GenerativeModel],
+                       indices: Optional[Iterable[int]] = None) -> None:
+    """
+    Classify the files of an inventory, storing the categories in its category column.
+
+    Files are chunked like in classify_files and each chunk's reply is written straight
+    into the inventory, so no mapping for the whole tree is built.
+
+    Args:
+        inventory (FileInventory): Files to classify, updated in place.
+        agent (Optional[genai.GenerativeModel]): Classifier agent.
+        indices (Optional[Iterable[int]]): Files to classify, defaults to all of them.
+    """
+    if indices is None:
+        indices = inventory.indices()
+    for chunk in _chunked(indices, inventory.name):
+        names = [inventory.name(index) for index in chunk]
+        categories = _classify_chunk(names, agent)
+        for index, name in zip(chunk, names):
+            inventory.set_category(index, categories.get(name))
+
+def _chunked(items: Iterable[T], name: Callable[[T], str]) -> Iterator[List[T]]:
+    """
+    Group files into chunks whose prompt and reply fit the LLM budget.
+    """
+    budget = get_budget()
+    # Leave room for the instructions around the file list, and a quarter of the output for slack
+    prompt_limit = max(1, budget.max_prompt_tokens - 200) * 4
+    reply_limit = max(1, budget.max_output_tokens * 3 // 4) * 4
+    chunk: List[T] = []
+    prompt_chars = reply_chars = 0
+    for item in items:
+        file_name = name(item)
+        entry_chars = len(file_name) + len(Path(file_name).suffix) + _ENTRY_OVERHEAD
+        entry_reply_chars = len(file_name) + _REPLY_OVERHEAD
+        if chunk and (prompt_chars + entry_chars > prompt_limit or reply_chars + entry_reply_chars > reply_limit):
+            yield chunk
+            chunk, prompt_chars, reply_chars = [], 0, 0
+        chunk.append(item)
+        prompt_chars += entry_chars
+        reply_chars += entry_reply_chars
+    if chunk:
+        yield chunk
+
+def _classify_chunk(file_names: List[str], agent: Optional[genai.GenerativeModel]) -> Dict[str, str]:
     # try:
     prompt = "Classify this file list based on the file name and extension into one of the four categories 'documents', 'images', 'code', 'others'. " \
     "Return a dictionary with the format {file_name.extension: file_type}. File List: " + \
-    f"{[f'Filename: {file_path.name} Extension: {file_path.suffix}' for file_path in file_paths]}" + \
+    f"{[f'Filename: {file_name} Extension: {Path(file_name).suffix}' for file_name in file_names]}" + \
     " Do not give code and only return the dictionary even without three backticks. Just a plain dictionary."
     
-    response = generate_response(prompt,agent)
+    response = None
+    if get_budget().allows(estimate_tokens(prompt)):
+        response = generate_response(prompt,agent)
+    if response is None:
+        logger.warning(f"Classifying {len(file_names)} files by extension, the LLM request was not sent or failed")
+        return classify_by_extension(file_names)
     # print("classifier response",response)
     response_str = response.replace("'", "\"")
     
-    classifications = json.loads(response_str)
+    try:
+        classifications = json.loads(response_str)
+        if not isinstance(classifications, dict):
+            raise ValueError(f"expected a dictionary, got {type(classifications).__name__}")
+        missing = [file_name for file_name in file_names if file_name not in classifications]
+        if missing:
+            raise ValueError(f"{len(missing)} files missing from the reply, e.g. {missing[0]}")
+    except ValueError as e:
+        # A truncated or partial reply only affects its own chunk
+        logger.warning(f"Classifying {len(file_names)} files by extension, unusable LLM reply: {str(e)}")
+        return classify_by_extension(file_names)
     
     return classifications
+
+def complete_classifications(inventory: FileInventory, classifications: Optional[FileInventory],
+                             agent: Optional[genai.GenerativeModel]) -> None:
+    """
+    Reuse classifications made earlier and only classify files missing from them.
+
+    Categories are copied by file name from the earlier inventory into this one; the
+    remaining files are classified into it with classify_inventory.
+
+    Args:
+        inventory (FileInventory): Files that need a category, updated in place.
+        classifications (Optional[FileInventory]): Inventory classified earlier, if any.
+        agent (Optional[genai.GenerativeModel]): Classifier agent for the missing files.
+    """
+    if classifications is None:
+        classify_inventory(inventory, agent)
+        return
+    missing = array('Q')
+    for index in inventory.indices():
+        found = classifications.lookup(inventory.name(index))
+        if found is None:
+            missing.append(index)
+        else:
+            inventory.set_category(index, classifications.category(found))
+    if missing:
+        classify_inventory(inventory, agent, missing)
@@ -0,0 +1,235 @@
+"""
+Compact in-memory inventory of the files in a folder tree.
+"""
+
+import bisect
+import logging
+import os
+import sys
+from array import array
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from src.monitoring.metrics import FILES_SCANNED
+
+logger = logging.getLogger(__name__)
+
+# Category codes stored in the category column
+CATEGORIES = ('documents', 'images', 'code', 'others')
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+UNCLASSIFIED = 255
+
+# Paths built at once by path_chunks, bounding what batch consumers hold in memory
+PATH_CHUNK_SIZE = 256
+
+_FS_ENCODING = sys.getfilesystemencoding()
+
+class FileInventory:
+    """
+    Column-oriented listing of the files under a root folder.
+
+    Instead of one Path object per file, directories are interned once in a table
+    and every file only keeps a directory index, the end offset of its name in a
+    packed name buffer, and its size, mtime and category in typed arrays. That is
+    about 30 bytes per file plus the name itself, so trees with millions of files
+    fit in tens of megabytes. Paths are built on demand when iterating.
+
+    Args:
+        root (Path): Folder that directories and paths are relative to
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._dirs: List[Path] = []
+        self._dir_index: Dict[str, int] = {}
+        self._names = bytearray()
+        self._name_ends = array('Q')
+        self._dir_ids = array('I')
+        self._sizes = array('Q')
+        self._mtimes = array('d')
+        self._categories = array('B')
+        self._hashes: Optional[array] = None
+        self._hash_order: Optional[array] = None
+
+    @classmethod
+    def scan(cls, root: Path) -> 'FileInventory':
+        """
+        Build an inventory of every non-hidden file under root.
+
+        Args:
+            root (Path): Folder to scan
+
+        Returns:
+            FileInventory: Inventory of the files found
+        """
+        inventory = cls(root)
+        inventory.add_tree(root)
+        return inventory
+
+    def add_tree(self, directory: Path, category: Optional[str] = None) -> int:
+        """
+        Add every non-hidden file under a directory of the root folder.
+
+        Args:
+            directory (Path): Directory to scan, the root or a folder below it
+            category (Optional[str]): Category to record for the files, e.g. the category
+                folder they are in; left unclassified if not given
+
+        Returns:
+            int: Number of files added
+        """
+        code = CATEGORY_CODES.get(category, UNCLASSIFIED) if category else UNCLASSIFIED
+        added = 0
+        pending = [Path(directory)]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    dir_id = None
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(Path(entry.path))
+                        elif entry.is_file() and not entry.name.startswith('.'):
+                            if dir_id is None:
+                                dir_id = self._intern_dir(current)
+                            stat = entry.stat()
+                            self._append(dir_id, entry.name, stat.st_size, stat.st_mtime, code)
+                            added += 1
+            except OSError as e:
+                logger.warning(f"Could not scan {current}: {str(e)}")
+        FILES_SCANNED.inc(added)
+        return added
+
+    def _intern_dir(self, directory: Path) -> int:
+        relative = os.path.relpath(directory, self.root)
+        dir_id = self._dir_index.get(relative)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(self.root / relative)
+            self._dir_index[relative] = dir_id
+        return dir_id
+
+    def _append(self, dir_id: int, name: str, size: int, mtime: float, code: int) -> None:
+        self._names += name.encode(_FS_ENCODING, 'surrogateescape')
+        self._name_ends.append(len(self._names))
+        self._dir_ids.append(dir_id)
+        self._sizes.append(size)
+        self._mtimes.append(mtime)
+        self._categories.append(code)
+        self._hashes = self._hash_order = None
+
+    def __len__(self) -> int:
+        return len(self._dir_ids)
+
+    def name(self, index: int) -> str:
+        start = self._name_ends[index - 1] if index else 0
+        return self._names[start:self._name_ends[index]].decode(_FS_ENCODING, 'surrogateescape')
+
+    def path(self, index: int) -> Path:
+        return self._dirs[self._dir_ids[index]] / self.name(index)
+
+    def size(self, index: int) -> int:
+        return self._sizes[index]
+
+    def mtime(self, index: int) -> float:
+        return self._mtimes[index]
+
+    def category(self, index: int) -> Optional[str]:
+        code = self._categories[index]
+        return None if code == UNCLASSIFIED else CATEGORIES[code]
+
+    def names(self) -> Iterator[str]:
+        return (self.name(index) for index in range(len(self)))
+
+    def indices(self, suffixes: Optional[Iterable[str]] = None) -> Iterator[int]:
+        """
+        Iterate over the file indices, optionally only files with the given suffixes.
+
+        Args:
+            suffixes (Optional[Iterable[str]]): Lowercase suffixes such as '.pdf'
+
+        Returns:
+            Iterator[int]: Matching file indices in scan order
+        """
+        if suffixes is None:
+            return iter(range(len(self)))
+        suffixes = tuple(suffixes)
+        return (index for index in range(len(self)) if self.name(index).lower().endswith(suffixes))
+
+    def paths(self, suffixes: Optional[Iterable[str]] = None) -> Iterator[Path]:
+        """
+        Iterate over the file paths, building each one only when it is needed.
+
+        Args:
+            suffixes (Optional[Iterable[str]]): Lowercase suffixes such as '.pdf'
+
+        Returns:
+            Iterator[Path]: Matching file paths in scan order
+        """
+        return (self.path(index) for index in self.indices(suffixes))
+
+    def path_chunks(self, suffixes: Optional[Iterable[str]] = None,
+                    size: int = PATH_CHUNK_SIZE) -> Iterator[List[Path]]:
+        """
+        Iterate over the file paths in lists of at most size paths.
+
+        Batch consumers such as the compressors hold one chunk of Path objects at a
+        time instead of one per file in the tree.
+
+        Args:
+            suffixes (Optional[Iterable[str]]): Lowercase suffixes such as '.pdf'
+            size (int): Paths per chunk
+
+        Returns:
+            Iterator[List[Path]]: Chunks of matching file paths in scan order
+        """
+        indices = self.indices(suffixes)
+        while True:
+            chunk = [self.path(index) for index in islice(indices, size)]
+            if not chunk:
+                return
+            yield chunk
+
+    def set_category(self, index: int, category: Optional[str]) -> None:
+        """
+        Store the category of a file, unknown categories leave it unclassified.
+        """
+        self._categories[index] = CATEGORY_CODES.get(category, UNCLASSIFIED) if category else UNCLASSIFIED
+
+    def lookup(self, name: str) -> Optional[int]:
+        """
+        Find a file by name.
+
+        The first lookup builds an index of name hashes sorted in a typed array, so a
+        lookup is a binary search plus a name comparison per hash match. If several
+        files share the name, the last one added wins.
+
+        Args:
+            name (str): File name
+
+        Returns:
+            Optional[int]: Index of the file, None if there is no file with that name
+        """
+        if self._hashes is None:
+            hashes = array('q', (hash(self.name(index)) for index in range(len(self))))
+            self._hash_order = array('Q', sorted(range(len(self)), key=hashes.__getitem__))
+            self._hashes = array('q', (hashes[index] for index in self._hash_order))
+        name_hash = hash(name)
+        found = None
+        position = bisect.bisect_left(self._hashes, name_hash)
+        # Equal hashes keep the order files were added in, so the last match is the newest
+        while position < len(self._hashes) and self._hashes[position] == name_hash:
+            if self.name(self._hash_order[position]) == name:
+                found = self._hash_order[position]
+            position += 1
+        return found
+
+    def total_size(self) -> int:
+        return sum(self._sizes)
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the file columns, excluding the directory table.
+        """
+        columns = (self._name_ends, self._dir_ids, self._sizes, self._mtimes, self._categories)
+        return len(self._names) + sum(column.itemsize * len(column) for column in columns)
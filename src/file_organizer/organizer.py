@@ -7,19 +7,24 @@ import shutil
 from pathlib import Path
 from typing import List, Dict, Optional
 import google.generativeai as genai
-from src.file_organizer.file_classifier import classify_files
+from src.file_organizer.file_classifier import complete_classifications
 from src.llm.base_llm import initialize_llm
+from src.file_organizer.inventory import FileInventory
+from src.monitoring.metrics import BYTES_COPIED, FILES_COPIED
 
 import os
 
 logger = logging.getLogger(__name__)
 
-def organize_files(folder_path: str, file_classifier_agent: Optional[genai.GenerativeModel]) -> None:
+def organize_files(folder_path: str, file_classifier_agent: Optional[genai.GenerativeModel],
+                   classifications: Optional[FileInventory] = None) -> None:
     """
     Organize files in the 'My Files' subdirectory into categorized folders.
 
     Args:
         root_dir (str): Root directory path to organize
+        classifications (Optional[FileInventory]): Inventory classified before the run;
+            only files missing from it are sent to the classifier
     """
     root_path = Path(folder_path) / "Files"  # Adjust the path to target 'Files' subdirectory
     category_dirs ={
@@ -29,22 +34,23 @@ def organize_files(folder_path: str, file_classifier_agent: Optional[genai.Gener
         'others': Path(folder_path) / "Others"
     }    
     
-    # Get the list of files to organize
+    # Get the files to organize
     
-    file_paths = scan_directory(root_path)
+    inventory = FileInventory.scan(root_path)
     
-    # use classify_files to get category for each file
-    classifications = classify_files(file_paths, file_classifier_agent)
+    # Classify the files straight into the inventory's category column
+    complete_classifications(inventory, classifications, file_classifier_agent)
     
     # Move files to respective category directories
-    for file_path in file_paths:
+    for index in inventory.indices():
+        file_path = inventory.path(index)
         try:
             # Check if the file still exists before processing
             if not file_path.exists():
                 logger.warning(f"Source file does not exist: {file_path}")
                 continue
 
-            category = classifications.get(file_path.name, 'Others')  # Default to 'others' if not found
+            category = inventory.category(index)  # None if not classified into a known category
             if category in category_dirs:
                 dest_dir = category_dirs[category]
                 dest_file_path = dest_dir / file_path.name
@@ -56,6 +62,8 @@ def organize_files(folder_path: str, file_classifier_agent: Optional[genai.Gener
                 
                 # Copy the file to the destination directory
                 shutil.copy2(str(file_path), str(dest_file_path))
+                FILES_COPIED.inc(category=category)
+                BYTES_COPIED.inc(inventory.size(index))
                 logger.info(f"Copied {file_path.name} to {category} directory")
         except Exception as e:
             logger.error(f"Error copying {file_path}: {str(e)}")
@@ -107,11 +115,7 @@ def scan_directory(root_path: Path) -> List[Path]:
     Returns:
         List[Path]: List of file paths found in the directory
     """
-    files = []
-    for item in root_path.rglob('*'):
-        if item.is_file() and not item.name.startswith('.'):
-            files.append(item)
-    return files 
+    return list(FileInventory.scan(root_path).paths())
 
 def validate_folder(folder_path: str) -> Path:
     """
@@ -136,17 +140,19 @@ def validate_folder(folder_path: str) -> Path:
 
     return path
 
-def is_organized(folder_path: str,file_classifier_agent: Optional[genai.GenerativeModel]) -> bool:
+def is_organized(folder_path: str,file_classifier_agent: Optional[genai.GenerativeModel],
+                 classifications: Optional[FileInventory] = None) -> bool:
     """
     Check if the files in the folder are organized into the expected category directories.
 
     This function scans the 'Files' subdirectory to get all unorganized files,
-    then uses the batch classifier (classify_files) to obtain a predicted mapping
-    (file name → category). It also extracts the actual organization by scanning the
-    category folders (Documents, Images, Code, Others). Finally, it compares both mappings.
+    then uses the batch classifier to predict the category of each of them. It also
+    extracts the actual organization by scanning the category folders (Documents,
+    Images, Code, Others). Finally, it compares both.
 
     Args:
         folder_path (str): Root directory path to check.
+        classifications (Optional[FileInventory]): Inventory classified before the run.
 
     Returns:
         bool: True if every file is in the correct location as per its LLM classification, otherwise False.
@@ -159,32 +165,26 @@ def is_organized(folder_path: str,file_classifier_agent: Optional[genai.Generati
         logger.info("Not all category folders exist.")
         return False
     
-    # Get list of files from the unorganized 'Files' directory
+    # Get the files from the unorganized 'Files' directory
     my_files_path = path / "Files"
-    files = scan_directory(my_files_path)
+    files = FileInventory.scan(my_files_path)
     
     
     # Manually extract the current organization by scanning each category folder.
-    # This mapping is file name → category (as determined by its folder location).
-    manual_mapping = {}
-    file_paths = []
+    # Each file's category column records the folder it was found in.
+    organized = FileInventory(path)
     for folder in expected_folders:
-        folder_path_cat = path / folder
-        for file in scan_directory(folder_path_cat):
-            file_paths.append(file)
-            manual_mapping[file.name] = folder.lower()
+        organized.add_tree(path / folder, folder.lower())
     
-     # Get LLM-based classifications in batch    
+    # Get LLM-based classifications in batch, stored in the category column of files
+    complete_classifications(files, classifications, file_classifier_agent)
     
-    predicted_classifications=classify_files(file_paths,file_classifier_agent)
-    
-    # print('manual mapping:', manual_mapping)
-    # print("Predicted mapping: ", predicted_classifications)
     # Compare the predicted classification with the manual organization.
-    for file in files:
-        file_name = file.name
-        predicted_category = predicted_classifications.get(file_name, 'others')
-        manual_category = manual_mapping.get(file_name)
+    for file_index in files.indices():
+        file_name = files.name(file_index)
+        predicted_category = files.category(file_index) or 'others'
+        index = organized.lookup(file_name)
+        manual_category = None if index is None else organized.category(index)
         if manual_category != predicted_category:
             logger.warning(f"Mismatch for {file_name}: predicted {predicted_category}, but found in {manual_category}")
             return False
@@ -3,16 +3,42 @@ Interactive agent module for task selection and orchestration using LLM.
 """
 
 import logging
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from .base_llm import generate_response, initialize_llm
+from .base_llm import generate_json, initialize_llm
+from .orchestrator import FUNCTION_CONTEXT, PLAN_SCHEMA, PLANNING_RULES
+from .prefetch import SpeculativePrefetch
 from src.file_organizer.organizer import validate_folder
 
 logger = logging.getLogger(__name__)
 
+VALID_TASKS = ['organize', 'compress', 'todo']
+
+TASK_RULES = """
+    Valid tasks are: 'organize' (organizing files), 'compress' (compressing files), and 'todo' (running todo tasks).
+    Also try to find close matches for the tasks if the input is unclear. If is says run all then return all tasks.
+    """
+
+# Response schemas for the interpreted tasks, alone or together with their plan
+TASKS_SCHEMA = {
+    'type': 'array',
+    'items': {'type': 'string', 'format': 'enum', 'enum': VALID_TASKS},
+}
+
+TASKS_AND_PLAN_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'tasks': TASKS_SCHEMA,
+        'plan': PLAN_SCHEMA,
+    },
+    'required': ['tasks', 'plan'],
+}
+
 def interpret_user_input(user_input: str) -> List[str]:
     """
     Use LLM to interpret user input into specific tasks.
+
+    Task names are matched in the input directly if the LLM request cannot be made.
     
     Args:
         user_input (str): User's input text
@@ -22,38 +48,78 @@ def interpret_user_input(user_input: str) -> List[str]:
     """
     prompt = f"""
     Interpret the following user input and identify which tasks they want to perform.
-    Valid tasks are: 'organize' (organizing files), 'compress' (compressing files), and 'todo' (running todo tasks).
-    Return only the task names in order, separated by commas. If no valid tasks are found, return 'none'.
-    Also try to find close matches for the tasks if the input is unclear. If is says run all then return all tasks.
+    {TASK_RULES}
+    Return only the task names in order. If no valid tasks are found, return an empty list.
     User input: {user_input}
     """
     
     try:
-        model = initialize_llm()
-        response = generate_response(prompt, model)
-        
-        if not response or response.lower() == 'none':
-            return []
-            
-        # Convert LLM response to list of tasks
-        tasks = [task.strip().lower() for task in response.split(',')]
-        valid_tasks = ['organize', 'compress', 'todo']
-        
-        # Filter and order valid tasks
-        tasks = [task for task in tasks if task in valid_tasks]
-        tasks.sort(key=lambda x: valid_tasks.index(x))
-        
-        return tasks
+        tasks = generate_json(prompt, TASKS_SCHEMA, initialize_llm())
+        if tasks is None:
+            logger.warning("Task interpreter unavailable, matching task names in the input instead")
+            return match_tasks(user_input)
+        return order_tasks(tasks)
     except Exception as e:
         logger.error(f"Error interpreting tasks: {str(e)}")
         return []
 
-def get_user_tasks() -> Tuple[List[str], str]:
+def interpret_and_plan(user_input: str) -> Tuple[List[str], Optional[List[Dict[str, Any]]]]:
+    """
+    Interpret user input and plan its execution in a single LLM request.
+
+    Falls back to interpret_user_input if the combined request fails, in which case
+    no plan is returned and the orchestrator plans the tasks itself.
+
+    Args:
+        user_input (str): User's input text
+
+    Returns:
+        Tuple[List[str], Optional[List[Dict[str, Any]]]]: Interpreted tasks and their execution plan
+    """
+    prompt = f"""
+    Interpret the following user input and identify which tasks they want to perform.
+    {TASK_RULES}
+    Then plan the execution of exactly those tasks.
+    {FUNCTION_CONTEXT}
+    {PLANNING_RULES}
+    Return the task names in order under 'tasks' and the plan under 'plan'.
+    If no valid tasks are found, return empty lists.
+    User input: {user_input}
+    """
+
+    result = generate_json(prompt, TASKS_AND_PLAN_SCHEMA, initialize_llm())
+    if result is None:
+        return interpret_user_input(user_input), None
+    tasks = order_tasks(result['tasks'])
+    return tasks, (result['plan'] if tasks and result['plan'] else None)
+
+def match_tasks(user_input: str) -> List[str]:
+    """
+    Find the tasks named in the user input without calling the LLM.
+    """
+    words = user_input.lower()
+    if 'all' in words.split():
+        return list(VALID_TASKS)
+    return [task for task in VALID_TASKS if task in words]
+
+def order_tasks(tasks: List[str]) -> List[str]:
+    """
+    Remove duplicate and unknown task names and sort them into execution order.
+    """
+    tasks = [task.strip().lower() for task in tasks]
+    return sorted(dict.fromkeys(task for task in tasks if task in VALID_TASKS), key=VALID_TASKS.index)
+
+def get_user_tasks() -> Tuple[List[str], str, Dict[str, Any]]:
     """
     Interactive function to get user tasks and folder location using LLM interpretation.
+
+    The tasks and their execution plan come from a single LLM request. Once the
+    folder is validated, the folder scan and file classification start in the
+    background while the user confirms, and are discarded if the user does not.
     
     Returns:
-        Tuple[List[str], str]: List of selected tasks and folder location
+        Tuple[List[str], str, Dict[str, Any]]: List of selected tasks, folder location
+        and prefetched 'execution_plan' and 'classifications' for plan_and_execute_tasks
     """
     print("\nWelcome! I'm your automation assistant.")
     print("Please tell me what tasks you'd like to perform.")
@@ -64,7 +130,7 @@ def get_user_tasks() -> Tuple[List[str], str]:
     
     while True:
         user_input = input("\nWhat would you like me to do? ").strip()
-        tasks = interpret_user_input(user_input)
+        tasks, execution_plan = interpret_and_plan(user_input)
         
         if not tasks:
             print("\nI couldn't interpret any valid tasks from your input.")
@@ -98,9 +164,12 @@ def get_user_tasks() -> Tuple[List[str], str]:
                 logger.error(str(e))
                 print("Invalid folder path. Please try again.")
         
+        prefetch = SpeculativePrefetch(tasks, folder_path, execution_plan).start()
+        
         print(f"\nFolder location: {folder_path}")
         confirm = input("Proceed with these tasks? (yes/no): ").lower().strip()
         if confirm == 'yes':
-            return tasks, folder_path
+            return tasks, folder_path, prefetch.result()
         
+        prefetch.cancel()
         print("\nLet's start over.") 
\ No newline at end of file
@@ -2,17 +2,37 @@
 Base LLM module for Gemini-2.0-flash-exp integration.
 """
 
+import json
 import logging
+import threading
+import time
 import google.generativeai as genai
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 import os
+from src.llm.budget import BudgetExceededError, estimate_tokens, get_budget
+from src.monitoring.metrics import LLM_LATENCY, LLM_REQUESTS, LLM_TOKENS
 
 logger = logging.getLogger(__name__)
 
+_JSON_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+}
+
+# Models are reused for as long as the process runs, keyed by API key and model name
+_models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+_models_lock = threading.Lock()
+
 def initialize_llm(model_name: str = "gemini-2.0-flash") -> Optional[genai.GenerativeModel]:
     """
     Initialize the Gemini LLM model.
 
+    The model is created once per API key and model name and then reused.
+
     Args:
         model_name (str): Name of the Gemini model to use
 
@@ -24,13 +44,51 @@ def initialize_llm(model_name: str = "gemini-2.0-flash") -> Optional[genai.Gener
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        genai.configure(api_key=api_key)
-        agent= genai.GenerativeModel(model_name)
+        with _models_lock:
+            agent = _models.get((api_key, model_name))
+            if agent is None:
+                genai.configure(api_key=api_key)
+                agent = genai.GenerativeModel(model_name)
+                _models[(api_key, model_name)] = agent
         return agent
     except Exception as e:
         logger.error(f"Error initializing LLM: {str(e)}")
         return None
 
+def _generate(agent: genai.GenerativeModel, prompt: str, **kwargs) -> str:
+    """
+    Send one request to the model and record its latency, outcome and token usage.
+
+    Every request is checked against the run and daily budget before it is sent.
+
+    Raises:
+        BudgetExceededError: If the request would exceed the budget
+    """
+    budget = get_budget()
+    prompt_tokens = estimate_tokens(prompt)
+    budget.reserve(prompt_tokens)
+
+    start = time.perf_counter()
+    try:
+        response = agent.generate_content(prompt, **kwargs)
+        text = response.text
+    except Exception:
+        LLM_REQUESTS.inc(status='error')
+        budget.settle(prompt_tokens, prompt_tokens, 0)
+        raise
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - start)
+    LLM_REQUESTS.inc(status='ok')
+
+    # Fall back to the estimate if the response has no usage data
+    usage = getattr(response, 'usage_metadata', None)
+    input_tokens = getattr(usage, 'prompt_token_count', 0) or prompt_tokens
+    output_tokens = getattr(usage, 'candidates_token_count', 0) or estimate_tokens(text)
+    LLM_TOKENS.inc(input_tokens, direction='input')
+    LLM_TOKENS.inc(output_tokens, direction='output')
+    budget.settle(prompt_tokens, input_tokens, output_tokens)
+    return text
+
 def generate_response(prompt: str, agent: Optional[genai.GenerativeModel] = None) -> Optional[str]:
     """
     Generate a response using the LLM.
@@ -48,8 +106,78 @@ def generate_response(prompt: str, agent: Optional[genai.GenerativeModel] = None
             agent = initialize_llm()
             if agent is None:
                 return None  
-        response = agent.generate_content(prompt)
-        return response.text
+        return _generate(agent, prompt)
+    except BudgetExceededError as e:
+        logger.warning(f"LLM request not sent: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def validate_json(value: Any, schema: Dict[str, Any], path: str = '$') -> None:
+    """
+    Check a decoded JSON value against a response schema.
+
+    Only the schema keywords used for structured output are supported: type,
+    properties, required, items and enum.
+
+    Args:
+        value (Any): Decoded JSON value
+        schema (Dict[str, Any]): Schema the value must match
+        path (str): Location of the value, used in error messages
+
+    Raises:
+        ValueError: If the value does not match the schema
+    """
+    expected = schema.get('type', '').lower()
+    if expected:
+        if not isinstance(value, _JSON_TYPES[expected]) or (expected in ('integer', 'number') and isinstance(value, bool)):
+            raise ValueError(f"{path}: expected {expected}, got {type(value).__name__}")
+    if 'enum' in schema and value not in schema['enum']:
+        raise ValueError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if expected == 'object':
+        for key in schema.get('required', []):
+            if key not in value:
+                raise ValueError(f"{path}: missing required property '{key}'")
+        for key, property_schema in schema.get('properties', {}).items():
+            if key in value:
+                validate_json(value[key], property_schema, f"{path}.{key}")
+    elif expected == 'array' and 'items' in schema:
+        for index, item in enumerate(value):
+            validate_json(item, schema['items'], f"{path}[{index}]")
+
+def generate_json(prompt: str, schema: Dict[str, Any], agent: Optional[genai.GenerativeModel] = None) -> Optional[Any]:
+    """
+    Generate a JSON response constrained to a schema.
+
+    The schema is passed to the model as its response schema, so the reply is
+    plain JSON without code fences. It is validated again after decoding.
+
+    Args:
+        prompt (str): Input prompt for the LLM
+        schema (Dict[str, Any]): Response schema (OpenAPI subset accepted by Gemini)
+        agent (Optional[genai.GenerativeModel]): Initialized agent to use
+
+    Returns:
+        Optional[Any]: Decoded and validated response if successful, None otherwise
+    """
+    try:
+        if agent is None:
+            print("Initializing LLM")
+            agent = initialize_llm()
+            if agent is None:
+                return None
+        text = _generate(
+            agent,
+            prompt,
+            generation_config={'response_mime_type': 'application/json', 'response_schema': schema},
+        )
+        data = json.loads(text)
+        validate_json(data, schema)
+        return data
+    except BudgetExceededError as e:
+        logger.warning(f"LLM request not sent: {str(e)}")
+        return None
+    except Exception as e:
+        logger.error(f"Error generating structured response: {str(e)}")
+        return None
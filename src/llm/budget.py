@@ -0,0 +1,303 @@
+"""
+Request, token and cost budgets for the LLM calls of a run and of a day.
+"""
+
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the usage file is updated without a lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = ('requests', 'input_tokens', 'output_tokens', 'cost')
+
+# Defaults stay well above a normal run and inside the Gemini free tier's 1,500 requests per day
+DEFAULT_RUN_LIMITS = {'requests': 100, 'input_tokens': 1_000_000, 'output_tokens': 250_000, 'cost': 1.0}
+DEFAULT_DAY_LIMITS = {'requests': 1500, 'input_tokens': 10_000_000, 'output_tokens': 2_500_000, 'cost': 5.0}
+
+# gemini-2.0-flash list prices in USD per million tokens
+DEFAULT_INPUT_PRICE = 0.10
+DEFAULT_OUTPUT_PRICE = 0.40
+
+DEFAULT_MAX_PROMPT_TOKENS = 100_000
+
+# gemini-2.0-flash stops every reply at 8,192 output tokens
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+
+class BudgetExceededError(Exception):
+    """Raised when a request would exceed the run or daily LLM budget."""
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the tokens of a text at roughly four characters per token.
+    """
+    return len(text) // 4 + 1
+
+def get_limits(scope: str) -> Dict[str, float]:
+    """
+    Read the limits of a scope from LLM_<RUN|DAY>_MAX_<REQUESTS|INPUT_TOKENS|OUTPUT_TOKENS|COST>.
+
+    A limit of 0 disables it.
+
+    Args:
+        scope (str): 'run' or 'day'
+
+    Returns:
+        Dict[str, float]: Limit per usage field
+    """
+    defaults = DEFAULT_RUN_LIMITS if scope == 'run' else DEFAULT_DAY_LIMITS
+    return {field: float(os.getenv(f'LLM_{scope.upper()}_MAX_{field.upper()}', str(default)))
+            for field, default in defaults.items()}
+
+def _empty_usage() -> Dict[str, float]:
+    return {field: 0 for field in USAGE_FIELDS}
+
+def _new_run() -> Dict[str, float]:
+    return {**_empty_usage(), 'refused': 0}
+
+# Usage of the run the current context belongs to, see BudgetGovernor.run_scope
+_run_usage: ContextVar[Optional[Dict[str, float]]] = ContextVar('llm_run_usage', default=None)
+
+class BudgetGovernor:
+    """
+    Check every LLM request against a per-run and a per-day budget.
+
+    A request reserves its estimated input tokens before it is sent and is refused
+    with BudgetExceededError if that would exceed a limit; the estimate is replaced
+    by the reported usage once the response arrives. Daily usage is kept in a JSON
+    file that every process adds its own usage to under a file lock, so it adds up
+    across the runs and processes of a day.
+
+    Run usage belongs to the process, or to the innermost run_scope of the calling
+    context, so concurrent jobs in one process each get their own run budget.
+
+    Args:
+        run_limits (Optional[Dict[str, float]]): Limits for this run, defaults to LLM_RUN_MAX_*
+        day_limits (Optional[Dict[str, float]]): Limits for the day, defaults to LLM_DAY_MAX_*
+        usage_path (Optional[Path]): Daily usage file, defaults to LLM_USAGE_FILE or
+            ~/.llm_usage.json; None keeps daily usage in memory only
+        input_price (Optional[float]): USD per million input tokens, defaults to LLM_INPUT_PRICE
+        output_price (Optional[float]): USD per million output tokens, defaults to LLM_OUTPUT_PRICE
+        max_prompt_tokens (Optional[int]): Largest prompt sent in one request, defaults to
+            LLM_MAX_PROMPT_TOKENS or 100,000
+        max_output_tokens (Optional[int]): Longest reply the model returns, defaults to
+            LLM_MAX_OUTPUT_TOKENS or 8,192
+        today (Callable[[], date]): Returns the current day
+    """
+
+    def __init__(self, run_limits: Optional[Dict[str, float]] = None, day_limits: Optional[Dict[str, float]] = None,
+                 usage_path: Optional[Path] = None, input_price: Optional[float] = None,
+                 output_price: Optional[float] = None, max_prompt_tokens: Optional[int] = None,
+                 max_output_tokens: Optional[int] = None, today: Callable[[], date] = date.today):
+        self.run_limits = run_limits if run_limits is not None else get_limits('run')
+        self.day_limits = day_limits if day_limits is not None else get_limits('day')
+        self.usage_path = Path(usage_path) if usage_path else None
+        self.input_price = input_price if input_price is not None else float(os.getenv('LLM_INPUT_PRICE', str(DEFAULT_INPUT_PRICE)))
+        self.output_price = output_price if output_price is not None else float(os.getenv('LLM_OUTPUT_PRICE', str(DEFAULT_OUTPUT_PRICE)))
+        self.max_prompt_tokens = max_prompt_tokens or int(os.getenv('LLM_MAX_PROMPT_TOKENS', str(DEFAULT_MAX_PROMPT_TOKENS)))
+        self.max_output_tokens = max_output_tokens or int(os.getenv('LLM_MAX_OUTPUT_TOKENS', str(DEFAULT_MAX_OUTPUT_TOKENS)))
+        self.today = today
+        self._process_run = _new_run()
+        self._day = self.today().isoformat()
+        self._day_usage = _empty_usage()
+        # Usage added since the last save, merged into the usage file by _save_day
+        self._unsaved = _empty_usage()
+        self._lock = threading.Lock()
+        with self._lock:
+            self._save_day()
+
+    @classmethod
+    def unlimited(cls) -> 'BudgetGovernor':
+        """
+        Governor without limits or usage file, e.g. for benchmarks against a fake model.
+        """
+        no_limits = {field: 0 for field in USAGE_FIELDS}
+        return cls(run_limits=no_limits, day_limits=dict(no_limits), input_price=0.0, output_price=0.0)
+
+    def cost(self, input_tokens: float, output_tokens: float) -> float:
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    @property
+    def run(self) -> Dict[str, float]:
+        return _run_usage.get() or self._process_run
+
+    @contextmanager
+    def run_scope(self) -> Iterator[None]:
+        """
+        Account the requests made in this context as a separate run, e.g. one job of the
+        job server. Worker threads join the run if they run in a copy of this context.
+        """
+        token = _run_usage.set(_new_run())
+        try:
+            yield
+        finally:
+            _run_usage.reset(token)
+
+    def allows(self, prompt_tokens: int) -> bool:
+        """
+        Check whether a prompt of this size could be sent now, without reserving anything.
+        """
+        with self._lock:
+            return self._violation(prompt_tokens) is None
+
+    def reserve(self, prompt_tokens: int) -> None:
+        """
+        Reserve one request and its estimated input tokens before it is sent.
+
+        Args:
+            prompt_tokens (int): Estimated input tokens of the prompt
+
+        Raises:
+            BudgetExceededError: If the request would exceed a run or daily limit
+        """
+        with self._lock:
+            violation = self._violation(prompt_tokens)
+            if violation:
+                self.run['refused'] += 1
+                raise BudgetExceededError(violation)
+            self._add({'requests': 1, 'input_tokens': prompt_tokens, 'output_tokens': 0,
+                       'cost': self.cost(prompt_tokens, 0)})
+
+    def settle(self, estimated_input_tokens: int, input_tokens: int, output_tokens: int) -> None:
+        """
+        Replace the reserved estimate with the usage reported for the request.
+
+        Args:
+            estimated_input_tokens (int): Input tokens reserved for the request
+            input_tokens (int): Input tokens actually used
+            output_tokens (int): Output tokens actually used
+        """
+        input_delta = input_tokens - estimated_input_tokens
+        with self._lock:
+            self._add({'requests': 0, 'input_tokens': input_delta, 'output_tokens': output_tokens,
+                       'cost': self.cost(input_delta, output_tokens)})
+            self._save_day()
+
+    def _violation(self, prompt_tokens: int) -> Optional[str]:
+        if self.max_prompt_tokens and prompt_tokens > self.max_prompt_tokens:
+            return f"prompt of ~{prompt_tokens} tokens is over the {self.max_prompt_tokens} token prompt limit"
+        self._roll_day()
+        request = {'requests': 1, 'input_tokens': prompt_tokens, 'output_tokens': 0,
+                   'cost': self.cost(prompt_tokens, 0)}
+        for scope, usage, limits in (('run', self.run, self.run_limits), ('daily', self._day_usage, self.day_limits)):
+            for field in USAGE_FIELDS:
+                limit = limits.get(field)
+                if not limit:
+                    continue
+                # Output tokens are only known afterwards, so requests are refused once they are spent
+                if field == 'output_tokens':
+                    exceeded = usage[field] >= limit
+                else:
+                    exceeded = usage[field] + request[field] > limit
+                if exceeded:
+                    return f"{scope} {field.replace('_', ' ')} budget of {limit:g} exhausted ({usage[field]:g} used)"
+        return None
+
+    def _add(self, delta: Dict[str, float]) -> None:
+        self._roll_day()
+        run = self.run
+        for field in USAGE_FIELDS:
+            run[field] += delta[field]
+            self._day_usage[field] += delta[field]
+            self._unsaved[field] += delta[field]
+
+    def _roll_day(self) -> None:
+        today = self.today().isoformat()
+        if today != self._day:
+            # Usage not saved yet still belongs to the day it was made on
+            self._save_day()
+            self._day = today
+            self._day_usage = _empty_usage()
+            self._save_day()
+
+    def _save_day(self) -> None:
+        """
+        Add the unsaved usage to the usage file and refresh the day's usage from it.
+
+        The file is re-read under an exclusive lock, so usage recorded by other
+        processes since the last save is kept and counted against the daily limits.
+        """
+        if not self.usage_path:
+            return
+        lock_path = self.usage_path.with_name(self.usage_path.name + '.lock')
+        try:
+            with open(lock_path, 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                stored = _empty_usage()
+                if self.usage_path.exists():
+                    try:
+                        data = json.loads(self.usage_path.read_text())
+                        if data.get('date') == self._day:
+                            stored = {field: data.get(field, 0) for field in USAGE_FIELDS}
+                    except ValueError as e:
+                        logger.warning(f"Could not read LLM usage file {self.usage_path}: {str(e)}")
+                day_usage = {field: stored[field] + self._unsaved[field] for field in USAGE_FIELDS}
+                if any(self._unsaved.values()):
+                    tmp_path = self.usage_path.with_name(self.usage_path.name + '.tmp')
+                    tmp_path.write_text(json.dumps({'date': self._day, **day_usage}))
+                    os.replace(tmp_path, self.usage_path)
+        except OSError as e:
+            logger.warning(f"Could not update LLM usage file {self.usage_path}: {str(e)}")
+            return
+        self._day_usage = day_usage
+        self._unsaved = _empty_usage()
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            self._roll_day()
+            run = dict(self.run)
+            return {'run': {field: run[field] for field in USAGE_FIELDS}, 'day': dict(self._day_usage),
+                    'refused': run['refused']}
+
+    def format_summary(self) -> str:
+        """
+        Describe the run and daily usage against their limits in a few lines.
+        """
+        summary = self.summary()
+        lines = ["LLM usage:"]
+        for scope, limits in (('run', self.run_limits), ('day', self.day_limits)):
+            parts = []
+            for field in USAGE_FIELDS:
+                used = summary[scope][field]
+                value = f"${used:.4f}" if field == 'cost' else f"{used:,.0f}"
+                limit = limits.get(field)
+                if limit:
+                    value += f" / {'$' if field == 'cost' else ''}{limit:,g}"
+                parts.append(f"{field.replace('_', ' ')} {value}")
+            lines.append(f"  this {scope}: " + ", ".join(parts))
+        if summary['refused']:
+            lines.append(f"  {summary['refused']} requests refused by the budget, deterministic fallbacks used")
+        return "\n".join(lines)
+
+_budget: Optional[BudgetGovernor] = None
+_budget_lock = threading.Lock()
+
+def get_budget() -> BudgetGovernor:
+    """
+    Get the process-wide budget governor, creating it on first use.
+    """
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            usage_path = os.getenv('LLM_USAGE_FILE') or str(Path.home() / '.llm_usage.json')
+            _budget = BudgetGovernor(usage_path=Path(usage_path).expanduser())
+        return _budget
+
+def set_budget(budget: BudgetGovernor) -> None:
+    """
+    Replace the process-wide budget governor.
+    """
+    global _budget
+    with _budget_lock:
+        _budget = budget
@@ -3,33 +3,50 @@ Orchestration LLM agent using Gemini-2.0-flash-exp.
 """
 
 import logging
-import json
 import inspect
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Optional
 from pathlib import Path
-from .base_llm import generate_response, initialize_llm
+from .base_llm import generate_json, initialize_llm
 from src.file_organizer.organizer import organize_files, create_category_dirs, validate_folder, is_organized
-from src.compression.pdf_compressor import compress_pdf
-from src.compression.image_compressor import compress_image
+from src.compression.pdf_compressor import compress_pdf, compress_inventory_pdfs
+from src.compression.image_compressor import compress_image, compress_inventory_images
+from src.compression.ledger import CompressionLedger
+from src.file_organizer.inventory import FileInventory
 from src.todo.todo_executer import process_tasks
+from src.monitoring.metrics import STEP_LATENCY, write_textfile_from_env
 
 
 logger = logging.getLogger(__name__)
 
 
-def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
-    """
-    Plan and execute tasks using LLM orchestration.
-    
-    Args:
-        tasks (List[str]): List of tasks to execute
-        folder_path (str): Path to the target folder
-    """
-    # Initialize LLM
-    executing_plan_agent = initialize_llm()
-    
-    # Create context with available functions
-    function_context = """
+# Functions the planner may schedule, in the order they are described to it
+PLAN_FUNCTIONS = [
+    'validate_folder',
+    'is_organized',
+    'create_category_dirs',
+    'organize_files',
+    'compress_pdf',
+    'compress_image',
+    'process_tasks',
+]
+
+# Response schema for the execution plan
+PLAN_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'step': {'type': 'integer'},
+            'function': {'type': 'string', 'format': 'enum', 'enum': PLAN_FUNCTIONS},
+        },
+        'required': ['step', 'function'],
+    },
+}
+
+# Context with available functions
+FUNCTION_CONTEXT = """
     Available functions and their purposes:
     
     1. validate_folder(folder_path: Path) -> Path:
@@ -64,25 +81,87 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
         agent (Optional[genai.GenerativeModel]): The LLM agent instance used for parsing tasks.
         - Returns: None
     """
-    
-    # Create planning prompt
-    prompt = f"""
-    Given these tasks: {tasks}
-    And folder path: {folder_path}
-    
-    {function_context}
-    
+
+# Deterministic plan per task, used when the planner cannot be asked
+STATIC_PLAN_STEPS = {
+    'organize': ['validate_folder', 'is_organized', 'create_category_dirs', 'organize_files'],
+    'compress': ['compress_pdf', 'compress_image'],
+    'todo': ['process_tasks'],
+}
+
+PLANNING_RULES = """
     Plan the sequence of function calls needed to execute these tasks. For compression tasks, you don't havae to run all until compress. 
     Just run compression which already has functionality to check if files are organized and then compresses them.
     If users selects only todo then return only the process_tasks function. No need of other functions.
     If user selects all function then give all functions in the plan in order that process_tasks is last.
-    Return a JSON array of function calls in order that needs to be executed.
-    Don't give args or kwargs in the plan. Just return one json file with function names and steps in order like below """ + \
-    """[ {step': 'step_number', 'function': 'function_name'}]
+    Don't give args or kwargs in the plan. Just return the function names and step numbers in the order they need to be executed.
+    """
+
+def create_execution_plan(tasks: List[str], folder_path: str, agent=None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Ask the LLM for the sequence of functions that executes the given tasks.
+
+    Args:
+        tasks (List[str]): List of tasks to execute
+        folder_path (str): Path to the target folder
+        agent (Optional[genai.GenerativeModel]): Planning agent, initialized if not given
+
+    Falls back to the static plan if the planner fails or is over the LLM budget.
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: Plan steps with 'step' and 'function', None if
+        there are no known tasks to plan
     """
+    prompt = f"""
+    Given these tasks: {tasks}
+    And folder path: {folder_path}
+    
+    {FUNCTION_CONTEXT}
+    {PLANNING_RULES}
+    """
+    plan = generate_json(prompt, PLAN_SCHEMA, agent or initialize_llm())
+    if plan:
+        return plan
+    logger.warning("Planner unavailable, using the static execution plan")
+    return create_static_plan(tasks)
+
+def create_static_plan(tasks: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build the execution plan for the given tasks without calling the LLM.
+
+    Args:
+        tasks (List[str]): List of tasks in execution order
+
+    Returns:
+        Optional[List[Dict[str, Any]]]: Plan steps with 'step' and 'function', None if
+        none of the tasks is known
+    """
+    functions = [function for task in tasks for function in STATIC_PLAN_STEPS.get(task, [])]
+    return [{'step': step, 'function': function} for step, function in enumerate(functions, 1)] or None
+
+def plan_and_execute_tasks(tasks: List[str], folder_path: str,
+                           execution_plan: Optional[List[Dict[str, Any]]] = None,
+                           classifications: Optional[FileInventory] = None,
+                           cancel_event: Optional[threading.Event] = None) -> bool:
+    """
+    Plan and execute tasks using LLM orchestration.
     
+    Args:
+        tasks (List[str]): List of tasks to execute
+        folder_path (str): Path to the target folder
+        execution_plan (Optional[List[Dict[str, Any]]]): Plan already produced together
+            with the task interpretation; the planner is only called when it is missing
+        classifications (Optional[FileInventory]): Inventory classified while the user was
+            confirming; files missing from it are classified as usual
+        cancel_event (Optional[threading.Event]): Stops the run before the next plan step when set
+
+    Returns:
+        bool: True if every step ran, False if the run failed or was cancelled
+    """
+    func_name, step_start = None, None
     try:
-        response = generate_response(prompt, executing_plan_agent)
+        if not execution_plan:
+            execution_plan = create_execution_plan(tasks, folder_path)
         
         # Give some good logging to say that the process is starting on CLI like drawing a bot
         logger.info(
@@ -97,24 +176,9 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
             "\nI'm processing your requests!\n"
         )
         
-        
-        
-        
-        
-        if not response:
+        if not execution_plan:
             raise ValueError("Failed to get execution plan from LLM")
         
-        # Sanitize the response by removing any code block markers
-        sanitized_response = response.replace("```json", "").replace("```", "").strip()
-        
-        # Attempt to parse the sanitized response
-        try:
-            execution_plan = json.loads(sanitized_response)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decoding error: {str(e)}")
-            logger.error(f"Sanitized response content: {sanitized_response}")
-            raise
-        
         has_other_task=False
         # Log the execution plan
         logger.info("Execution plan:")
@@ -134,7 +198,8 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
         'folder_path': folder_path,
         'file_classifier_agent': file_classifier_agent,
         'tasks_interpreter_agent': tasks_interpreter_agent,
-        'todo_file': Path(folder_path) / 'Files/todo.txt'
+        'todo_file': Path(folder_path) / 'Files/todo.txt',
+        'classifications': classifications
         }
         
         # Map function names to actual function objects
@@ -154,11 +219,16 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
         for step in execution_plan:
             func_name = step['function']
             
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"Run cancelled before {func_name}")
+                return False
+            
             if organise_check and not has_other_task:
                 logger.info("Skipping create_category_dirs and organize_files as files are already organized")
                 break
             # Log the args for debugging
             logger.info(f"Executing function: {func_name}")
+            step_start = time.perf_counter()
             
             # Get the function from the map
             func = function_map.get(func_name)
@@ -187,23 +257,28 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
                 if not organise_check:
                     # Check if files are organized before compression
                     logger.info(f"Checking if files are organized before compression")
-                    if is_organized(folder_path, file_classifier_agent):
+                    if is_organized(folder_path, file_classifier_agent, classifications):
                         logger.info("Files are already organized")
                     else:
                         logger.info("Organizing Files before compression.")
                         create_category_dirs(folder_path)
-                        organize_files(folder_path,file_classifier_agent)
+                        organize_files(folder_path,file_classifier_agent,classifications)
                     organise_check=True
                 # Special handling for compress functions
                 folder_type = "Documents" if func_name == 'compress_pdf' else "Images"
                 folder = Path(folder_path) / folder_type
-                for file in folder.rglob('*'):
-                    if func_name == 'compress_pdf' and file.suffix.lower() == '.pdf':
-                        func(file)
-                    elif func_name == 'compress_image' and file.suffix.lower() in ['.jpg', '.jpeg', '.png']:
-                        func(file)
+                # Compress in batches so PDFs use a process pool and images upload concurrently.
+                # The ledger skips files whose content was already compressed in an earlier run.
+                ledger = CompressionLedger.for_folder(folder_path)
+                inventory = FileInventory.scan(folder)
+                if func_name == 'compress_pdf':
+                    compress_inventory_pdfs(inventory, ledger=ledger)
+                else:
+                    compress_inventory_images(inventory, ledger=ledger)
             else:
                 func(**filtered_args)
+            STEP_LATENCY.observe(time.perf_counter() - step_start, step=func_name, status='ok')
+            step_start = None
         
         logger.info(
             "\n"
@@ -213,6 +288,12 @@ def plan_and_execute_tasks(tasks: List[str], folder_path: str) -> None:
             "     /   \    \n"
             "\nThank you for using AI Assistant Bot!\n"
         )
+        return True
         
     except Exception as e:  
+        if step_start is not None:
+            STEP_LATENCY.observe(time.perf_counter() - step_start, step=func_name, status='failed')
         logger.error(f"Error in task execution: {str(e)}")
+        return False
+    finally:
+        write_textfile_from_env()
@@ -0,0 +1,101 @@
+"""
+Speculative pre-execution work that runs while the user is still confirming.
+"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .base_llm import initialize_llm
+from .orchestrator import create_execution_plan
+from src.file_organizer.file_classifier import classify_inventory
+from src.file_organizer.inventory import FileInventory
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_FOLDERS = ['Files', 'Documents', 'Images', 'Code', 'Others']
+
+def classify_folder(folder_path: str) -> FileInventory:
+    """
+    Scan the working folder and classify every file into one inventory.
+
+    Covers the unorganized 'Files' folder and the category folders, so the result
+    serves both is_organized and organize_files.
+
+    Args:
+        folder_path (str): Path to the target folder
+
+    Returns:
+        FileInventory: Inventory of the folder with every file's category filled in
+    """
+    inventory = FileInventory(Path(folder_path))
+    for folder in CATEGORY_FOLDERS:
+        if (Path(folder_path) / folder).exists():
+            inventory.add_tree(Path(folder_path) / folder)
+    if len(inventory):
+        classify_inventory(inventory, initialize_llm())
+    return inventory
+
+class SpeculativePrefetch:
+    """
+    Start the scan, classification and planning for a tentative task set in the background.
+
+    The results are only used if the user confirms the tasks; otherwise cancel()
+    drops them. Any failure makes the corresponding result None, in which case the
+    orchestrator does the work itself as usual.
+
+    Args:
+        tasks (List[str]): Tentative list of tasks
+        folder_path (str): Validated folder path
+        execution_plan (Optional[List[Dict[str, Any]]]): Plan already produced with the
+            task interpretation; a plan is only requested when this is missing
+    """
+
+    def __init__(self, tasks: List[str], folder_path: str,
+                 execution_plan: Optional[List[Dict[str, Any]]] = None):
+        self.tasks = tasks
+        self.folder_path = folder_path
+        self.execution_plan = execution_plan
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch')
+        self._classifications: Optional[Future] = None
+        self._plan: Optional[Future] = None
+
+    def start(self) -> 'SpeculativePrefetch':
+        # Todo tasks only read the todo file, which is parsed when the tasks run
+        if 'organize' in self.tasks or 'compress' in self.tasks:
+            self._classifications = self._executor.submit(classify_folder, self.folder_path)
+        if not self.execution_plan:
+            self._plan = self._executor.submit(create_execution_plan, self.tasks, self.folder_path)
+        logger.info("Started speculative prefetch while waiting for confirmation")
+        return self
+
+    def _result(self, future: Optional[Future]) -> Any:
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed, the work will be redone: {str(e)}")
+            return None
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Wait for the prefetched work.
+
+        Returns:
+            Dict[str, Any]: 'execution_plan' and 'classifications' keyword arguments
+            for plan_and_execute_tasks
+        """
+        prefetched = {
+            'execution_plan': self.execution_plan or self._result(self._plan),
+            'classifications': self._result(self._classifications),
+        }
+        self._executor.shutdown(wait=False)
+        return prefetched
+
+    def cancel(self) -> None:
+        """
+        Discard the prefetched work. Requests already in flight finish in the background.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,280 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms are updated by the LLM, organizer, compression
+and todo modules. Long-running modes expose them on a /metrics endpoint (job
+server) or write them to a Prometheus textfile (METRICS_TEXTFILE), e.g. for the
+node_exporter textfile collector.
+"""
+
+import abc
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric(abc.ABC):
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return lines + self._samples()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Sample lines of the metric in the text exposition format."""
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, e.g. requests or bytes processed.
+    """
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, e.g. remaining quota.
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, e.g. latencies in seconds.
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observe the duration of the with block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+    def write_textfile(self, path: Path) -> None:
+        """
+        Write the rendered metrics atomically, so collectors never read a partial file.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(self.render())
+        os.replace(tmp_path, path)
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# LLM
+LLM_REQUESTS = REGISTRY.counter('llm_requests_total', 'LLM requests by outcome', ['status'])
+LLM_TOKENS = REGISTRY.counter('llm_tokens_total', 'LLM tokens by direction', ['direction'])
+LLM_LATENCY = REGISTRY.histogram('llm_request_seconds', 'LLM request latency')
+
+# Caches: todo parse cache, compression ledger, market data and execution plans
+CACHE_LOOKUPS = REGISTRY.counter('cache_lookups_total', 'Cache lookups by cache and result', ['cache', 'result'])
+
+# File organizer
+FILES_SCANNED = REGISTRY.counter('organizer_files_scanned_total', 'Files found by directory scans')
+FILES_COPIED = REGISTRY.counter('organizer_files_copied_total', 'Files copied into category folders', ['category'])
+BYTES_COPIED = REGISTRY.counter('organizer_bytes_copied_total', 'Bytes copied into category folders')
+
+# Compression
+COMPRESSION_FILES = REGISTRY.counter('compression_files_total', 'Compressed files by kind, backend and outcome',
+                                     ['kind', 'backend', 'status'])
+COMPRESSION_BYTES_IN = REGISTRY.counter('compression_bytes_in_total', 'Bytes of successfully compressed inputs',
+                                        ['kind', 'backend'])
+COMPRESSION_BYTES_OUT = REGISTRY.counter('compression_bytes_out_total', 'Bytes of compressed outputs',
+                                         ['kind', 'backend'])
+TINYPNG_REMAINING = REGISTRY.gauge('tinypng_compressions_remaining', 'TinyPNG compressions left this month')
+
+# Todo tasks
+EMAILS_SENT = REGISTRY.counter('emails_sent_total', 'Emails handed to the SMTP server by outcome', ['status'])
+TODO_TASKS = REGISTRY.histogram('todo_task_seconds', 'Todo task latency by type and outcome', ['type', 'status'])
+
+# Orchestrator
+STEP_LATENCY = REGISTRY.histogram('plan_step_seconds', 'Execution plan step latency', ['step', 'status'])
+
+def record_compression(kind: str, backend: str, file_path: Path, compressed_path: Optional[Path]) -> None:
+    """
+    Count one compression attempt and its bytes in and out.
+
+    Args:
+        kind (str): 'pdf' or 'image'
+        backend (str): Backend that compressed the file
+        file_path (Path): Original file
+        compressed_path (Optional[Path]): Compressed file, None if compression failed, or a
+            falsy NoGain if the output was not smaller and the original was kept
+    """
+    if compressed_path is not None and not compressed_path:
+        COMPRESSION_FILES.inc(kind=kind, backend=backend, status='no_gain')
+        return
+    if compressed_path is None:
+        COMPRESSION_FILES.inc(kind=kind, backend=backend, status='failed')
+        return
+    try:
+        bytes_in, bytes_out = file_path.stat().st_size, compressed_path.stat().st_size
+    except OSError:
+        COMPRESSION_FILES.inc(kind=kind, backend=backend, status='failed')
+        return
+    COMPRESSION_FILES.inc(kind=kind, backend=backend, status='ok')
+    COMPRESSION_BYTES_IN.inc(bytes_in, kind=kind, backend=backend)
+    COMPRESSION_BYTES_OUT.inc(bytes_out, kind=kind, backend=backend)
+
+def write_textfile_from_env() -> None:
+    """
+    Write the registry to the file named by METRICS_TEXTFILE, if it is set.
+    """
+    path = os.getenv('METRICS_TEXTFILE')
+    if not path:
+        return
+    try:
+        REGISTRY.write_textfile(Path(path))
+    except OSError as e:
+        logger.warning(f"Could not write metrics to {path}: {str(e)}")
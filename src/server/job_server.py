@@ -0,0 +1,363 @@
+"""
+Long-lived local job server for organize, compress and todo runs.
+
+The server process keeps the LLM models, the TinyPNG and ILovePDF sessions and
+the execution plans warm, so a job only pays for the work on its folder:
+
+    python -m src.server.job_server --port 8765 --workers 2
+
+    POST   /jobs          {"tasks": ["organize", "compress"], "folder": "/path/to/My_Folder"}
+    GET    /jobs          list jobs
+    GET    /jobs/<id>     job status
+    DELETE /jobs/<id>     cancel a queued job, or stop a running one before its next step
+    GET    /health        server status
+    GET    /metrics       Prometheus metrics
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from src.compression.image_compressor import get_tinify_session
+from src.compression.pdf_compressor import get_ilovepdf_session
+from src.file_organizer.organizer import validate_folder
+from src.llm.agent import VALID_TASKS, order_tasks
+from src.llm.base_llm import initialize_llm
+from src.llm.budget import get_budget
+from src.llm.orchestrator import create_execution_plan, plan_and_execute_tasks
+from src.monitoring.metrics import CACHE_LOOKUPS, CONTENT_TYPE, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+class Job:
+    """
+    A queued or running plan_and_execute_tasks call and its status.
+
+    Args:
+        tasks (List[str]): Tasks to run, in execution order
+        folder_path (str): Validated folder to run them on
+    """
+
+    def __init__(self, tasks: List[str], folder_path: str):
+        self.id = uuid.uuid4().hex
+        self.tasks = tasks
+        self.folder_path = folder_path
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'tasks': self.tasks,
+            'folder': self.folder_path,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'cancel_requested': self.cancel_event.is_set(),
+        }
+
+class JobManager:
+    """
+    Queue jobs onto a bounded worker pool and keep their status.
+
+    Jobs on the same folder run one at a time: while one runs, the others wait in
+    a per-folder queue without taking a worker, so jobs on different folders keep
+    running in parallel up to max_workers. Execution plans only depend on the task list, so
+    they are cached and the planner is called once per distinct task list.
+
+    Args:
+        max_workers (Optional[int]): Jobs running at once, defaults to JOB_SERVER_WORKERS or 2
+        max_queued (Optional[int]): Jobs waiting at most before new ones are rejected,
+            defaults to JOB_SERVER_MAX_QUEUED or 100
+        history (int): Finished jobs kept for status polling
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queued: Optional[int] = None, history: int = 1000):
+        self.max_workers = max_workers or int(os.getenv('JOB_SERVER_WORKERS', '2'))
+        self.max_queued = max_queued or int(os.getenv('JOB_SERVER_MAX_QUEUED', '100'))
+        self.history = history
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._plans: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        # Folders with a queued or running job, and the jobs waiting behind it
+        self._folder_queues: Dict[str, Deque[Job]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+
+    def warm(self) -> None:
+        """
+        Create the LLM model and the compression sessions before the first job arrives.
+        """
+        initialize_llm()
+        tinify_session = get_tinify_session()
+        if tinify_session is not None:
+            try:
+                tinify_session.warm()
+            except Exception as e:
+                logger.warning(f"Could not warm up TinyPNG session: {str(e)}")
+        ilovepdf_session = get_ilovepdf_session()
+        if ilovepdf_session is not None:
+            # Keep the HTTP connection and auth token open for the lifetime of the server
+            ilovepdf_session.__enter__()
+            # Job threads must reuse the client opened here instead of creating their own
+            if not self._executor.submit(self.ilovepdf_warm).result():
+                logger.warning("Job threads do not share the warmed ILovePDF client")
+        logger.info("Clients warmed up")
+
+    def ilovepdf_warm(self) -> bool:
+        """
+        Check that the warmed ILovePDF client is visible from the calling thread.
+        """
+        session = get_ilovepdf_session()
+        return session is not None and session.reuses_client()
+
+    def submit(self, tasks: List[str], folder_path: str) -> Job:
+        """
+        Validate and queue a job.
+
+        Raises:
+            ValueError: If the tasks or the folder are invalid or the queue is full
+        """
+        ordered = order_tasks(tasks)
+        if not ordered or len(ordered) != len(set(task.strip().lower() for task in tasks)):
+            raise ValueError(f"Tasks must be a non-empty list of {VALID_TASKS}")
+        folder_path = str(validate_folder(folder_path))
+
+        with self._lock:
+            queued = sum(1 for job in self.jobs.values() if job.status == 'queued')
+            if queued >= self.max_queued:
+                raise ValueError(f"Job queue is full ({queued} jobs waiting)")
+            job = Job(ordered, folder_path)
+            self.jobs[job.id] = job
+            self._prune()
+            waiting = self._folder_queues.get(folder_path)
+            if waiting is None:
+                self._folder_queues[folder_path] = deque()
+                job.future = self._executor.submit(self._run, job)
+            else:
+                waiting.append(job)
+        logger.info(f"Queued job {job.id}: {', '.join(ordered)} on {folder_path}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued job, or ask a running job to stop before its next plan step.
+
+        Returns:
+            Optional[Job]: The job, None if it does not exist
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status in FINISHED_STATUSES:
+                return job
+            job.cancel_event.set()
+            if job.future is None:
+                # Still waiting behind another job on its folder
+                self._folder_queues[job.folder_path].remove(job)
+                self._finish(job, 'cancelled')
+            elif job.future.cancel():
+                self._start_next(job.folder_path)
+                self._finish(job, 'cancelled')
+        return job
+
+    def shutdown(self) -> None:
+        for job in self.list_jobs():
+            if job.status == 'queued':
+                self.cancel(job.id)
+        self._executor.shutdown(wait=True)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def _start_next(self, folder_path: str) -> None:
+        """
+        Submit the next job waiting on a folder, or mark the folder idle. Call with the lock held.
+        """
+        waiting = self._folder_queues[folder_path]
+        if waiting:
+            job = waiting.popleft()
+            job.future = self._executor.submit(self._run, job)
+        else:
+            del self._folder_queues[folder_path]
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        logger.info(f"Job {job.id} {status}" + (f": {error}" if error else ""))
+
+    def _plan(self, tasks: List[str], folder_path: str) -> Optional[List[Dict[str, Any]]]:
+        key = tuple(tasks)
+        with self._lock:
+            plan = self._plans.get(key)
+        CACHE_LOOKUPS.inc(cache='execution_plan', result='miss' if plan is None else 'hit')
+        if plan is None:
+            plan = create_execution_plan(tasks, folder_path)
+            if plan:
+                with self._lock:
+                    self._plans[key] = plan
+        return plan
+
+    def _run(self, job: Job) -> None:
+        try:
+            self._execute(job)
+        finally:
+            with self._lock:
+                self._start_next(job.folder_path)
+
+    def _execute(self, job: Job) -> None:
+        if job.cancel_event.is_set():
+            self._finish(job, 'cancelled')
+            return
+        job.status = 'running'
+        job.started_at = time.time()
+        budget = get_budget()
+        # Each job is its own run for the LLM budget, the daily budget is shared by all jobs
+        with budget.run_scope():
+            try:
+                ok = plan_and_execute_tasks(job.tasks, job.folder_path, self._plan(job.tasks, job.folder_path),
+                                            cancel_event=job.cancel_event)
+            except Exception as e:
+                self._finish(job, 'failed', str(e))
+                return
+            finally:
+                logger.info(f"Job {job.id} {budget.format_summary()}")
+        if job.cancel_event.is_set():
+            self._finish(job, 'cancelled')
+        elif ok:
+            self._finish(job, 'succeeded')
+        else:
+            self._finish(job, 'failed', 'task execution failed, see server log')
+
+def make_handler(manager: JobManager):
+    """
+    Build the request handler class bound to a job manager.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args) -> None:
+            logger.debug(format % args)
+
+        def send_json(self, status: int, data: Any) -> None:
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def job_id(self) -> Optional[str]:
+            parts = self.path.strip('/').split('/')
+            return parts[1] if len(parts) == 2 and parts[0] == 'jobs' else None
+
+        def do_GET(self) -> None:
+            if self.path == '/health':
+                jobs = manager.list_jobs()
+                self.send_json(200, {
+                    'status': 'ok',
+                    'workers': manager.max_workers,
+                    'queued': sum(1 for job in jobs if job.status == 'queued'),
+                    'running': sum(1 for job in jobs if job.status == 'running'),
+                    'ilovepdf_warm': manager.ilovepdf_warm(),
+                })
+            elif self.path == '/metrics':
+                body = REGISTRY.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            elif self.path.rstrip('/') == '/jobs':
+                self.send_json(200, [job.to_dict() for job in manager.list_jobs()])
+            elif self.job_id():
+                job = manager.get(self.job_id())
+                if job is None:
+                    self.send_json(404, {'error': 'job not found'})
+                else:
+                    self.send_json(200, job.to_dict())
+            else:
+                self.send_json(404, {'error': f"unknown path {self.path}"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip('/') != '/jobs':
+                self.send_json(404, {'error': f"unknown path {self.path}"})
+                return
+            try:
+                data = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                tasks = data.get('tasks')
+                if isinstance(tasks, str):
+                    tasks = [tasks]
+                if not isinstance(tasks, list) or not isinstance(data.get('folder'), str):
+                    raise ValueError("Body must contain 'tasks' (list) and 'folder' (string)")
+                job = manager.submit(tasks, data['folder'])
+            except ValueError as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            self.send_json(202, job.to_dict())
+
+        def do_DELETE(self) -> None:
+            job = manager.cancel(self.job_id()) if self.job_id() else None
+            if job is None:
+                self.send_json(404, {'error': 'job not found'})
+            else:
+                self.send_json(200, job.to_dict())
+
+    return Handler
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the local organize/compress/todo job server")
+    parser.add_argument('--host', default=os.getenv('JOB_SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('JOB_SERVER_PORT', '8765')))
+    parser.add_argument('--workers', type=int, default=None, help="jobs running at once")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    manager = JobManager(max_workers=args.workers)
+    manager.warm()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(manager))
+    server.daemon_threads = True
+    logger.info(f"Job server listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down job server")
+    finally:
+        server.server_close()
+        manager.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Google Calendar client that is built once per run and inserts events in batches.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from googleapiclient.discovery import build
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# Google's batch endpoint accepts at most 50 requests per call
+MAX_BATCH_SIZE = 50
+
+def load_credentials(token_file: str = 'token.json', credentials_file: str = 'credentials.json'):
+    """
+    Load OAuth credentials, refreshing or running the InstalledAppFlow if needed.
+
+    Args:
+        token_file (str): Cached user token, rewritten after a refresh or new login
+        credentials_file (str): OAuth client secrets from Google Cloud Console
+
+    Returns:
+        google.oauth2.credentials.Credentials: Valid credentials
+    """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds = None
+    if os.path.exists(token_file):
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_file, SCOPES)
+            creds = flow.run_local_server(port=0)
+        with open(token_file, 'w') as token:
+            token.write(creds.to_json())
+    return creds
+
+def build_event_body(event_name: str, event_date: str, recipient, duration: Optional[int] = 15) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Build the Calendar API event resource for a calendar invite.
+
+    Args:
+        event_name (str): Name/summary of the event.
+        event_date (str): Start date/time in ISO 8601 format (e.g., "2025-03-01T09:00:00").
+        recipient: A single email address (str) or a comma-separated string / list of emails.
+        duration (int, optional): Duration of the event in minutes. Defaults to 15.
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: Event resource and the list of attendee emails
+    """
+    start_dt = datetime.fromisoformat(event_date)
+    try:
+        duration = int(duration)
+    except Exception:
+        duration = 15
+    end_dt = start_dt + timedelta(minutes=duration)
+
+    if isinstance(recipient, str):
+        recipients = [r.strip() for r in recipient.split(",")]
+    elif isinstance(recipient, list):
+        recipients = recipient
+    else:
+        recipients = []
+    attendees = [{"email": r} for r in recipients]
+
+    event = {
+        'summary': event_name,
+        'description': 'Blocking time on calendar for project event',
+        'start': {
+            'dateTime': start_dt.isoformat(),
+            'timeZone': 'IST',
+        },
+        'end': {
+            'dateTime': end_dt.isoformat(),
+            'timeZone': 'IST',
+        },
+        'attendees': attendees,
+        'reminders': {
+            'useDefault': True,
+        },
+        'transparency': 'opaque'
+    }
+    return event, recipients
+
+class CalendarClient:
+    """
+    Calendar API service built once and reused for every event of a run.
+
+    The discovery document bundled with google-api-python-client is used, so
+    building the client does not fetch anything over the network.
+
+    Args:
+        credentials: OAuth credentials, loaded with load_credentials() if not given
+        http: httplib2-compatible transport, e.g. googleapiclient.http.HttpMock for tests
+        calendar_id (str): Calendar to insert events into
+        timeout (Optional[float]): Socket timeout in seconds for API requests
+    """
+
+    def __init__(self, credentials=None, http=None, calendar_id: str = 'primary',
+                 timeout: Optional[float] = None):
+        self.calendar_id = calendar_id
+        if http is None and timeout is not None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            http = AuthorizedHttp(credentials or load_credentials(), http=httplib2.Http(timeout=timeout))
+        if http is not None:
+            self.service = build('calendar', 'v3', http=http, cache_discovery=False)
+        else:
+            self.service = build('calendar', 'v3', credentials=credentials or load_credentials(),
+                                 cache_discovery=False)
+
+    def insert_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert events using batched HTTP requests of up to MAX_BATCH_SIZE events each.
+
+        Args:
+            events (List[Dict[str, Any]]): Event resources, e.g. from build_event_body
+
+        Returns:
+            List[Dict[str, Any]]: One result per event in input order, with the created
+            event under 'event' or the failure under 'error'
+        """
+        results: List[Dict[str, Any]] = [{'event': None, 'error': None} for _ in events]
+
+        def callback(request_id: str, response: Any, exception: Optional[Exception]) -> None:
+            index = int(request_id)
+            if exception is not None:
+                results[index]['error'] = str(exception)
+            else:
+                results[index]['event'] = response
+
+        for start in range(0, len(events), MAX_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for index in range(start, min(start + MAX_BATCH_SIZE, len(events))):
+                request = self.service.events().insert(calendarId=self.calendar_id, body=events[index],
+                                                       sendUpdates='all')
+                batch.add(request, request_id=str(index))
+            try:
+                batch.execute()
+            except Exception as e:
+                for index in range(start, min(start + MAX_BATCH_SIZE, len(events))):
+                    if results[index]['event'] is None:
+                        results[index]['error'] = str(e)
+        return results
@@ -0,0 +1,291 @@
+"""
+Concurrent todo task dispatcher with separate concurrency limits per external service.
+
+Emails, calendar invites and stock alerts are run on a shared thread pool, but each
+service only gets as many simultaneous calls as its limit allows. Every service
+client is created with its own timeout, so a slow Calendar API delays only the
+calendar invites and the run finishes in roughly the time of the slowest service.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.monitoring.metrics import TODO_TASKS
+from src.todo.calendar_client import MAX_BATCH_SIZE, CalendarClient, load_credentials
+from src.todo.mailer import SmtpMailer
+from src.todo.market_data import QuoteService, YFinanceSource
+from src.todo.todo_executer import (create_calendar_events, format_stock_alert, get_stock_price,
+                                    handle_unknown_task, is_calendar_invite, send_email)
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ('smtp', 'calendar', 'market_data')
+
+DEFAULT_CONCURRENCY = {'smtp': 4, 'calendar': 2, 'market_data': 4}
+DEFAULT_TIMEOUT = {'smtp': 30.0, 'calendar': 60.0, 'market_data': 30.0}
+
+def get_service_limits() -> Dict[str, Dict[str, float]]:
+    """
+    Read per-service concurrency limits and timeouts from the environment.
+
+    TODO_<SERVICE>_CONCURRENCY and TODO_<SERVICE>_TIMEOUT override the defaults,
+    e.g. TODO_SMTP_CONCURRENCY=2 or TODO_CALENDAR_TIMEOUT=20.
+
+    Returns:
+        Dict[str, Dict[str, float]]: 'concurrency' and 'timeout' per service
+    """
+    limits = {}
+    for service in SERVICES:
+        prefix = f"TODO_{service.upper()}"
+        limits[service] = {
+            'concurrency': max(1, int(os.getenv(f"{prefix}_CONCURRENCY", str(DEFAULT_CONCURRENCY[service])))),
+            'timeout': float(os.getenv(f"{prefix}_TIMEOUT", str(DEFAULT_TIMEOUT[service]))),
+        }
+    return limits
+
+class _ServicePool:
+    """
+    Hand out at most `size` clients of one service, creating them lazily.
+
+    Each client is used by one thread at a time, so clients that are not
+    thread-safe (SMTP connections, httplib2) can still be used concurrently.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int, clients: Optional[List[Any]] = None):
+        self.factory = factory
+        self.size = size
+        self.clients: List[Any] = list(clients or [])
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        for client in self.clients:
+            self._idle.put(client)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        client = None
+        try:
+            client = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if len(self.clients) < self.size:
+                    client = self.factory()
+                    self.clients.append(client)
+        if client is None:
+            client = self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+class TaskDispatcher:
+    """
+    Run parsed todo tasks concurrently and record the outcome of every task.
+
+    Calendar invites are inserted in batches of up to MAX_BATCH_SIZE events, with
+    one batch per calendar slot. Stock quotes are prefetched in one request before
+    the stock alerts are sent.
+
+    Args:
+        limits (Optional[Dict[str, Dict[str, float]]]): Per-service 'concurrency' and
+            'timeout', defaults to get_service_limits()
+        mailer_factory (Optional[Callable[[], SmtpMailer]]): Creates one SMTP mailer per slot
+        calendar_factory (Optional[Callable[[], CalendarClient]]): Creates one Calendar client per slot
+        quotes (Optional[QuoteService]): Quote service shared by every stock alert
+        metadata_cache_path (Optional[Path]): Market metadata cache used when quotes is not given
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None,
+                 mailer_factory: Optional[Callable[[], SmtpMailer]] = None,
+                 calendar_factory: Optional[Callable[[], CalendarClient]] = None,
+                 quotes: Optional[QuoteService] = None, metadata_cache_path: Optional[Path] = None):
+        self.limits = limits or get_service_limits()
+        self.quotes = quotes or QuoteService(source=YFinanceSource(timeout=self.limits['market_data']['timeout']),
+                                             metadata_cache_path=metadata_cache_path)
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+
+        mailer_factory = mailer_factory or (lambda: SmtpMailer(timeout=self.limits['smtp']['timeout']))
+        smtp_slots = int(self.limits['smtp']['concurrency'])
+        first_mailer = mailer_factory()
+        if first_mailer.queue:
+            # Queued messages are merged per recipient, which only works within one mailer
+            smtp_slots = 1
+        self._mailers = _ServicePool(mailer_factory, smtp_slots, clients=[first_mailer])
+        self._calendars = _ServicePool(calendar_factory or self._new_calendar,
+                                       int(self.limits['calendar']['concurrency']))
+        self._market_slots = threading.BoundedSemaphore(int(self.limits['market_data']['concurrency']))
+
+    def __enter__(self) -> 'TaskDispatcher':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _new_calendar(self) -> CalendarClient:
+        # Load (and if needed refresh) the OAuth token once for all calendar slots
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials = load_credentials()
+        return CalendarClient(credentials=self._credentials, timeout=self.limits['calendar']['timeout'])
+
+    def close(self) -> None:
+        """
+        Flush queued emails and close every SMTP connection.
+        """
+        for mailer in self._mailers.clients:
+            mailer.close()
+
+    def dispatch(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Run all tasks and wait for them to finish.
+
+        Args:
+            tasks (List[Dict[str, Any]]): Parsed todo tasks
+
+        Returns:
+            Dict[str, Any]: 'results' with one record per task in input order
+            (type, status, error, latency and per-service seconds) and a 'summary'
+        """
+        started = time.perf_counter()
+        results: List[Dict[str, Any]] = [
+            {'index': index, 'type': task.get('type', 'unknown'), 'status': 'pending', 'error': None,
+             'latency': 0.0, 'services': {}}
+            for index, task in enumerate(tasks)
+        ]
+        workers = sum(int(limit['concurrency']) for limit in self.limits.values())
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            calendar_indexes = [index for index, task in enumerate(tasks) if is_calendar_invite(task)]
+            calendar_index_set = set(calendar_indexes)
+            for start in range(0, len(calendar_indexes), MAX_BATCH_SIZE):
+                chunk = calendar_indexes[start:start + MAX_BATCH_SIZE]
+                pool.submit(self._run_calendar_batch, [tasks[index] for index in chunk],
+                            [results[index] for index in chunk])
+
+            alerts = []
+            for index, task in enumerate(tasks):
+                task_type = task.get('type', 'unknown').lower()
+                if index in calendar_index_set:
+                    continue
+                if task_type == 'normal_email' and 'message' in task and 'reciever_email' in task:
+                    pool.submit(self._run_email, task, results[index])
+                elif task_type == 'stock_alert' and all(key in task for key in ('symbol', 'time', 'email')):
+                    alerts.append(index)
+                else:
+                    handle_unknown_task(task)
+                    results[index]['status'] = 'skipped'
+
+            # Emails and calendar batches are already running while the quotes are fetched
+            if alerts:
+                prefetch_started = time.perf_counter()
+                with self._market_slots:
+                    self.quotes.prefetch(tasks[index]['symbol'] for index in alerts)
+                prefetch_seconds = time.perf_counter() - prefetch_started
+                for index in alerts:
+                    results[index]['services']['market_data'] = prefetch_seconds
+                    pool.submit(self._run_stock_alert, tasks[index], results[index], prefetch_seconds)
+
+        for mailer in self._mailers.clients:
+            mailer.flush()
+        for record in results:
+            if record['status'] != 'skipped':
+                TODO_TASKS.observe(record['latency'], type=record['type'], status=record['status'])
+        return {'results': results, 'summary': summarize(results, time.perf_counter() - started)}
+
+    def _timed(self, record: Dict[str, Any], service: str, call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            record['services'][service] = record['services'].get(service, 0.0) + time.perf_counter() - started
+
+    def _finish(self, record: Dict[str, Any], started: float, ok: bool, error: Optional[str] = None,
+                extra_seconds: float = 0.0) -> None:
+        record['latency'] = time.perf_counter() - started + extra_seconds
+        record['status'] = 'ok' if ok else 'failed'
+        record['error'] = None if ok else (error or 'unknown error')
+
+    def _run_email(self, task: Dict[str, Any], record: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        try:
+            with self._mailers.acquire() as mailer:
+                ok = self._timed(record, 'smtp', lambda: send_email(
+                    task.get('subject', ''), task['message'], task['reciever_email'], mailer))
+            self._finish(record, started, ok, 'email was not delivered')
+        except Exception as e:
+            logger.error(f"Error sending email task: {str(e)}")
+            self._finish(record, started, False, str(e))
+
+    def _run_stock_alert(self, task: Dict[str, Any], record: Dict[str, Any], prefetch_seconds: float) -> None:
+        # The shared quote prefetch counts towards the latency of every alert
+        started = time.perf_counter()
+        try:
+            with self._market_slots:
+                quote = self._timed(record, 'market_data', lambda: get_stock_price(task['symbol'], self.quotes))
+            if quote is None:
+                self._finish(record, started, False, f"no price for {task['symbol']}", prefetch_seconds)
+                return
+            price, currency = quote
+            body = format_stock_alert(task['symbol'], price, currency)
+            with self._mailers.acquire() as mailer:
+                ok = self._timed(record, 'smtp', lambda: send_email("Stock Alert", body, task['email'], mailer))
+            self._finish(record, started, ok, 'email was not delivered', prefetch_seconds)
+        except Exception as e:
+            logger.error(f"Error running stock alert for {task.get('symbol')}: {str(e)}")
+            self._finish(record, started, False, str(e), prefetch_seconds)
+
+    def _run_calendar_batch(self, tasks: List[Dict[str, Any]], records: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            with self._calendars.acquire() as calendar:
+                inserted = create_calendar_events(tasks, calendar)
+        except Exception as e:
+            logger.error(f"Error creating calendar events: {str(e)}")
+            inserted = [{'event': None, 'error': str(e)} for _ in tasks]
+        elapsed = time.perf_counter() - started
+        for record, result in zip(records, inserted):
+            record['services']['calendar'] = elapsed
+            record['latency'] = elapsed
+            record['status'] = 'failed' if result['error'] else 'ok'
+            record['error'] = result['error']
+
+def summarize(results: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """
+    Aggregate per-task records into counts and per-service timings.
+
+    Args:
+        results (List[Dict[str, Any]]): Task records from TaskDispatcher.dispatch
+        wall_seconds (float): Elapsed time of the whole dispatch
+
+    Returns:
+        Dict[str, Any]: Task counts per status, wall time and, per service, the number
+        of tasks that used it with their total and slowest time in seconds
+    """
+    statuses: Dict[str, int] = {}
+    services: Dict[str, Dict[str, float]] = {}
+    for record in results:
+        statuses[record['status']] = statuses.get(record['status'], 0) + 1
+        for service, seconds in record['services'].items():
+            stats = services.setdefault(service, {'tasks': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['tasks'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    latencies = sorted(record['latency'] for record in results if record['status'] != 'skipped')
+    return {
+        'tasks': len(results),
+        'statuses': statuses,
+        'wall_seconds': round(wall_seconds, 3),
+        'max_task_seconds': round(latencies[-1], 3) if latencies else 0.0,
+        'services': {
+            service: {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}
+            for service, stats in services.items()
+        },
+    }
@@ -0,0 +1,141 @@
+"""
+SMTP delivery that reuses one authenticated session for every email in a run.
+"""
+
+import logging
+import os
+import smtplib
+import threading
+from collections import OrderedDict
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional, Tuple
+from src.monitoring.metrics import EMAILS_SENT
+
+logger = logging.getLogger(__name__)
+
+class SmtpMailer:
+    """
+    Send emails over a single SMTP connection that is opened and authenticated once.
+
+    A dropped connection is re-established once per message. With queue enabled,
+    messages are held until flush() (or leaving the context manager) and all
+    messages to the same recipient are delivered as one email.
+
+    Args:
+        user (Optional[str]): Login and sender address, defaults to GMAIL_USER
+        password (Optional[str]): Login password, defaults to GMAIL_PASS
+        host (Optional[str]): SMTP host, defaults to SMTP_HOST or smtp.gmail.com
+        port (Optional[int]): SMTP port, defaults to SMTP_PORT or 465
+        use_ssl (Optional[bool]): Connect with implicit TLS, defaults to SMTP_SSL or True
+        queue (Optional[bool]): Queue and batch messages per recipient, defaults to SMTP_QUEUE or False
+        timeout (float): Socket timeout in seconds
+    """
+
+    def __init__(self, user: Optional[str] = None, password: Optional[str] = None,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 use_ssl: Optional[bool] = None, queue: Optional[bool] = None, timeout: float = 30):
+        self.user = user or os.getenv("GMAIL_USER")
+        self.password = password or os.getenv("GMAIL_PASS")
+        self.host = host or os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.port = port or int(os.getenv("SMTP_PORT", "465"))
+        self.use_ssl = use_ssl if use_ssl is not None else os.getenv("SMTP_SSL", "true").lower() == "true"
+        self.queue = queue if queue is not None else os.getenv("SMTP_QUEUE", "false").lower() == "true"
+        self.timeout = timeout
+
+        self._server: Optional[smtplib.SMTP] = None
+        self._queued: List[Tuple[str, str, str]] = []
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> 'SmtpMailer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def send(self, subject: str, body: str, recipient: str) -> bool:
+        """
+        Send an email, or queue it if the mailer is in queue mode.
+
+        Args:
+            subject (str): Email subject
+            body (str): Plain text body
+            recipient (str): Recipient address
+
+        Returns:
+            bool: True if the email was delivered or queued, False otherwise
+        """
+        if self.queue:
+            with self._lock:
+                self._queued.append((subject, body, recipient))
+            return True
+        return self._deliver(subject, body, recipient)
+
+    def flush(self) -> None:
+        """
+        Deliver all queued messages, one email per recipient.
+        """
+        with self._lock:
+            queued, self._queued = self._queued, []
+
+        by_recipient: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+        for subject, body, recipient in queued:
+            by_recipient.setdefault(recipient, []).append((subject, body))
+
+        for recipient, messages in by_recipient.items():
+            if len(messages) == 1:
+                subject, body = messages[0]
+            else:
+                subject = f"{len(messages)} notifications: " + ", ".join(dict.fromkeys(s for s, _ in messages))
+                body = "\n\n----------\n\n".join(f"{s}\n\n{b}" for s, b in messages)
+            self._deliver(subject, body, recipient)
+
+    def close(self) -> None:
+        """
+        Flush the queue and close the SMTP connection.
+        """
+        self.flush()
+        with self._lock:
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._server = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        logger.info(f"Connected to SMTP server {self.host}:{self.port}")
+        return server
+
+    def _deliver(self, subject: str, body: str, recipient: str) -> bool:
+        msg = MIMEMultipart()
+        msg["From"] = self.user
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._server is None:
+                        self._server = self._connect()
+                    self._server.sendmail(self.user, recipient, msg.as_string())
+                    logger.info(f"Email is sent to {recipient}")
+                    EMAILS_SENT.inc(status='ok')
+                    return True
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    # The server dropped the idle session, reconnect once and retry
+                    self._server = None
+                    if attempt == 1:
+                        logger.error(f"Error sending email: {str(e)}")
+                except Exception as e:
+                    logger.error(f"Error sending email: {str(e)}")
+                    break
+        EMAILS_SENT.inc(status='failed')
+        return False
@@ -0,0 +1,187 @@
+"""
+Batched, TTL-cached stock quotes for stock_alert tasks.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import yfinance as yf
+from src.monitoring.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+class YFinanceSource:
+    """
+    Market data source backed by yfinance.
+
+    Any object with the same two methods can be passed to QuoteService instead,
+    e.g. a fake returning fixed prices for offline runs.
+
+    Args:
+        timeout (float): Request timeout in seconds for price downloads
+    """
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+
+    def fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Fetch the latest close for several symbols in one multi-ticker request.
+
+        Args:
+            symbols (List[str]): Ticker symbols
+
+        Returns:
+            Dict[str, float]: Latest price per symbol, symbols without data are left out
+        """
+        data = yf.download(symbols, period="5d", progress=False, auto_adjust=False, multi_level_index=True,
+                           timeout=self.timeout)
+        prices = {}
+        if data is None or data.empty:
+            return prices
+        close = data["Close"]
+        for symbol in symbols:
+            if symbol not in close:
+                continue
+            series = close[symbol].dropna()
+            if not series.empty:
+                prices[symbol] = round(float(series.iloc[-1]), 2)
+        return prices
+
+    def fetch_metadata(self, symbol: str) -> Dict[str, Any]:
+        """
+        Fetch slowly changing metadata for a symbol.
+
+        fast_info is used instead of Ticker.info, which downloads the full quote summary.
+
+        Args:
+            symbol (str): Ticker symbol
+
+        Returns:
+            Dict[str, Any]: Metadata with at least the currency
+        """
+        return {"currency": yf.Ticker(symbol).fast_info["currency"]}
+
+class QuoteService:
+    """
+    Serve stock prices and currencies from a cache filled by batched fetches.
+
+    Prices are kept for price_ttl seconds and metadata (currency) for metadata_ttl
+    seconds. Metadata can be persisted to a JSON file so it survives between runs.
+    The caches are shared by the todo worker threads, so they are guarded by a lock;
+    fetches run outside of it.
+
+    Args:
+        source (Optional[Any]): Market data source, defaults to YFinanceSource
+        price_ttl (Optional[float]): Price cache lifetime, defaults to QUOTE_PRICE_TTL_SECONDS or 60
+        metadata_ttl (float): Metadata cache lifetime, defaults to one week
+        metadata_cache_path (Optional[Path]): JSON file to persist metadata in
+        clock (Callable[[], float]): Time source, injectable for tests
+    """
+
+    def __init__(self, source: Optional[Any] = None, price_ttl: Optional[float] = None,
+                 metadata_ttl: float = 7 * 24 * 3600, metadata_cache_path: Optional[Path] = None,
+                 clock: Callable[[], float] = time.time):
+        self.source = source or YFinanceSource()
+        self.price_ttl = price_ttl if price_ttl is not None else float(os.getenv("QUOTE_PRICE_TTL_SECONDS", "60"))
+        self.metadata_ttl = metadata_ttl
+        self.metadata_cache_path = metadata_cache_path
+        self.clock = clock
+        self.fetches = 0
+
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load_metadata()
+
+    def _load_metadata(self) -> None:
+        if not self.metadata_cache_path or not Path(self.metadata_cache_path).exists():
+            return
+        try:
+            with open(self.metadata_cache_path, "r") as file:
+                self._metadata = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable market metadata cache: {str(e)}")
+
+    def _save_metadata(self) -> None:
+        if not self.metadata_cache_path:
+            return
+        try:
+            with self._lock, open(self.metadata_cache_path, "w") as file:
+                json.dump(self._metadata, file, indent=2)
+        except OSError as e:
+            logger.warning(f"Could not write market metadata cache: {str(e)}")
+
+    def _fresh_price(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            cached = self._prices.get(symbol)
+        if cached and self.clock() - cached[1] < self.price_ttl:
+            return cached[0]
+        return None
+
+    def _fresh_metadata(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cached = self._metadata.get(symbol)
+        if cached and self.clock() - cached["fetched_at"] < self.metadata_ttl:
+            return cached
+        return None
+
+    def prefetch(self, symbols: Iterable[str]) -> None:
+        """
+        Fetch every symbol whose price or metadata is missing or expired.
+
+        All stale prices are fetched in a single request.
+
+        Args:
+            symbols (Iterable[str]): Ticker symbols that will be queried soon
+        """
+        symbols = list(dict.fromkeys(symbols))
+        stale_prices = [symbol for symbol in symbols if self._fresh_price(symbol) is None]
+        CACHE_LOOKUPS.inc(len(symbols) - len(stale_prices), cache='market_data', result='hit')
+        CACHE_LOOKUPS.inc(len(stale_prices), cache='market_data', result='miss')
+        if stale_prices:
+            try:
+                with self._lock:
+                    self.fetches += 1
+                now = self.clock()
+                prices = self.source.fetch_prices(stale_prices)
+                with self._lock:
+                    for symbol, price in prices.items():
+                        self._prices[symbol] = (price, now)
+                logger.info(f"Fetched prices for {len(stale_prices)} symbols in one request")
+            except Exception as e:
+                logger.error(f"Error fetching stock prices for {', '.join(stale_prices)}: {str(e)}")
+
+        stale_metadata = [symbol for symbol in symbols if self._fresh_metadata(symbol) is None]
+        for symbol in stale_metadata:
+            try:
+                metadata = self.source.fetch_metadata(symbol)
+                with self._lock:
+                    self._metadata[symbol] = {**metadata, "fetched_at": self.clock()}
+            except Exception as e:
+                logger.error(f"Error fetching metadata for {symbol}: {str(e)}")
+        if stale_metadata:
+            self._save_metadata()
+
+    def get_quote(self, symbol: str) -> Optional[Tuple[float, str]]:
+        """
+        Get the latest price and currency for a symbol, fetching it if not cached.
+
+        Args:
+            symbol (str): Ticker symbol
+
+        Returns:
+            Optional[Tuple[float, str]]: Price and currency if available, None otherwise
+        """
+        if self._fresh_price(symbol) is None or self._fresh_metadata(symbol) is None:
+            self.prefetch([symbol])
+
+        price = self._fresh_price(symbol)
+        if price is None:
+            return None
+        metadata = self._fresh_metadata(symbol) or {}
+        return price, metadata.get("currency", "Currency information not available")
@@ -0,0 +1,353 @@
+"""
+Persistent scheduler for recurring todo tasks.
+
+Todo tasks are parsed once into a schedule stored next to the todo file. The
+scheduler keeps a heap of next fire times and calls execute_task directly when a
+task is due, so recurring alerts never go through the LLM again.
+
+Usage:
+    python -m src.todo.scheduler My_Folder/Files/todo.txt
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.llm.base_llm import initialize_llm
+from src.llm.budget import get_budget
+from src.monitoring.metrics import write_textfile_from_env
+from src.todo.mailer import SmtpMailer
+from src.todo.market_data import QuoteService
+from src.todo.todo_executer import execute_task, task_decoder
+
+logger = logging.getLogger(__name__)
+
+RECURRENCES = ('once', 'hourly', 'daily', 'weekdays', 'weekly')
+
+def get_schedule_path(todo_file: str) -> Path:
+    """
+    Get the path of the persisted schedule stored next to a todo file.
+
+    Args:
+        todo_file (str): Path to the todo.txt file
+
+    Returns:
+        Path: Path of the schedule file
+    """
+    todo_path = Path(todo_file)
+    return todo_path.with_name(f".{todo_path.stem}_schedule.json")
+
+def parse_time_of_day(value: Optional[str]) -> Tuple[int, int]:
+    """
+    Parse times such as "09:00", "9 AM", "9:30 pm" or an ISO datetime into hour and minute.
+
+    Args:
+        value (Optional[str]): Time as returned by the todo parser
+
+    Returns:
+        Tuple[int, int]: Hour and minute, 9:00 if the value cannot be parsed
+    """
+    if not value:
+        return 9, 0
+    try:
+        parsed = datetime.fromisoformat(value)
+        return parsed.hour, parsed.minute
+    except ValueError:
+        pass
+
+    match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?', value.lower())
+    if not match:
+        return 9, 0
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    meridiem = match.group(3)
+    if meridiem and meridiem.startswith('p') and hour < 12:
+        hour += 12
+    elif meridiem and meridiem.startswith('a') and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return 9, 0
+    return hour, minute
+
+def next_fire_time(recurrence: str, hour: int, minute: int, after: datetime) -> datetime:
+    """
+    Compute the first fire time strictly after a given moment.
+
+    Args:
+        recurrence (str): One of RECURRENCES
+        hour (int): Hour of day to fire at (ignored for hourly)
+        minute (int): Minute to fire at
+        after (datetime): Moment after which the task should fire
+
+    Returns:
+        datetime: Next fire time
+    """
+    if recurrence == 'hourly':
+        candidate = after.replace(minute=minute, second=0, microsecond=0)
+        if candidate <= after:
+            candidate += timedelta(hours=1)
+        return candidate
+
+    candidate = after.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    if recurrence == 'weekdays':
+        while candidate.weekday() >= 5:
+            candidate += timedelta(days=1)
+    return candidate
+
+def build_entry(task: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    Turn a parsed todo task into a schedule entry.
+
+    Stock alerts fire at their time of day with their recurrence. Every other task
+    type fires once, immediately.
+
+    Args:
+        task (Dict[str, Any]): Parsed todo task
+        now (datetime): Compile time
+
+    Returns:
+        Dict[str, Any]: Schedule entry with id, task, recurrence, time and next_fire
+    """
+    entry_id = hashlib.sha256(json.dumps(task, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    if task.get('type') == 'stock_alert':
+        recurrence = str(task.get('recurrence', 'once')).lower()
+        if recurrence not in RECURRENCES:
+            recurrence = 'once'
+        hour, minute = parse_time_of_day(task.get('time'))
+        if recurrence == 'weekly':
+            # Weekly alerts repeat on the weekday they were first scheduled for
+            next_fire = next_fire_time('daily', hour, minute, now)
+        else:
+            next_fire = next_fire_time(recurrence, hour, minute, now)
+    else:
+        recurrence, hour, minute = 'once', now.hour, now.minute
+        next_fire = now
+
+    return {
+        'id': entry_id,
+        'task': task,
+        'recurrence': recurrence,
+        'time': f"{hour:02d}:{minute:02d}",
+        'next_fire': next_fire.isoformat(timespec='seconds'),
+    }
+
+def compile_schedule(todo_file: str, agent, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Parse the todo file once and persist it as a schedule next to the file.
+
+    Entries that were already scheduled keep their next fire time, so recompiling
+    does not fire tasks again. One-off tasks that already fired are not re-added.
+
+    Args:
+        todo_file (str): Path to the todo.txt file
+        agent: LLM agent used to parse new or changed todo lines
+        now (Optional[datetime]): Compile time, defaults to datetime.now()
+
+    Returns:
+        List[Dict[str, Any]]: Schedule entries
+    """
+    now = now or datetime.now()
+    schedule_path = get_schedule_path(todo_file)
+    previous = {entry['id']: entry for entry in load_schedule(schedule_path)}
+    fired_once = set()
+    if schedule_path.exists():
+        with open(schedule_path, 'r') as file:
+            fired_once = set(json.load(file).get('fired_once', []))
+
+    entries = []
+    for task in task_decoder(todo_file, agent) or []:
+        if task.get('type', 'unknown') == 'unknown':
+            continue
+        entry = build_entry(task, now)
+        if entry['id'] in fired_once:
+            continue
+        entries.append(previous.get(entry['id'], entry))
+
+    save_schedule(schedule_path, entries, fired_once)
+    logger.info(f"Compiled {len(entries)} scheduled tasks to {schedule_path}")
+    return entries
+
+def load_schedule(schedule_path: Path) -> List[Dict[str, Any]]:
+    """
+    Load schedule entries from disk.
+
+    Args:
+        schedule_path (Path): Schedule file
+
+    Returns:
+        List[Dict[str, Any]]: Schedule entries, empty if the file does not exist
+    """
+    if not schedule_path.exists():
+        return []
+    try:
+        with open(schedule_path, 'r') as file:
+            return json.load(file).get('entries', [])
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable schedule {schedule_path}: {str(e)}")
+        return []
+
+def save_schedule(schedule_path: Path, entries: List[Dict[str, Any]], fired_once) -> None:
+    """
+    Write schedule entries to disk atomically.
+
+    Args:
+        schedule_path (Path): Schedule file
+        entries (List[Dict[str, Any]]): Pending schedule entries
+        fired_once: Ids of one-off entries that already fired
+    """
+    tmp_path = schedule_path.with_name(schedule_path.name + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump({'entries': entries, 'fired_once': sorted(fired_once)}, file, indent=2)
+    os.replace(tmp_path, schedule_path)
+
+class TaskScheduler:
+    """
+    Fire schedule entries at their next fire time using a heap-based timer.
+
+    All entries due at the same moment are fired in one round: their stock quotes
+    are prefetched together and the schedule is persisted once per round.
+
+    Args:
+        schedule_path (Path): Schedule file to read and update
+        mailer (Optional[SmtpMailer]): Mailer kept open for the lifetime of the scheduler
+        quotes (Optional[QuoteService]): Quote service shared by every stock alert
+        executor (Callable): Function called with (task, mailer, quotes) when a task fires
+        clock (Callable[[], datetime]): Time source, injectable for tests
+    """
+
+    def __init__(self, schedule_path: Path, mailer: Optional[SmtpMailer] = None,
+                 quotes: Optional[QuoteService] = None, executor: Callable = execute_task,
+                 clock: Callable[[], datetime] = datetime.now):
+        self.schedule_path = Path(schedule_path)
+        self.mailer = mailer
+        self.quotes = quotes
+        self.executor = executor
+        self.clock = clock
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.fired_once = set()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = 0
+
+        if self.schedule_path.exists():
+            with open(self.schedule_path, 'r') as file:
+                self.fired_once = set(json.load(file).get('fired_once', []))
+        for entry in load_schedule(self.schedule_path):
+            self.add(entry)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """
+        Add or replace a schedule entry.
+        """
+        self.entries[entry['id']] = entry
+        fire_at = datetime.fromisoformat(entry['next_fire']).timestamp()
+        self._counter += 1
+        heapq.heappush(self._heap, (fire_at, self._counter, entry['id']))
+
+    def next_fire(self) -> Optional[datetime]:
+        """
+        Get the earliest pending fire time.
+        """
+        while self._heap and self._heap[0][2] not in self.entries:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return datetime.fromtimestamp(self._heap[0][0])
+
+    def run_pending(self) -> int:
+        """
+        Fire every entry that is due and reschedule recurring ones.
+
+        Entries whose fire time passed while the scheduler was not running fire
+        once and are then rescheduled from the current time.
+
+        Returns:
+            int: Number of entries fired
+        """
+        now = self.clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now.timestamp():
+            _, _, entry_id = heapq.heappop(self._heap)
+            entry = self.entries.get(entry_id)
+            if entry is not None and datetime.fromisoformat(entry['next_fire']).timestamp() <= now.timestamp():
+                due.append(entry)
+        if not due:
+            return 0
+
+        if self.quotes is not None:
+            self.quotes.prefetch(entry['task']['symbol'] for entry in due if 'symbol' in entry['task'])
+
+        for entry in due:
+            try:
+                self.executor(entry['task'], self.mailer, self.quotes)
+            except Exception as e:
+                logger.error(f"Error executing scheduled task {entry['id']}: {str(e)}")
+
+            if entry['recurrence'] == 'once':
+                del self.entries[entry['id']]
+                self.fired_once.add(entry['id'])
+                continue
+            hour, minute = parse_time_of_day(entry['time'])
+            if entry['recurrence'] == 'weekly':
+                next_fire = datetime.fromisoformat(entry['next_fire'])
+                while next_fire <= now:
+                    next_fire += timedelta(days=7)
+            else:
+                next_fire = next_fire_time(entry['recurrence'], hour, minute, now)
+            entry['next_fire'] = next_fire.isoformat(timespec='seconds')
+            self.add(entry)
+
+        if self.mailer is not None:
+            self.mailer.flush()
+        save_schedule(self.schedule_path, list(self.entries.values()), self.fired_once)
+        logger.info(f"Fired {len(due)} scheduled tasks, {len(self.entries)} pending")
+        return len(due)
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Sleep until the next entry is due, fire it and repeat until stop_event is set.
+
+        Args:
+            stop_event (Optional[threading.Event]): Event that stops the loop when set
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            self.run_pending()
+            write_textfile_from_env()
+            next_fire = self.next_fire()
+            if next_fire is None:
+                logger.info("No scheduled tasks left")
+                return
+            timeout = max(0.0, (next_fire - self.clock()).total_seconds())
+            stop_event.wait(timeout)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run recurring todo tasks")
+    parser.add_argument('todo_file', help="path to the todo.txt file")
+    parser.add_argument('--compile-only', action='store_true', help="only parse the todo file into a schedule")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    compile_schedule(args.todo_file, initialize_llm())
+    print(get_budget().format_summary())
+    if args.compile_only:
+        return
+
+    quotes = QuoteService(metadata_cache_path=Path(args.todo_file).with_name(".market_metadata.json"))
+    with SmtpMailer() as mailer:
+        scheduler = TaskScheduler(get_schedule_path(args.todo_file), mailer=mailer, quotes=quotes)
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            logger.info("Scheduler stopped")
+
+if __name__ == '__main__':
+    main()
@@ -4,15 +4,14 @@ Todo parsing and task execution module using Gemini-2.0-flash-exp.
 
 import os
 import json
+import contextvars
+import hashlib
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-import yfinance as yf
-from googleapiclient.discovery import build
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from datetime import datetime
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import google.generativeai as genai
 
 # Load configuration from .env file
@@ -20,32 +19,47 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-# Gmail configuration from environment variables
-GMAIL_USER = os.getenv("GMAIL_USER")
-GMAIL_PASS = os.getenv("GMAIL_PASS")
-SCOPES = ['https://www.googleapis.com/auth/calendar']
-
 # Import your LLM functions (adjust the import based on your project structure)
 from src.llm.base_llm import generate_response, initialize_llm
+from src.todo.calendar_client import CalendarClient, build_event_body
+from src.todo.mailer import SmtpMailer
+from src.todo.market_data import QuoteService
+from src.monitoring.metrics import CACHE_LOOKUPS
+
+# Bump when the parsing prompt changes so cached results are parsed again
+PARSER_VERSION = 2
 
-def task_decoder(todo_file: str, agent: Optional[genai.GenerativeModel]) -> Optional[Dict[str, Any]]:
+def get_compiled_tasks_path(todo_file: str) -> Path:
     """
-    Parse a todo task using the Gemini LLM into predefined tasks.
-    
+    Get the path of the compiled task list stored next to a todo file.
+
+    The file name starts with a dot so the organizer does not pick it up.
+
     Args:
-        todo_file (str): File that contains todo tasks in a text format.
+        todo_file (str): Path to the todo.txt file
+
+    Returns:
+        Path: Path of the compiled task list
+    """
+    todo_path = Path(todo_file)
+    return todo_path.with_name(f".{todo_path.stem}_compiled.json")
+
+def parse_todo_line(line: str, agent: Optional[genai.GenerativeModel]) -> Optional[Dict[str, Any]]:
+    """
+    Parse a single todo line using the Gemini LLM into a predefined task.
+
+    Args:
+        line (str): One line of the todo file.
         agent (LLM object): Gemini agent for this parsing task
-        
+
     Returns:
         Optional[Dict[str, Any]]: Structured task data if successful,
                                   or an object with type "unknown" if not.
     """
-    with open(todo_file, "r") as file:
-        task_content = file.read()
     try:
         prompt = f"""
         Parse the following todo task and extract structured information:
-        Task: {task_content}
+        Task: {line}
         
         Very important note:
         
@@ -61,40 +75,104 @@ def task_decoder(todo_file: str, agent: Optional[genai.GenerativeModel]) -> Opti
         2. For calendar invites:
            {{"type": "calendar_invite", "event": "event name", "date": "date/time", "duration": "duration in minutes", "email": "email address"}}
         3. For stock alerts:
-           {{"type": "stock_alert", "symbol": "stock symbol", "time": "alert time", "email": "email address"}}
+           {{"type": "stock_alert", "symbol": "stock symbol", "time": "alert time as HH:MM in 24 hour format", "recurrence": "once, hourly, daily, weekdays or weekly", "email": "email address"}}
+        
+        For stock alerts, if no repetition is mentioned take "once" as the recurrence.
         
         If the task cannot be parsed into one of the above formats, return:
            {{"type": "unknown", "text": "readable tasks or line from file"}}
         
-        Return only the JSON object.
+        Return only one JSON object.
         """
         response = generate_response(prompt, agent)
         if response:
             sanitized_response = response.replace("```json", "").replace("```", "").strip()
-            return json.loads(sanitized_response)
+            task = json.loads(sanitized_response)
+            if isinstance(task, list) and len(task) == 1:
+                task = task[0]
+            if isinstance(task, dict):
+                return task
+            logger.error(f"Unexpected response for todo line: {line}")
     except Exception as e:
         logger.error(f"Error in returning prompt response: {str(e)}")
+    return None
+
+def task_decoder(todo_file: str, agent: Optional[genai.GenerativeModel]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Parse the todo file line by line using the Gemini LLM into predefined tasks.
+
+    Every line is parsed on its own and the result is cached by the SHA-256 of the
+    line in a compiled task list next to the todo file, so only new or edited lines
+    are sent to the LLM. Uncached lines are parsed concurrently.
+    
+    Args:
+        todo_file (str): File that contains todo tasks in a text format.
+        agent (LLM object): Gemini agent for this parsing task
+        
+    Returns:
+        Optional[List[Dict[str, Any]]]: Structured tasks in file order, with type "unknown"
+                                        for lines that could not be parsed.
+    """
+    with open(todo_file, "r") as file:
+        lines = [line.strip() for line in file if line.strip()]
+    if not lines:
         return None
 
-def send_email(subject: str, body: str, recipient: str):
+    compiled_path = get_compiled_tasks_path(todo_file)
+    cache: Dict[str, Dict[str, Any]] = {}
+    if compiled_path.exists():
+        try:
+            with open(compiled_path, "r") as file:
+                compiled = json.load(file)
+            if compiled.get("version") == PARSER_VERSION:
+                cache = compiled.get("lines", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable compiled task list {compiled_path}: {str(e)}")
+
+    line_hashes = [hashlib.sha256(line.encode("utf-8")).hexdigest() for line in lines]
+    missing = {line_hash: line for line_hash, line in zip(line_hashes, lines) if line_hash not in cache}
+    logger.info(f"Parsing {len(missing)} of {len(lines)} todo lines, {len(lines) - len(missing)} cached")
+    CACHE_LOOKUPS.inc(len(lines) - len(missing), cache='todo_parse', result='hit')
+    CACHE_LOOKUPS.inc(len(missing), cache='todo_parse', result='miss')
+
+    if missing:
+        max_workers = int(os.getenv("TODO_PARSE_WORKERS", "4"))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Each parse runs in a copy of this context, so it counts toward the caller's LLM run budget
+            futures = [executor.submit(contextvars.copy_context().run, parse_todo_line, line, agent)
+                       for line in missing.values()]
+            parsed = dict(zip(missing, (future.result() for future in futures)))
+        # Failed parses are not cached so they are retried on the next run
+        cache.update({line_hash: task for line_hash, task in parsed.items() if task is not None})
+
+    tasks = [cache.get(line_hash, {"type": "unknown", "text": line}) for line_hash, line in zip(line_hashes, lines)]
+
+    try:
+        with open(compiled_path, "w") as file:
+            json.dump({
+                "version": PARSER_VERSION,
+                "lines": {line_hash: cache[line_hash] for line_hash in line_hashes if line_hash in cache},
+                "tasks": tasks,
+            }, file, indent=2)
+    except OSError as e:
+        logger.warning(f"Could not write compiled task list {compiled_path}: {str(e)}")
+
+    return tasks
+
+def send_email(subject: str, body: str, recipient: str, mailer: Optional[SmtpMailer] = None) -> bool:
     """
     Send an email using Gmail.
+
+    Pass the run's mailer to reuse its SMTP session; without one a connection is
+    opened just for this email. Returns True if the email was sent or queued.
     """
-    try:
-        msg = MIMEMultipart()
-        msg["From"] = GMAIL_USER
-        msg["To"] = recipient
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(GMAIL_USER, GMAIL_PASS)
-            server.sendmail(GMAIL_USER, recipient, msg.as_string())
-        
-        logger.info(f"Email is sent to {recipient}")
-    except Exception as e:
-        logger.error(f"Error sending email: {str(e)}")
+    if mailer is not None:
+        return mailer.send(subject, body, recipient)
+    with SmtpMailer(queue=False) as single_use_mailer:
+        return single_use_mailer.send(subject, body, recipient)
 
-def create_calendar_event(event_name: str, event_date: str, recipient: str, duration: Optional[int] = 15):
+def create_calendar_event(event_name: str, event_date: str, recipient: str, duration: Optional[int] = 15,
+                          calendar: Optional[CalendarClient] = None):
     """
     Create a Google Calendar event using OAuth credentials.
     This function uses the InstalledAppFlow (with credentials.json/token.json) to authenticate.
@@ -104,78 +182,72 @@ def create_calendar_event(event_name: str, event_date: str, recipient: str, dura
         event_date (str): Start date/time in ISO 8601 format (e.g., "2025-03-01T09:00:00").
         recipient: A single email address (str) or a comma-separated string / list of emails.
         duration (int, optional): Duration of the event in minutes. Defaults to 15.
+        calendar (Optional[CalendarClient]): Calendar client shared by the run.
     """
-    try:
-        from google.auth.transport.requests import Request
-        from google.oauth2.credentials import Credentials
-        from google_auth_oauthlib.flow import InstalledAppFlow
-
-        creds = None
-        if os.path.exists('token.json'):
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                flow = InstalledAppFlow.from_client_secrets_file('credentials.json', SCOPES)
-                creds = flow.run_local_server(port=0)
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
+    create_calendar_events([{"event": event_name, "date": event_date, "email": recipient, "duration": duration}],
+                           calendar)
 
-        service = build('calendar', 'v3', credentials=creds)
+def create_calendar_events(tasks: List[Dict[str, Any]], calendar: Optional[CalendarClient] = None) -> List[Dict[str, Any]]:
+    """
+    Create Google Calendar events for several calendar_invite tasks in one batched request.
+
+    Args:
+        tasks (List[Dict[str, Any]]): calendar_invite tasks with event, date, email and optional duration.
+        calendar (Optional[CalendarClient]): Calendar client shared by the run, built if not given.
 
-        start_dt = datetime.fromisoformat(event_date)
+    Returns:
+        List[Dict[str, Any]]: One result per task with the created 'event' or an 'error'.
+    """
+    results: List[Dict[str, Any]] = [{"event": None, "error": None} for _ in tasks]
+    bodies, indexes, attendees = [], [], []
+    for index, task in enumerate(tasks):
         try:
-            duration = int(duration)
-        except Exception:
-            duration = 15
-        end_dt = start_dt + timedelta(minutes=duration)
-
-        if isinstance(recipient, str):
-            recipients = [r.strip() for r in recipient.split(",")]
-        elif isinstance(recipient, list):
-            recipients = recipient
-        else:
-            recipients = []
-        attendees = [{"email": r} for r in recipients]
-
-        event = {
-            'summary': event_name,
-            'description': 'Blocking time on calendar for project event',
-            'start': {
-                'dateTime': start_dt.isoformat(),
-                'timeZone': 'IST',
-            },
-            'end': {
-                'dateTime': end_dt.isoformat(),
-                'timeZone': 'IST',
-            },
-            'attendees': attendees,
-            'reminders': {
-                'useDefault': True,
-            },
-            'transparency': 'opaque'
-        }
-
-        created_event = service.events().insert(calendarId='primary', body=event, sendUpdates='all').execute()
-        logger.info(f"Google Calendar invite is shared to: {', '.join(recipients)}. Event time: {start_dt.isoformat()}.  Event created: {created_event.get('htmlLink')}")
-    except Exception as e:
-        logger.error(f"Error creating calendar event: {str(e)}")
+            body, recipients = build_event_body(task["event"], task["date"], task["email"], task.get("duration", 15))
+            bodies.append(body)
+            indexes.append(index)
+            attendees.append(recipients)
+        except Exception as e:
+            results[index]["error"] = str(e)
+            logger.error(f"Error creating calendar event: {str(e)}")
 
-def get_stock_price(symbol: str) -> Optional[float]:
+    if bodies:
+        try:
+            if calendar is None:
+                calendar = CalendarClient()
+            inserted = calendar.insert_events(bodies)
+        except Exception as e:
+            inserted = [{"event": None, "error": str(e)} for _ in bodies]
+
+        for index, body, recipients, result in zip(indexes, bodies, attendees, inserted):
+            results[index] = result
+            if result["error"]:
+                logger.error(f"Error creating calendar event: {result['error']}")
+            else:
+                logger.info(f"Google Calendar invite is shared to: {', '.join(recipients)}. "
+                            f"Event time: {body['start']['dateTime']}.  Event created: {result['event'].get('htmlLink')}")
+    return results
+
+def get_stock_price(symbol: str, quotes: Optional[QuoteService] = None) -> Optional[Tuple[float, str]]:
     """
-    Fetch the latest stock price using yfinance.
+    Fetch the latest stock price and its currency.
+
+    Pass the run's quote service to reuse its batched, cached quotes.
     """
-    try:
-        stock = yf.Ticker(symbol)
-        price = round(stock.history(period="1d")["Close"].iloc[-1], 2)
-        stock_info = stock.info
-        currency = stock_info.get('currency', 'Currency information not available')
-        logger.info(f"Stock {symbol} price is {price} {currency}")
-        return price, currency
-    except Exception as e:
-        logger.error(f"Error fetching stock price for {symbol}: {str(e)}")
+    if quotes is None:
+        quotes = QuoteService()
+    quote = quotes.get_quote(symbol)
+    if quote is None:
+        logger.error(f"Error fetching stock price for {symbol}")
         return None
+    price, currency = quote
+    logger.info(f"Stock {symbol} price is {price} {currency}")
+    return price, currency
+
+def format_stock_alert(symbol: str, price: float, currency: str) -> str:
+    """
+    Build the body of a stock alert email.
+    """
+    return f"The stock price for {symbol} at {datetime.now()} is {price:.2f} {currency}"
 
 def handle_unknown_task(task: Dict[str, Any]):
     """
@@ -185,14 +257,27 @@ def handle_unknown_task(task: Dict[str, Any]):
     logger.warning(message)
     print(message)
 
-def execute_task(task: Dict[str, Any]):
+def is_calendar_invite(task: Dict[str, Any]) -> bool:
+    """
+    Check if a task is a calendar invite with all required fields.
+    """
+    return (task.get("type", "unknown").lower() == "calendar_invite"
+            and "event" in task and "date" in task and "email" in task)
+
+def execute_task(task: Dict[str, Any], mailer: Optional[SmtpMailer] = None,
+                 quotes: Optional[QuoteService] = None):
     """
     Execute a given todo task based on its type.
+
+    Args:
+        task (Dict[str, Any]): Parsed todo task.
+        mailer (Optional[SmtpMailer]): Mailer shared by all tasks of the run.
+        quotes (Optional[QuoteService]): Quote service shared by all tasks of the run.
     """
     task_type = task.get("type", "unknown").lower()
     if task_type == "normal_email":
         if "message" in task and "reciever_email" in task:
-            send_email(task["subject"], task["message"], task["reciever_email"])
+            send_email(task["subject"], task["message"], task["reciever_email"], mailer)
         else:
             handle_unknown_task(task)
     elif task_type == "calendar_invite":
@@ -204,10 +289,10 @@ def execute_task(task: Dict[str, Any]):
             handle_unknown_task(task)
     elif task_type == "stock_alert":
         if "symbol" in task and "time" in task and "email" in task:
-            price, currency = get_stock_price(task["symbol"])
-            if price is not None:
-                message = f"The stock price for {task['symbol']} at {datetime.now()} is {price:.2f} {currency}"
-                send_email("Stock Alert", message, task["email"])
+            quote = get_stock_price(task["symbol"], quotes)
+            if quote is not None:
+                price, currency = quote
+                send_email("Stock Alert", format_stock_alert(task["symbol"], price, currency), task["email"], mailer)
             else:
                 handle_unknown_task(task)
         else:
@@ -215,19 +300,33 @@ def execute_task(task: Dict[str, Any]):
     else:
         handle_unknown_task(task)
 
-def process_tasks(todo_file: str, tasks_interpreter_agent: Optional[genai.GenerativeModel]):
+def process_tasks(todo_file: str, tasks_interpreter_agent: Optional[genai.GenerativeModel]) -> Optional[Dict[str, Any]]:
     """
     Process all tasks from the given todo.txt file using the provided LLM agent.
-    
+
+    Tasks are run concurrently by a TaskDispatcher with separate limits per
+    external service (SMTP, Calendar, market data).
+
     Args:
         todo_file (str): The path to the todo.txt file containing tasks.
         agent (Optional[genai.GenerativeModel]): The LLM agent instance used for parsing tasks.
+
+    Returns:
+        Optional[Dict[str, Any]]: Per-task results and the run summary, None if no tasks were parsed.
     """
+    # Imported here because the dispatcher builds on the task functions of this module
+    from src.todo.dispatcher import TaskDispatcher
+
     tasks = task_decoder(todo_file, tasks_interpreter_agent)
-    if tasks:
-        if isinstance(tasks, dict):
-            tasks = [tasks]
-        for task in tasks:
-            execute_task(task)
-    else:
+    if not tasks:
         logger.warning("No tasks were parsed from the todo file.")
+        return None
+
+    with TaskDispatcher(metadata_cache_path=Path(todo_file).with_name(".market_metadata.json")) as dispatcher:
+        report = dispatcher.dispatch(tasks)
+
+    summary = report["summary"]
+    logger.info(f"Ran {summary['tasks']} todo tasks in {summary['wall_seconds']}s: {summary['statuses']}")
+    for service, stats in summary["services"].items():
+        logger.info(f"  {service}: {stats['tasks']} tasks, slowest {stats['max_seconds']}s")
+    return report
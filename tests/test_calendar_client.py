@@ -0,0 +1,65 @@
+"""
+Tests for CalendarClient batch inserts with googleapiclient's HttpMockSequence.
+"""
+
+import json
+from typing import Dict, Iterable, Tuple
+from googleapiclient.http import HttpMockSequence
+from src.todo.calendar_client import MAX_BATCH_SIZE, CalendarClient, build_event_body
+
+def batch_response(request_ids: Iterable[int], failed: Iterable[int] = ()) -> Tuple[Dict[str, str], str]:
+    """
+    Build a multipart/mixed batch response with one part per request id.
+    """
+    failed = set(failed)
+    parts = []
+    for request_id in request_ids:
+        if request_id in failed:
+            status, body = '400 Bad Request', {'error': {'code': 400, 'message': 'Invalid attendee'}}
+        else:
+            status, body = '200 OK', {'id': f"event{request_id}"}
+        data = json.dumps(body)
+        parts.append(
+            f"--batch_boundary\r\nContent-Type: application/http\r\nContent-ID: <response-batch + {request_id}>\r\n\r\n"
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n{data}\r\n"
+        )
+    headers = {'status': '200', 'content-type': 'multipart/mixed; boundary=batch_boundary'}
+    return headers, ''.join(parts) + "--batch_boundary--\r\n"
+
+def make_events(count: int):
+    return [build_event_body(f"Event {i}", '2025-03-01T09:00:00', 'a@example.com, b@example.com')[0]
+            for i in range(count)]
+
+def test_inserts_events_in_batches():
+    count = MAX_BATCH_SIZE + 10
+    http = HttpMockSequence([batch_response(range(MAX_BATCH_SIZE)), batch_response(range(MAX_BATCH_SIZE, count))])
+
+    results = CalendarClient(http=http).insert_events(make_events(count))
+
+    # One HTTP request per batch, every mocked response consumed
+    assert len(http._iterable) == 0
+    assert [result['event']['id'] for result in results] == [f"event{i}" for i in range(count)]
+    assert all(result['error'] is None for result in results)
+
+def test_failed_event_does_not_fail_its_batch():
+    http = HttpMockSequence([batch_response(range(3), failed=[1])])
+
+    results = CalendarClient(http=http).insert_events(make_events(3))
+
+    assert results[0]['event'] == {'id': 'event0'}
+    assert results[1]['event'] is None and 'Invalid attendee' in results[1]['error']
+    assert results[2]['event'] == {'id': 'event2'}
+
+def test_failed_batch_request_marks_its_events():
+    http = HttpMockSequence([({'status': '503'}, 'unavailable')])
+
+    results = CalendarClient(http=http).insert_events(make_events(2))
+
+    assert all(result['event'] is None and result['error'] for result in results)
+
+def test_build_event_body_splits_recipients():
+    event, recipients = build_event_body("Review", '2025-03-01T09:00:00', 'a@example.com, b@example.com', 30)
+
+    assert recipients == ['a@example.com', 'b@example.com']
+    assert event['attendees'] == [{'email': 'a@example.com'}, {'email': 'b@example.com'}]
+    assert event['end']['dateTime'] == '2025-03-01T09:30:00'
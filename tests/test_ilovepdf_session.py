@@ -0,0 +1,62 @@
+"""
+Tests for ILovePdfSession batching against the ILovePDF stand-in.
+"""
+
+import pytest
+from src.benchmarks.stand_ins import ILovePdfStandIn
+from src.compression.ilovepdf_session import ILovePdfSession
+
+# Long enough for the HMAC signing key not to trigger a PyJWT warning
+SECRET_KEY = 'stand-in-secret-key-of-32-bytes!'
+
+@pytest.fixture
+def pdfs(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"document_{i}.pdf"
+        path.write_bytes(f"%PDF-1.4 document {i}".encode())
+        paths.append(path)
+    return paths
+
+def requests_per_task(files: int) -> int:
+    # start, one upload per file, process and download
+    return files + 3
+
+def test_compresses_in_batches(pdfs):
+    with ILovePdfStandIn() as stand_in:
+        latencies = {}
+        with ILovePdfSession('public', SECRET_KEY, batch_size=2, api_base=stand_in.base_url) as session:
+            results = session.compress(pdfs, latencies)
+
+        assert stand_in.request_count == requests_per_task(2) * 2 + requests_per_task(1)
+        assert set(latencies) == set(pdfs)
+        for path in pdfs:
+            assert results[path] == path.parent / f"{path.stem}_compressed.pdf"
+            assert results[path].read_bytes() == path.read_bytes()
+
+def test_single_file_batches(pdfs):
+    with ILovePdfStandIn() as stand_in:
+        results = ILovePdfSession('public', SECRET_KEY, batch_size=1, api_base=stand_in.base_url).compress(pdfs[:2])
+
+        assert stand_in.request_count == requests_per_task(1) * 2
+        assert all(results[path].read_bytes() == path.read_bytes() for path in pdfs[:2])
+
+def test_session_keeps_one_client_open(pdfs):
+    with ILovePdfStandIn() as stand_in:
+        session = ILovePdfSession('public', SECRET_KEY, batch_size=2, api_base=stand_in.base_url)
+        with session:
+            client = session._client.shared_client
+            session.compress(pdfs[:2])
+            session.compress(pdfs[2:])
+            assert session.reuses_client()
+            assert session._client.shared_client is client
+        assert not session.is_open
+
+def test_failed_batch_only_fails_its_files(pdfs):
+    with ILovePdfStandIn(error_rate=1.0, seed=1) as stand_in:
+        with ILovePdfSession('public', SECRET_KEY, batch_size=2, api_base=stand_in.base_url) as session:
+            results = session.compress(pdfs)
+
+        assert results == {path: None for path in pdfs}
+        # Each batch stops at its failed start request
+        assert stand_in.request_count == 3
@@ -0,0 +1,57 @@
+"""
+Tests for SmtpMailer against the SMTP stand-in.
+"""
+
+import pytest
+from src.benchmarks.stand_ins import SmtpStandIn
+from src.todo.mailer import SmtpMailer
+
+@pytest.fixture
+def smtp():
+    with SmtpStandIn(max_messages_per_connection=2) as stand_in:
+        yield stand_in
+
+def make_mailer(stand_in: SmtpStandIn, queue: bool = False) -> SmtpMailer:
+    return SmtpMailer(user='me@example.com', password='secret', host=stand_in.host, port=stand_in.port,
+                      use_ssl=False, queue=queue, timeout=5)
+
+def test_reuses_one_session(smtp):
+    smtp.max_messages_per_connection = None
+    with make_mailer(smtp) as mailer:
+        assert all(mailer.send(f"subject {i}", "body", 'to@example.com') for i in range(3))
+
+    assert smtp.connections == 1
+    assert smtp.logins == 1
+    assert len(smtp.messages) == 3
+
+def test_reconnects_after_dropped_connection(smtp):
+    with make_mailer(smtp) as mailer:
+        results = [mailer.send(f"subject {i}", "body", 'to@example.com') for i in range(5)]
+
+    # The stand-in hangs up after every second message
+    assert results == [True] * 5
+    assert smtp.connections == 3
+    assert smtp.logins == 3
+    assert [message['message']['Subject'] for message in smtp.messages] == [f"subject {i}" for i in range(5)]
+
+def test_queue_merges_messages_per_recipient(smtp):
+    with make_mailer(smtp, queue=True) as mailer:
+        mailer.send("first", "one", 'a@example.com')
+        mailer.send("second", "two", 'a@example.com')
+        mailer.send("only", "three", 'b@example.com')
+        assert smtp.messages == []
+
+    by_recipient = {message['to'][0]: message['message'] for message in smtp.messages}
+    assert set(by_recipient) == {'a@example.com', 'b@example.com'}
+    assert by_recipient['a@example.com']['Subject'] == "2 notifications: first, second"
+    merged_body = by_recipient['a@example.com'].get_payload()[0].get_payload().replace('\r\n', '\n')
+    assert "first\n\none" in merged_body and "second\n\ntwo" in merged_body
+    assert by_recipient['b@example.com']['Subject'] == "only"
+
+def test_flush_empties_the_queue(smtp):
+    with make_mailer(smtp, queue=True) as mailer:
+        mailer.send("subject", "body", 'a@example.com')
+        mailer.flush()
+        mailer.flush()
+
+    assert len(smtp.messages) == 1
@@ -0,0 +1,91 @@
+"""
+Tests for the QuoteService caches with a fake market data source and clock.
+"""
+
+import json
+from typing import Any, Dict, List
+import pytest
+from src.todo.market_data import QuoteService
+
+class FakeSource:
+    """Market data source returning fixed prices and recording every call."""
+
+    def __init__(self, prices: Dict[str, float]):
+        self.prices = prices
+        self.price_calls: List[List[str]] = []
+        self.metadata_calls: List[str] = []
+
+    def fetch_prices(self, symbols: List[str]) -> Dict[str, float]:
+        self.price_calls.append(list(symbols))
+        return {symbol: self.prices[symbol] for symbol in symbols if symbol in self.prices}
+
+    def fetch_metadata(self, symbol: str) -> Dict[str, Any]:
+        self.metadata_calls.append(symbol)
+        return {'currency': 'USD'}
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def source():
+    return FakeSource({'AAPL': 190.5, 'MSFT': 410.25})
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_prefetch_fetches_all_prices_in_one_request(source, clock):
+    service = QuoteService(source, price_ttl=60, clock=clock)
+    service.prefetch(['AAPL', 'MSFT', 'AAPL'])
+
+    assert source.price_calls == [['AAPL', 'MSFT']]
+    assert service.get_quote('AAPL') == (190.5, 'USD')
+    assert service.get_quote('MSFT') == (410.25, 'USD')
+    assert service.fetches == 1
+
+def test_price_is_refetched_after_ttl(source, clock):
+    service = QuoteService(source, price_ttl=60, clock=clock)
+    service.get_quote('AAPL')
+
+    clock.now += 59
+    service.get_quote('AAPL')
+    assert len(source.price_calls) == 1
+
+    source.prices['AAPL'] = 200.0
+    clock.now += 1
+    assert service.get_quote('AAPL') == (200.0, 'USD')
+    assert len(source.price_calls) == 2
+    # Metadata lives much longer than prices
+    assert source.metadata_calls == ['AAPL']
+
+def test_prefetch_only_fetches_stale_symbols(source, clock):
+    service = QuoteService(source, price_ttl=60, clock=clock)
+    service.prefetch(['AAPL'])
+    clock.now += 30
+    service.prefetch(['AAPL', 'MSFT'])
+
+    assert source.price_calls == [['AAPL'], ['MSFT']]
+
+def test_unknown_symbol_is_not_cached(source, clock):
+    service = QuoteService(source, price_ttl=60, clock=clock)
+
+    assert service.get_quote('NOPE') is None
+    assert service.get_quote('NOPE') is None
+    assert source.price_calls == [['NOPE'], ['NOPE']]
+
+def test_metadata_is_persisted(source, clock, tmp_path):
+    cache_path = tmp_path / 'market_metadata.json'
+    QuoteService(source, price_ttl=60, metadata_cache_path=cache_path, clock=clock).get_quote('AAPL')
+    assert json.loads(cache_path.read_text())['AAPL']['currency'] == 'USD'
+
+    service = QuoteService(source, price_ttl=60, metadata_cache_path=cache_path, clock=clock)
+    service.get_quote('AAPL')
+    assert source.metadata_calls == ['AAPL']
+
+    clock.now += 7 * 24 * 3600
+    service.get_quote('AAPL')
+    assert source.metadata_calls == ['AAPL', 'AAPL']
@@ -0,0 +1,61 @@
+"""
+Tests for the TinifySession quota reservation against the TinyPNG stand-in.
+"""
+
+from pathlib import Path
+import pytest
+from PIL import Image
+from src.benchmarks.stand_ins import TinifyStandIn
+from src.compression.tinify_session import QuotaExceededError, TinifySession
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"image_{i}.png"
+        Image.new('RGB', (16, 16), (i * 40, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+def test_warm_reads_the_session_count():
+    with TinifyStandIn(compression_count=7) as stand_in, \
+            TinifySession('key', monthly_limit=10, api_base=stand_in.base_url) as session:
+        assert session.warm() == 7
+        assert session.remaining() == 3
+        assert stand_in.compression_count == 7
+
+def test_compress_many_stops_at_the_quota(images):
+    with TinifyStandIn(compression_count=7) as stand_in, \
+            TinifySession('key', monthly_limit=10, max_workers=4, api_base=stand_in.base_url) as session:
+        results = session.compress_many(images)
+
+        compressed = [path for path in results.values() if path]
+        assert len(compressed) == 3
+        assert all(Path(path).exists() for path in compressed)
+        assert stand_in.compression_count == 10
+        assert session.compression_count == 10
+        assert session.remaining() == 0
+
+def test_reserve_is_kept_free(images):
+    with TinifyStandIn(compression_count=7) as stand_in, \
+            TinifySession('key', monthly_limit=10, reserve=2, api_base=stand_in.base_url) as session:
+        results = session.compress_many(images)
+
+        assert sum(1 for path in results.values() if path) == 1
+        assert stand_in.compression_count == 8
+
+def test_compress_file_raises_when_quota_is_used(images):
+    with TinifyStandIn(compression_count=10) as stand_in, \
+            TinifySession('key', monthly_limit=10, api_base=stand_in.base_url) as session:
+        session.warm()
+        with pytest.raises(QuotaExceededError):
+            session.compress_file(images[0])
+        assert stand_in.compression_count == 10
+
+def test_failed_upload_releases_its_slot(images):
+    with TinifyStandIn(error_rate=1.0, seed=1) as stand_in, \
+            TinifySession('key', monthly_limit=10, api_base=stand_in.base_url) as session:
+        results = session.compress_many(images[:2])
+
+        assert all(path is None for path in results.values())
+        assert session.remaining() == 10